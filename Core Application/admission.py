@@ -0,0 +1,119 @@
+"""
+Admission Control - Bounds concurrent searches per worker and sheds excess load
+"""
+import asyncio
+import math
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AdmissionConfig:
+    """Configuration for the adaptive concurrency limiter"""
+    initial_limit: int = 20
+    min_limit: int = 2
+    max_limit: int = 200
+    max_queue: int = 50
+    queue_timeout: float = 2.0
+    target_latency_ms: float = 5000.0
+    decrease_factor: float = 0.9
+
+class OverloadedError(Exception):
+    """Raised when a search cannot be admitted in time"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """AIMD concurrency limiter with a bounded FIFO wait queue.
+
+    Every search that completes under the target latency grows the limit by
+    roughly one per window of `limit` completions; a slower one shrinks it
+    multiplicatively, at most once per round trip: searches already in
+    flight when the limit was cut do not cut it again. Requests that find the queue full, or wait longer than
+    `queue_timeout`, are rejected with OverloadedError instead of piling up
+    vendor tasks and sockets.
+    """
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self.config = config or AdmissionConfig()
+        self.limit = float(self.config.initial_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_latency = self.config.target_latency_ms / 2
+        self._last_decrease = float("-inf")  # time.monotonic() of the last cut
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold one concurrency slot for the duration of the block"""
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release((time.monotonic() - start) * 1000, start)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from current queue drain time"""
+        backlog = self.in_flight + len(self._waiters)
+        drain_ms = self._avg_latency * backlog / max(self.limit, 1)
+        return max(1, math.ceil(drain_ms / 1000))
+
+    async def _acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.config.max_queue:
+            raise OverloadedError(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.config.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just as we gave up; hand it back
+                self.in_flight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise OverloadedError(self.retry_after())
+            raise
+
+    def _release(self, latency_ms: float, started: Optional[float] = None):
+        self.in_flight -= 1
+        self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency_ms
+        if started is None:
+            started = time.monotonic() - latency_ms / 1000
+
+        if latency_ms > self.config.target_latency_ms:
+            # A burst of slow searches admitted before the last cut is one
+            # congestion signal, not one per search
+            if started >= self._last_decrease:
+                self.limit = max(self.config.min_limit, self.limit * self.config.decrease_factor)
+                self._last_decrease = time.monotonic()
+                logger.debug(f"Admission limit decreased to {self.limit:.1f} ({latency_ms:.0f}ms)")
+        else:
+            self.limit = min(self.config.max_limit, self.limit + 1.0 / self.limit)
+
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
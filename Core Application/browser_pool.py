@@ -0,0 +1,190 @@
+"""
+Browser Pool - Warm headless Chrome instances for JavaScript-rendered vendors
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+HEADLESS_CHROME = os.getenv("HEADLESS_CHROME", "true").lower() == "true"
+CHROME_BIN = os.getenv("CHROME_BIN")
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+
+# Sub-resources a price page never needs; blocking them saves most of the bandwidth
+BLOCKED_RESOURCES: Tuple[str, ...] = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+)
+
+class BrowserError(Exception):
+    """A browser failed to load or render a page"""
+
+@dataclass
+class BrowserPoolConfig:
+    """Configuration for the headless browser pool"""
+    size: int = BROWSER_POOL_SIZE  # Max browsers alive at once
+    max_pages: int = BROWSER_MAX_PAGES  # Recycle a browser after this many pages
+    page_load_timeout: int = 20
+    headless: bool = HEADLESS_CHROME
+    chrome_bin: Optional[str] = CHROME_BIN
+    chromedriver_path: Optional[str] = CHROMEDRIVER_PATH
+    blocked_resources: Tuple[str, ...] = BLOCKED_RESOURCES
+
+def chrome_driver_factory(config: BrowserPoolConfig):
+    """Launch a headless Chrome that never downloads images, fonts or CSS"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
+    options = Options()
+    if config.headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    if config.chrome_bin:
+        options.binary_location = config.chrome_bin
+
+    service = Service(executable_path=config.chromedriver_path) if config.chromedriver_path else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(config.page_load_timeout)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(config.blocked_resources)})
+    return driver
+
+class _Browser:
+    """One pooled driver and what it has been used for"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.vendor: Optional[str] = None  # Last vendor served, for affinity
+        self.pages = 0
+        self.in_use = False
+
+class BrowserPool:
+    """Bounded pool of warm browsers shared by JavaScript-only vendors.
+
+    A lease prefers an idle browser that last served the same vendor (its
+    cookies and HTTP cache are warm for that site), then any idle browser,
+    then launches a new one if the pool is below `size`; otherwise it waits.
+    Browsers are quit after `max_pages` pages or any driver error, so a
+    leaking or wedged Chrome never lives long. Selenium calls are blocking
+    and run on the pool's own threads.
+    """
+
+    def __init__(self, config: Optional[BrowserPoolConfig] = None,
+                 driver_factory: Optional[Callable[[BrowserPoolConfig], object]] = None):
+        self.config = config or BrowserPoolConfig()
+        self.driver_factory = driver_factory or chrome_driver_factory
+        self._browsers: List[_Browser] = []
+        self._launching = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def fetch(self, vendor: str, url: str) -> str:
+        """Render `url` in a pooled browser and return the page HTML"""
+        async with self.lease(vendor) as browser:
+            try:
+                html = await self._run(self._load_page, browser.driver, url)
+            except Exception as e:
+                browser.pages = self.config.max_pages  # Never reuse a failed browser
+                raise BrowserError(f"Browser failed to render {url}: {str(e)}") from e
+            browser.pages += 1
+            return html
+
+    @asynccontextmanager
+    async def lease(self, vendor: str):
+        """Hold a browser for `vendor` until the block exits"""
+        browser = await self._acquire(vendor)
+        try:
+            yield browser
+        finally:
+            await self._release(browser)
+
+    async def warm(self, count: Optional[int] = None):
+        """Launch browsers ahead of traffic so the first searches skip Chrome start-up"""
+        count = min(count or self.config.size, self.config.size)
+        while len(self._browsers) < count:
+            self._browsers.append(_Browser(await self._run(self.driver_factory, self.config)))
+
+    async def close(self):
+        browsers, self._browsers = self._browsers, []
+        for browser in browsers:
+            await self._quit(browser)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "browsers": len(self._browsers),
+            "in_use": sum(1 for browser in self._browsers if browser.in_use),
+        }
+
+    async def _acquire(self, vendor: str) -> _Browser:
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                idle = [browser for browser in self._browsers if not browser.in_use]
+                browser = next((b for b in idle if b.vendor == vendor), None) or (idle[0] if idle else None)
+                if browser is not None:
+                    browser.in_use = True
+                    break
+                if len(self._browsers) + self._launching < self.config.size:
+                    self._launching += 1
+                    break
+                await condition.wait()
+
+        if browser is None:
+            try:
+                browser = _Browser(await self._run(self.driver_factory, self.config))
+            except Exception as e:
+                raise BrowserError(f"Could not launch browser: {str(e)}") from e
+            finally:
+                async with condition:
+                    self._launching -= 1
+                    condition.notify()
+            browser.in_use = True
+            self._browsers.append(browser)
+
+        browser.vendor = vendor
+        return browser
+
+    async def _release(self, browser: _Browser):
+        browser.in_use = False
+        if browser.pages >= self.config.max_pages:
+            self._browsers.remove(browser)
+            await self._quit(browser)
+        condition = self._get_condition()
+        async with condition:
+            condition.notify()
+
+    async def _quit(self, browser: _Browser):
+        try:
+            await self._run(browser.driver.quit)
+        except Exception as e:
+            logger.warning(f"Error quitting browser: {str(e)}")
+
+    @staticmethod
+    def _load_page(driver, url: str) -> str:
+        driver.get(url)
+        return driver.page_source
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.config.size, thread_name_prefix="browser")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the pool can be built outside a running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
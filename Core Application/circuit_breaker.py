@@ -0,0 +1,118 @@
+"""
+Circuit Breaker - Per-vendor health tracking so the search fan-out skips failing vendors
+"""
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+@dataclass
+class BreakerConfig:
+    """Configuration for a vendor circuit breaker"""
+    window_size: int = 20  # Most recent outcomes considered
+    min_requests: int = 5
+    error_rate_threshold: float = 0.5
+    slow_call_ms: float = 10000.0
+    slow_rate_threshold: float = 0.8
+    open_seconds: float = 30.0
+    max_open_seconds: float = 600.0
+    half_open_probes: int = 1
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker fed by error rate and latency.
+
+    The breaker opens when, over the last `window_size` outcomes, the error
+    rate or the share of slow calls crosses its threshold. While open every
+    request is refused; after the cool-down it lets `half_open_probes`
+    requests through. A successful probe closes it, a failed one re-opens it
+    with the cool-down doubled (up to `max_open_seconds`).
+    """
+
+    def __init__(self, name: str, config: Optional[BreakerConfig] = None,
+                 on_state_change: Optional[Callable[[str, BreakerState, BreakerState], None]] = None):
+        self.name = name
+        self.config = config or BreakerConfig()
+        self.on_state_change = on_state_change
+        self._state = BreakerState.CLOSED
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=self.config.window_size)
+        self._opened_at = 0.0
+        self._open_seconds = self.config.open_seconds
+        self._probes_in_flight = 0
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state == BreakerState.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._transition(BreakerState.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now; half-open admits a few probes"""
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and self._probes_in_flight < self.config.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def record(self, success: bool, latency_ms: float, at: Optional[float] = None):
+        """Record the outcome of a request let through by allow_request().
+
+        `at` is the outcome's time.monotonic() value, for outcomes replayed
+        from history; a trip then cools down from that moment, not from now.
+        """
+        if self._state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if success and latency_ms < self.config.slow_call_ms:
+                self._outcomes.clear()
+                self._open_seconds = self.config.open_seconds
+                self._transition(BreakerState.CLOSED)
+            else:
+                self._open_seconds = min(self._open_seconds * 2, self.config.max_open_seconds)
+                self._open(at)
+            return
+
+        self._outcomes.append((success, latency_ms))
+        if self._state == BreakerState.CLOSED and self._should_trip():
+            self._open(at)
+
+    def release(self):
+        """Give back a half-open probe slot without recording an outcome"""
+        if self._state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for success, _ in self._outcomes if not success) / len(self._outcomes)
+
+    def _should_trip(self) -> bool:
+        if len(self._outcomes) < self.config.min_requests:
+            return False
+        slow = sum(1 for _, latency in self._outcomes if latency >= self.config.slow_call_ms)
+        return (self.error_rate() >= self.config.error_rate_threshold or
+                slow / len(self._outcomes) >= self.config.slow_rate_threshold)
+
+    def _open(self, at: Optional[float] = None):
+        self._opened_at = time.monotonic() if at is None else at
+        self._transition(BreakerState.OPEN)
+
+    def _transition(self, new_state: BreakerState):
+        old_state = self._state
+        if old_state == new_state:
+            return
+        self._state = new_state
+        if new_state != BreakerState.HALF_OPEN:
+            self._probes_in_flight = 0
+        logger.info(f"Circuit for {self.name}: {old_state.value} -> {new_state.value}")
+        if self.on_state_change:
+            self.on_state_change(self.name, old_state, new_state)
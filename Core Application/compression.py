@@ -0,0 +1,53 @@
+"""
+Response compression - Accept-Encoding negotiation for large JSON bodies
+"""
+import gzip
+from typing import Dict, Optional
+
+import brotli
+
+# Preferred order when the client accepts several codings with equal weight
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+def _parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported content coding, or None for identity"""
+    if not accept_encoding:
+        return None
+
+    weights = _parse_accept_encoding(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with a negotiated coding"""
+    if encoding == "br":
+        # Quality 5 keeps compression in the low milliseconds for JSON bodies
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"Unsupported content coding: {encoding}")
@@ -3,11 +3,13 @@
 Database configuration and connection setup
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from metrics import instrument_db_pool
+
 # Load environment variables
 load_dotenv()
 
@@ -24,6 +26,30 @@ engine = create_engine(
     pool_recycle=300,
     echo=False  # Set to True for SQL query logging
 )
+instrument_db_pool(engine)
+
+# Statement run on every new connection so server-side now()/CURRENT_TIMESTAMP
+# defaults are UTC, like the values the application writes (see as_utc)
+UTC_SESSION_SQL = {
+    "mysql": "SET time_zone = '+00:00'",
+    "postgresql": "SET TIME ZONE 'UTC'",
+}
+
+def pin_session_time_zone(engine):
+    """Run every connection of `engine` in UTC (SQLite is always UTC)"""
+    statement = UTC_SESSION_SQL.get(engine.dialect.name)
+    if statement is None:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_utc(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+pin_session_time_zone(engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -39,6 +65,14 @@ def get_db():
     finally:
         db.close()
 
+def dispose_after_fork():
+    """Forget pooled connections inherited from a parent process.
+
+    close=False leaves the sockets to the parent that opened them; the
+    child lazily opens its own.
+    """
+    engine.dispose(close=False)
+
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
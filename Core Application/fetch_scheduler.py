@@ -0,0 +1,160 @@
+"""
+Fetch Scheduler - Priority lanes and weighted fair queuing in front of vendor fetchers
+"""
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Deque, Dict, Optional, Tuple
+
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    """Scheduling lane for a vendor fetch"""
+    INTERACTIVE = 0
+    BATCH = 1
+    BACKGROUND = 2
+
+# Relative share of a vendor's slots each lane receives under contention
+DEFAULT_WEIGHTS = {
+    Priority.INTERACTIVE: 8.0,
+    Priority.BATCH: 2.0,
+    Priority.BACKGROUND: 1.0,
+}
+
+# Fraction of a vendor's rate budget a lane must leave for interactive traffic
+DEFAULT_RESERVES = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.BATCH: 0.1,
+    Priority.BACKGROUND: 0.25,
+}
+
+# Longest a lane waits for a rate-limit token before the fetch is skipped
+# (None waits as long as it takes). A user's search must not hang on a bucket,
+# and a refresh task must not sit on its worker for a token minutes away:
+# skipped refreshes stay stale and are picked again by the next run
+DEFAULT_MAX_WAITS = {
+    Priority.INTERACTIVE: 2.0,
+    Priority.BATCH: 30.0,
+    Priority.BACKGROUND: 30.0,
+}
+
+class _VendorQueue:
+    """Slots, rate budget and per-lane wait queues for one vendor"""
+
+    def __init__(self, rate_limiter: TokenBucket, max_concurrent: int):
+        self.rate_limiter = rate_limiter
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self.last_finish = {lane: 0.0 for lane in Priority}
+        self.lanes: Dict[Priority, Deque[Tuple[float, asyncio.Future]]] = {
+            lane: deque() for lane in Priority
+        }
+
+    def has_waiters(self) -> bool:
+        return any(self.lanes.values())
+
+    def next_waiter(self) -> Optional[Tuple[float, asyncio.Future]]:
+        """Pop the waiter with the smallest finish tag.
+
+        Interactive requests preempt queued background fetches outright;
+        otherwise lanes share slots in proportion to their weights.
+        """
+        candidates = [lane for lane in Priority if self.lanes[lane]]
+        if Priority.INTERACTIVE in candidates and Priority.BACKGROUND in candidates:
+            candidates.remove(Priority.BACKGROUND)
+        if not candidates:
+            return None
+
+        lane = min(candidates, key=lambda l: self.lanes[l][0][0])
+        return self.lanes[lane].popleft()
+
+class FetchScheduler:
+    """Schedules vendor fetches across interactive, batch and background lanes.
+
+    Each vendor has a fixed number of concurrent fetch slots and a token
+    bucket for its rate limit. Waiting fetches are ordered by weighted fair
+    queuing: a fetch in a lane of weight w gets a virtual finish tag 1/w
+    after the previous fetch in that lane, and the smallest tag runs next.
+    """
+
+    def __init__(self, max_concurrent_per_vendor: int = 2,
+                 weights: Optional[Dict[Priority, float]] = None,
+                 reserves: Optional[Dict[Priority, float]] = None,
+                 max_waits: Optional[Dict[Priority, Optional[float]]] = None):
+        self.max_concurrent_per_vendor = max_concurrent_per_vendor
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.reserves = reserves or DEFAULT_RESERVES
+        self.max_waits = DEFAULT_MAX_WAITS if max_waits is None else max_waits
+        self._vendors: Dict[str, _VendorQueue] = {}
+
+    def register_vendor(self, vendor: str, rate_limiter: TokenBucket,
+                        max_concurrent: Optional[int] = None):
+        """Attach a vendor's rate budget to the scheduler"""
+        self._vendors[vendor] = _VendorQueue(
+            rate_limiter,
+            max_concurrent or self.max_concurrent_per_vendor
+        )
+
+    def rate_limiter(self, vendor: str) -> TokenBucket:
+        return self._vendors[vendor].rate_limiter
+
+    @asynccontextmanager
+    async def slot(self, vendor: str, priority: Priority = Priority.INTERACTIVE):
+        """Hold a fetch slot and one rate-limit token for `vendor`.
+
+        Raises RateLimitExceeded when no token is available within the
+        lane's max wait.
+        """
+        queue = self._vendors[vendor]
+        # Take the token before the slot: a fetch waiting on the rate limit
+        # must not hold a slot an interactive fetch with budget could use
+        reserve = queue.rate_limiter.capacity * self.reserves[priority]
+        waited = await queue.rate_limiter.acquire(reserve=reserve, max_wait=self.max_waits.get(priority))
+        if waited > 0.1:
+            logger.debug(f"Waited {waited:.2f}s for {vendor} rate limit ({priority.name})")
+        await self._acquire_slot(queue, priority)
+        try:
+            yield
+        finally:
+            queue.in_flight -= 1
+            self._dispatch(queue)
+
+    async def _acquire_slot(self, queue: _VendorQueue, priority: Priority):
+        tag = max(queue.virtual_time, queue.last_finish[priority]) + 1.0 / self.weights[priority]
+        queue.last_finish[priority] = tag
+
+        if queue.in_flight < queue.max_concurrent and not queue.has_waiters():
+            queue.in_flight += 1
+            queue.virtual_time = tag
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (tag, waiter)
+        queue.lanes[priority].append(entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted as we were cancelled; pass it on
+                queue.in_flight -= 1
+                self._dispatch(queue)
+            elif entry in queue.lanes[priority]:
+                queue.lanes[priority].remove(entry)
+            raise
+
+    def _dispatch(self, queue: _VendorQueue):
+        while queue.in_flight < queue.max_concurrent:
+            entry = queue.next_waiter()
+            if entry is None:
+                return
+            tag, waiter = entry
+            if waiter.done():
+                continue
+            queue.in_flight += 1
+            queue.virtual_time = max(queue.virtual_time, tag)
+            waiter.set_result(None)
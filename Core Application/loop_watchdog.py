@@ -0,0 +1,136 @@
+"""
+Loop Watchdog - Measures event-loop lag and captures the stack of calls that block the loop
+"""
+import asyncio
+import logging
+import math
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# A loop that has not run its heartbeat for this long is reported as blocked
+LOOP_BLOCKED_THRESHOLD_MS = float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "100"))
+LOOP_HEARTBEAT_INTERVAL_MS = float(os.getenv("LOOP_HEARTBEAT_INTERVAL_MS", "50"))
+
+# Frames from these directories are library code, not the blocking call site
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"],
+                        sysconfig.get_paths()["platlib"]})
+
+def _blocking_site(frame) -> str:
+    """Innermost application frame of a stack, e.g. `product_matcher.py:250 in _calculate_similarity_matrix`"""
+    innermost = frame
+    while frame is not None:
+        if not frame.f_code.co_filename.startswith(_LIBRARY_PATHS):
+            break
+        frame = frame.f_back
+    frame = frame or innermost
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+class LoopWatchdog:
+    """Heartbeat on the event loop plus a sampler thread that watches it.
+
+    The heartbeat wakes every `interval` and records how late it woke (loop
+    lag). The sampler thread checks the last heartbeat; once the loop has
+    been stuck past `threshold` it grabs the loop thread's current stack,
+    which is the code holding the loop, and logs it once per stall.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCKED_THRESHOLD_MS,
+                 interval_ms: float = LOOP_HEARTBEAT_INTERVAL_MS, window: int = 1200):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.lags = deque(maxlen=window)  # Recent lag samples, seconds
+        self.stalls = deque(maxlen=20)  # Recent blocked-loop reports
+        self.sites: Counter = Counter()  # Blocking call site -> stalls
+        self._beat = time.monotonic()
+        self._reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching the running loop; call from a coroutine on that loop"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            # The thread may be sleeping out an interval; wait off the loop
+            await asyncio.to_thread(self._thread.join, 1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.lags.append(lag)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            self._beat = time.monotonic()
+            self._reported = False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._beat - self.interval
+            if blocked >= self.threshold and not self._reported:
+                self._reported = True
+                self._report(blocked)
+
+    def _report(self, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+        site = _blocking_site(frame)
+        del frame
+
+        EVENT_LOOP_BLOCKED.inc()
+        self.sites[site] += 1
+        self.stalls.append({
+            "at": datetime.now(timezone.utc).isoformat(),
+            "blocked_ms": round(blocked * 1000),
+            "site": site,
+            "stack": stack
+        })
+        logger.warning(f"Event loop blocked for over {blocked * 1000:.0f}ms at {site}\n{stack}")
+
+    def stats(self) -> Dict:
+        """Lag percentiles over the recent window and blocked-loop counts"""
+        ordered = sorted(self.lags)
+        lag_ms = {}
+        if ordered:
+            lag_ms = {name: round(_percentile(ordered, q) * 1000, 1)
+                      for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))}
+        return {
+            "lag_ms": lag_ms,
+            "stalls": sum(self.sites.values()),
+            "top_sites": self.sites.most_common(5)
+        }
@@ -4,48 +4,81 @@ Price Comparison Tool - Main FastAPI Application
 """
 import os
 import asyncio
-from typing import List, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+import base64
+import secrets
+from typing import Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, BackgroundTasks, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+import orjson
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 
-from database import SessionLocal, init_db
+from database import SessionLocal, init_db, dispose_after_fork
 from models import Product, Price, Vendor, Country
 from scraping_engine import ScrapingEngine
 from product_matcher import ProductMatcher
+from search_cache import SearchCache, CachedSearch, etag_matches, variant_etag
+from compression import negotiate_encoding, compress
+from admission import AdmissionController, AdmissionConfig, OverloadedError
+from price_store import PriceStore
+from price_history import as_utc, downsample_series, history_resolution, read_price_history
+from timing import Timings, collect_timings, timed
+from metrics import SEARCH_CACHE_REQUESTS, render_metrics
+from loop_watchdog import LoopWatchdog
+from tracing import configure_tracing, in_current_context, tracer
+from profiler import Profiler, ProfilerBusy
+
+# Seconds a search result may be reused, by this app and by downstream caches
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+
+# Response bodies smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Admission control for searches that miss the cache
+SEARCH_CONCURRENCY_LIMIT = int(os.getenv("SEARCH_CONCURRENCY_LIMIT", "20"))
+SEARCH_QUEUE_SIZE = int(os.getenv("SEARCH_QUEUE_SIZE", "50"))
+SEARCH_QUEUE_TIMEOUT = float(os.getenv("SEARCH_QUEUE_TIMEOUT", "2.0"))
+SEARCH_TARGET_LATENCY_MS = float(os.getenv("SEARCH_TARGET_LATENCY_MS", "5000"))
+
+# Bearer token for /admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="Price Comparison Tool",
-    description="A generic tool to fetch product prices from multiple websites across countries",
-    version="1.0.0"
-)
-
-# Enable CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Routes are collected here and mounted by create_app()
+router = APIRouter()
 
 # Initialize database on startup
-@app.on_event("startup")
 async def startup_event():
+    configure_tracing()
     init_db()
     logger.info("Database initialized")
+    await run_in_threadpool(scraping_engine.load_vendor_health)
+    loop_watchdog.start()
+
+async def shutdown_event():
+    await loop_watchdog.stop()
+    await run_in_threadpool(price_store.flush_demand)
+    await scraping_engine.close()
 
 # Pydantic models for API requests/responses
+AlternativesMode = Literal["none", "trim", "full"]
+HistoryResolution = Literal["auto", "raw", "day"]
+
 class ProductSearchRequest(BaseModel):
     country: str
     query: str
+    limit: Optional[int] = Field(None, ge=1, le=100)
+    cursor: Optional[str] = None
+    alternatives: AlternativesMode = "none"
+    max_alternatives: int = Field(3, ge=0, le=50)
+    timings: bool = False
 
 class PriceResponse(BaseModel):
     link: str
@@ -56,6 +89,7 @@ class PriceResponse(BaseModel):
     availability: str = "in_stock"
     originalPrice: Optional[str] = None
     discountPercentage: Optional[float] = None
+    alternatives: Optional[List["PriceResponse"]] = None
 
 class ProductSearchResponse(BaseModel):
     products: List[PriceResponse]
@@ -63,12 +97,118 @@ class ProductSearchResponse(BaseModel):
     search_time_ms: int
     country: str
     query: str
+    next_cursor: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+
+class HistoryPoint(BaseModel):
+    t: str
+    price: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    samples: Optional[int] = None
+
+class HistorySeries(BaseModel):
+    vendor_id: int
+    vendor: str
+    currency: str
+    points: List[HistoryPoint]
+
+class PriceHistoryResponse(BaseModel):
+    product_id: int
+    resolution: str
+    start: str
+    end: str
+    series: List[HistorySeries]
+    next_cursor: Optional[str] = None
+
+def _price_payload(product: dict) -> dict:
+    """Shape a matched product like PriceResponse without a validation pass"""
+    original_price = product.get("original_price")
+    discount_percentage = product.get("discount_percentage")
+    return {
+        "link": product["url"],
+        "price": str(product["price"]),
+        "currency": product["currency"],
+        "productName": product["name"],
+        "vendor": product["vendor"],
+        "availability": product.get("availability", "in_stock"),
+        "originalPrice": str(original_price) if original_price else None,
+        "discountPercentage": float(discount_percentage) if discount_percentage is not None else None
+    }
+
+def _product_payload(product: dict) -> dict:
+    """Shape a matched product and its alternatives (cheapest first)"""
+    payload = _price_payload(product)
+    alternatives = sorted(product.get("alternatives") or [], key=lambda p: float(p["price"]))
+    payload["alternatives"] = [_price_payload(alt) for alt in alternatives]
+    return payload
+
+def _encode_cursor(product: dict) -> str:
+    """Opaque keyset cursor pointing just after a product in price order"""
+    raw = orjson.dumps([float(product["price"]), product["link"]])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        price, link = orjson.loads(base64.urlsafe_b64decode(padded))
+        return float(price), str(link)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _paginate(products: List[dict], limit: Optional[int], cursor: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+    """Keyset pagination over products sorted by (price, link)"""
+    start = 0
+    if cursor:
+        after = _decode_cursor(cursor)
+        while start < len(products) and \
+                (float(products[start]["price"]), products[start]["link"]) <= after:
+            start += 1
+
+    if limit is None:
+        return products[start:], None
+
+    page = products[start:start + limit]
+    has_more = start + limit < len(products)
+    return page, _encode_cursor(page[-1]) if has_more and page else None
+
+def _encode_history_cursor(resolution: str, start: datetime, end: datetime, key: tuple) -> str:
+    """Opaque keyset cursor pointing just after a history row of the resolved range"""
+    raw = orjson.dumps([resolution, start, end, key[0], key[1]])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_history_cursor(cursor: str) -> Tuple[str, datetime, datetime, tuple]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        resolution, start, end, at, row_id = orjson.loads(base64.urlsafe_b64decode(padded))
+        parse = datetime.fromisoformat if resolution == "raw" else date.fromisoformat
+        return resolution, datetime.fromisoformat(start), datetime.fromisoformat(end), (parse(at), int(row_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _trim_alternatives(products: List[dict], mode: str, max_alternatives: int) -> List[dict]:
+    """Drop or cut down the alternatives attached to each product"""
+    if mode == "full":
+        return products
+    if mode == "none":
+        return [{k: v for k, v in p.items() if k != "alternatives"} for p in products]
+    return [{**p, "alternatives": p["alternatives"][:max_alternatives]} for p in products]
 
 # Global instances
 scraping_engine = ScrapingEngine()
 product_matcher = ProductMatcher()
+price_store = PriceStore(normalizer=product_matcher.normalizer)
+search_cache = SearchCache(ttl=SEARCH_CACHE_TTL)
+loop_watchdog = LoopWatchdog()
+profiler = Profiler()
+admission = AdmissionController(AdmissionConfig(
+    initial_limit=SEARCH_CONCURRENCY_LIMIT,
+    max_queue=SEARCH_QUEUE_SIZE,
+    queue_timeout=SEARCH_QUEUE_TIMEOUT,
+    target_latency_ms=SEARCH_TARGET_LATENCY_MS
+))
 
-@app.get("/")
+@router.get("/")
 async def root():
     """Root endpoint with API information"""
     return {
@@ -81,88 +221,308 @@ async def root():
         }
     }
 
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     """Health check endpoint"""
+    loop = loop_watchdog.stats()
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "event_loop": {"lag_ms": loop["lag_ms"], "stalls": loop["stalls"]}
     }
 
-@app.post("/search", response_model=ProductSearchResponse)
+async def _run_search(
+    request: ProductSearchRequest,
+    background_tasks: BackgroundTasks
+) -> Tuple[CachedSearch, int]:
+    """Serve a search from the result cache, scraping and matching on a miss"""
+    start_time = datetime.now()
+
+    attributes = {"search.country": request.country, "search.query": request.query}
+    with tracer.start_as_current_span("search", attributes=attributes) as span:
+        try:
+            cached = search_cache.get(request.country, request.query)
+            span.set_attribute("search.cache", "miss" if cached is None else "hit")
+            SEARCH_CACHE_REQUESTS.labels("miss" if cached is None else "hit").inc()
+            if cached is None:
+                try:
+                    async with admission.admit():
+                        # Serve vendors with fresh stored prices from the database
+                        # and live-scrape only the ones that are missing or stale
+                        with timed("plan"):
+                            plan = await run_in_threadpool(
+                                price_store.plan_search,
+                                request.country,
+                                request.query,
+                                scraping_engine.vendor_freshness_slas(request.country)
+                            )
+                        results = list(plan.stored_offers)
+                        if plan.vendors_to_scrape is None or plan.vendors_to_scrape:
+                            with timed("scrape"):
+                                results += await scraping_engine.search_products(
+                                    country=request.country,
+                                    query=request.query,
+                                    vendors=plan.vendors_to_scrape
+                                )
+
+                        # Process and match products
+                        with timed("match"):
+                            matched_products = product_matcher.match_and_deduplicate(results)
+
+                        # Convert to response format, sorted by price (ascending). The
+                        # payload is built as plain dicts and serialized once by orjson;
+                        # response_model is kept only for the OpenAPI schema.
+                        with timed("payload"):
+                            matched_products.sort(key=lambda p: (float(p["price"]), p["url"]))
+                            price_responses = [_product_payload(product) for product in matched_products]
+                        cached = search_cache.set(request.country, request.query, price_responses,
+                                                  product_ids=plan.product_ids)
+
+                        # Store results in database (background task), in this search's trace
+                        background_tasks.add_task(
+                            in_current_context(store_search_results),
+                            request.country,
+                            request.query,
+                            matched_products,
+                            cached
+                        )
+                except OverloadedError as e:
+                    # Shed load: answer from a stale result if we have one
+                    cached = search_cache.get(request.country, request.query, allow_stale=True)
+                    if cached is None:
+                        raise HTTPException(
+                            status_code=503,
+                            detail="Search capacity exceeded, please retry",
+                            headers={"Retry-After": str(e.retry_after)}
+                        )
+                    span.set_attribute("search.cache", "stale")
+                    SEARCH_CACHE_REQUESTS.labels("stale").inc()
+                    logger.warning(f"Overloaded, serving stale results for: {request.query} in {request.country}")
+            elif price_store.record_demand(cached.product_ids):
+                # Cache hits still count as demand for the refresh scheduler
+                background_tasks.add_task(price_store.flush_demand)
+
+            end_time = datetime.now()
+            search_time_ms = int((end_time - start_time).total_seconds() * 1000)
+            return cached, search_time_ms
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in search_products: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+def _search_response(
+    http_request: Request,
+    request: ProductSearchRequest,
+    cached: CachedSearch,
+    search_time_ms: int,
+    timings: Timings,
+    headers: Optional[dict] = None
+) -> Response:
+    """Serialize one page of results, compressing large bodies when accepted.
+
+    Stage timings go out in a Server-Timing header; with `timings` set they
+    are also added to the body (without serialize/compress, which run after).
+    """
+    page, next_cursor = _paginate(cached.products, request.limit, request.cursor)
+    page = _trim_alternatives(page, request.alternatives, request.max_alternatives)
+
+    with timed("serialize"):
+        body = orjson.dumps({
+            "products": page,
+            "total_results": len(cached.products),
+            "search_time_ms": search_time_ms,
+            "country": request.country,
+            "query": request.query,
+            "next_cursor": next_cursor,
+            "timings": timings.as_dict() if request.timings else None
+        })
+
+    headers = dict(headers or {})
+    body = _compress_body(http_request, body, headers)
+
+    headers["Server-Timing"] = timings.server_timing(total=True)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _compress_body(http_request: Request, body: bytes, headers: dict) -> bytes:
+    """Compress a large JSON body when the client accepts it, setting the matching headers"""
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(http_request.headers.get("accept-encoding"))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            with timed("compress"):
+                return compress(body, encoding)
+    return body
+
+@router.post("/search", response_model=ProductSearchResponse)
 async def search_products(
     request: ProductSearchRequest,
+    http_request: Request,
     background_tasks: BackgroundTasks
 ):
     """
     Main endpoint to search for products across multiple vendors
     """
-    start_time = datetime.now()
+    with collect_timings() as timings:
+        cached, search_time_ms = await _run_search(request, background_tasks)
+        return _search_response(http_request, request, cached, search_time_ms, timings)
 
-    try:
-        # Run scraping process
-        results = await scraping_engine.search_products(
-            country=request.country,
-            query=request.query
-        )
-
-        # Process and match products
-        matched_products = product_matcher.match_and_deduplicate(results)
-
-        # Convert to response format
-        price_responses = []
-        for product in matched_products:
-            price_responses.append(PriceResponse(
-                link=product["url"],
-                price=str(product["price"]),
-                currency=product["currency"],
-                productName=product["name"],
-                vendor=product["vendor"],
-                availability=product.get("availability", "in_stock"),
-                originalPrice=str(product.get("original_price")) if product.get("original_price") else None,
-                discountPercentage=product.get("discount_percentage")
-            ))
-
-        # Sort by price (ascending)
-        price_responses.sort(key=lambda x: float(x.price))
-
-        end_time = datetime.now()
-        search_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-        # Store results in database (background task)
-        background_tasks.add_task(
-            store_search_results,
-            request.country,
-            request.query,
-            matched_products
-        )
-
-        return ProductSearchResponse(
-            products=price_responses,
-            total_results=len(price_responses),
-            search_time_ms=search_time_ms,
-            country=request.country,
-            query=request.query
-        )
-
-    except Exception as e:
-        logger.error(f"Error in search_products: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
-
-@app.get("/search", response_model=ProductSearchResponse)
+@router.get("/search", response_model=ProductSearchResponse)
 async def search_products_get(
+    http_request: Request,
     country: str = Query(..., description="Country code (e.g., US, IN, UK)"),
     query: str = Query(..., description="Product search query"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Maximum products per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    alternatives: AlternativesMode = Query("none", description="Include matched alternatives: none, trim or full"),
+    max_alternatives: int = Query(3, ge=0, le=50, description="Alternatives kept per product when trimming"),
+    timings: bool = Query(False, description="Include per-stage timings (ms) in the response"),
     background_tasks: BackgroundTasks = None
 ):
     """
-    GET endpoint for product search (for easy testing)
+    GET endpoint for product search, cacheable by clients and CDNs.
+
+    Responses carry an ETag computed from the results plus Cache-Control/Age
+    derived from the cache TTL, and a matching If-None-Match yields a 304.
+    Responses that include timings are per-request and never cached.
+    """
+    request = ProductSearchRequest(
+        country=country,
+        query=query,
+        limit=limit,
+        cursor=cursor,
+        alternatives=alternatives,
+        max_alternatives=max_alternatives,
+        timings=timings
+    )
+    with collect_timings() as stage_timings:
+        cached, search_time_ms = await _run_search(request, background_tasks)
+        if timings:
+            return _search_response(http_request, request, cached, search_time_ms, stage_timings,
+                                    {"Cache-Control": "no-store"})
+
+        headers = search_cache.cache_headers(cached)
+        headers["ETag"] = variant_etag(cached.etag, limit, cursor, alternatives, max_alternatives)
+        headers["Vary"] = "Accept-Encoding"
+
+        if etag_matches(http_request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        return _search_response(http_request, request, cached, search_time_ms, stage_timings, headers)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics, aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """Allow only requests carrying `Authorization: Bearer <ADMIN_TOKEN>`"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+@router.get("/admin/profile", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    mode: Literal["cpu", "memory"] = Query("cpu", description="cpu: sampled stacks; memory: tracemalloc bytes"),
+    interval_ms: float = Query(5, ge=1, le=1000, description="Sampling interval for cpu profiles"),
+    include_idle: bool = Query(False, description="Keep samples of threads that are waiting")
+):
+    """
+    Profile the worker that handles this request, while it keeps serving traffic.
+
+    Returns collapsed stacks (`frame;frame;frame count` per line) for
+    flamegraph.pl or speedscope. Memory profiles weigh stacks by bytes
+    allocated during the window and still live at its end.
     """
-    request = ProductSearchRequest(country=country, query=query)
-    return await search_products(request, background_tasks)
+    seconds = min(seconds, PROFILE_MAX_SECONDS)
+    try:
+        if mode == "cpu":
+            body = await profiler.cpu(seconds, interval_ms / 1000, include_idle)
+        else:
+            body = await profiler.memory(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(body, headers={"X-Worker-Pid": str(os.getpid())})
 
-@app.get("/vendors/{country}")
+def _read_history(product_id: int, start: datetime, end: datetime, resolution: str, limit: int,
+                  after: Optional[tuple], vendor_id: Optional[int]) -> Tuple[List[dict], Optional[tuple]]:
+    db = SessionLocal()
+    try:
+        if db.query(Product.id).filter(Product.id == product_id).first() is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return read_price_history(db, product_id, start, end, resolution, limit, after, vendor_id)
+    finally:
+        db.close()
+
+@router.get("/products/{product_id}/history", response_model=PriceHistoryResponse)
+async def get_price_history(
+    http_request: Request,
+    product_id: int,
+    vendor_id: Optional[int] = Query(None, description="Only this vendor's prices (see /vendors/{country})"),
+    start: Optional[datetime] = Query(None, description="Range start (default: 30 days before end)"),
+    end: Optional[datetime] = Query(None, description="Range end, exclusive (default: now)"),
+    resolution: HistoryResolution = Query("auto", description="raw prices, daily rollups, or auto by range"),
+    points: int = Query(200, ge=3, le=2000, description="Maximum points per vendor series (single-page ranges)"),
+    limit: int = Query(5000, ge=1, le=20000, description="History rows read per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Price history for charting, one series per vendor.
+
+    Short ranges come from raw prices, longer ones from daily rollups
+    (avg with min/max), and each series is downsampled to `points` with
+    LTTB. With `auto`, a raw range too long for one page of `limit` rows
+    is served from rollups instead, so the whole range is one chart.
+
+    A range that still needs several pages is a raw export: pages carry
+    every row in time order, without downsampling, and `next_cursor`
+    pins the range and resolution the first page resolved.
+    """
+    if cursor:
+        cursor_resolution, cursor_start, cursor_end, after = _decode_history_cursor(cursor)
+        if resolution not in ("auto", cursor_resolution) or (start and as_utc(start) != cursor_start) \
+                or (end and as_utc(end) != cursor_end):
+            raise HTTPException(status_code=400, detail="Cursor is for another range or resolution")
+        resolution, start, end = cursor_resolution, cursor_start, cursor_end
+    else:
+        end = as_utc(end) or datetime.now(timezone.utc)
+        start = as_utc(start) or end - timedelta(days=30)
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start must be before end")
+        after = None
+
+    auto = resolution == "auto"
+    if auto:
+        resolution = history_resolution(start, end)
+    rows, next_key = await run_in_threadpool(_read_history, product_id, start, end, resolution, limit,
+                                             after, vendor_id)
+    if auto and resolution == "raw" and next_key:
+        resolution = "day"
+        rows, next_key = await run_in_threadpool(_read_history, product_id, start, end, resolution, limit,
+                                                 None, vendor_id)
+
+    # Downsampling a page would give `points` per page, not per range
+    paged = cursor is not None or next_key is not None
+    body = orjson.dumps({
+        "product_id": product_id,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "series": downsample_series(rows, len(rows) if paged else points),
+        "next_cursor": _encode_history_cursor(resolution, start, end, next_key) if next_key else None
+    })
+    headers = {}
+    body = _compress_body(http_request, body, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/vendors/{country}")
 async def get_vendors_by_country(country: str):
     """Get all active vendors for a specific country"""
     db = SessionLocal()
@@ -184,7 +544,7 @@ async def get_vendors_by_country(country: str):
     finally:
         db.close()
 
-@app.get("/countries")
+@router.get("/countries")
 async def get_supported_countries():
     """Get all supported countries"""
     db = SessionLocal()
@@ -201,17 +561,60 @@ async def get_supported_countries():
     finally:
         db.close()
 
-async def store_search_results(country: str, query: str, products: List[dict]):
-    """Background task to store search results in database"""
-    db = SessionLocal()
-    try:
-        # Implementation for storing results
-        logger.info(f"Storing {len(products)} products from search: {query} in {country}")
-        # Add database storage logic here
-    except Exception as e:
-        logger.error(f"Error storing search results: {str(e)}")
-    finally:
-        db.close()
+def store_search_results(country: str, query: str, products: List[dict], cached: Optional[CachedSearch] = None):
+    """Background task to store search results in database.
+
+    Runs in the threadpool, since the database session is synchronous.
+    The cache entry learns the products its results were stored under, so
+    later hits on it are counted against them.
+    """
+    with tracer.start_as_current_span("store_search_results", attributes={"products": len(products)}):
+        try:
+            stored = price_store.store_search_results(
+                country,
+                products,
+                scraping_engine.vendor_base_urls(country)
+            )
+            if cached is not None:
+                cached.product_ids = sorted({p['product_id'] for p in products if p.get('product_id')})
+            logger.info(f"Stored {stored} prices from search: {query} in {country}")
+        except Exception as e:
+            logger.error(f"Error storing search results: {str(e)}")
+
+def reset_after_fork():
+    """Re-create fork-unsafe resources in a worker forked from a preloaded master.
+
+    Everything built at import (vendor configs, normalizer tables, caches)
+    is shared copy-on-write; connection pools, HTTP sessions and executors
+    inherited from the master are dropped so the worker opens its own.
+    """
+    dispose_after_fork()
+    scraping_engine.after_fork()
+
+def create_app() -> FastAPI:
+    """Build the ASGI app around this module's shared state"""
+    application = FastAPI(
+        title="Price Comparison Tool",
+        description="A generic tool to fetch product prices from multiple websites across countries",
+        version="1.0.0",
+        default_response_class=ORJSONResponse
+    )
+
+    # Enable CORS
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    application.add_event_handler("startup", startup_event)
+    application.add_event_handler("shutdown", shutdown_event)
+    application.include_router(router)
+    return application
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
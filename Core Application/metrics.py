@@ -0,0 +1,96 @@
+"""
+Metrics - Prometheus metrics for scraping, matching, caching and the database pool
+"""
+import os
+from typing import Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+
+# With several worker processes (gunicorn), point this at an empty directory
+# shared by the workers; /metrics then aggregates every live worker
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "search_stage_seconds", "Time spent per search stage (see Server-Timing)", ["stage"], buckets=LATENCY_BUCKETS
+)
+VENDOR_REQUESTS = Counter(
+    "scraper_vendor_requests_total", "Vendor page requests by HTTP status, or error", ["vendor", "status"]
+)
+VENDOR_REQUEST_SECONDS = Histogram(
+    "scraper_vendor_request_seconds", "Vendor page request latency, per attempt", ["vendor"], buckets=LATENCY_BUCKETS
+)
+VENDOR_RESPONSE_BYTES = Counter(
+    "scraper_vendor_response_bytes_total", "Decoded bytes of vendor pages received", ["vendor"]
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "scraper_rate_limit_wait_seconds", "Time waiting for a vendor slot and rate-limit token", ["vendor"],
+    buckets=LATENCY_BUCKETS
+)
+SEARCH_CACHE_REQUESTS = Counter(
+    "search_cache_requests_total", "Search result cache lookups by result (hit, miss, stale)", ["result"]
+)
+MATCH_GROUP_SIZE = Histogram(
+    "matcher_group_size", "Products per brand group compared pairwise by the matcher",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+)
+SCRAPE_LOG_RECORDS = Counter(
+    "scrape_log_records_total", "Scrape outcomes by fate (written, sampled_out, dropped, failed)", ["outcome"]
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Database connections currently checked out", multiprocess_mode="livesum"
+)
+DB_POOL_CAPACITY = Gauge(
+    "db_pool_capacity", "Database pool size plus overflow", multiprocess_mode="livesum"
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer callback",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total", "Times the event loop was blocked past the watchdog threshold"
+)
+
+def observe_stage(stage: str, ms: float):
+    STAGE_SECONDS.labels(stage).observe(ms / 1000)
+
+def observe_vendor_request(vendor: str, status: str, seconds: float, size: int = 0):
+    VENDOR_REQUESTS.labels(vendor, status).inc()
+    VENDOR_REQUEST_SECONDS.labels(vendor).observe(seconds)
+    if size:
+        VENDOR_RESPONSE_BYTES.labels(vendor).inc(size)
+
+def instrument_db_pool(engine):
+    """Track checked-out connections against pool capacity (saturation)"""
+    pool = engine.pool
+    if not hasattr(pool, "size"):
+        return  # Pools without a fixed size (sqlite memory, NullPool) have nothing to saturate
+
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        # Set on use: a forked worker starts with fresh multiprocess values
+        DB_POOL_CAPACITY.set(capacity)
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type, aggregated across workers in multiprocess mode"""
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead(pid: int, path: Optional[str] = None):
+    """Drop a dead worker's live gauges (gunicorn child_exit hook)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, path or PROMETHEUS_MULTIPROC_DIR)
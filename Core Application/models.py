@@ -2,7 +2,7 @@
 """
 SQLAlchemy models for the price comparison tool
 """
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -63,6 +63,8 @@ class Product(Base):
     sku = Column(String(100), nullable=True)
     description = Column(Text, nullable=True)
     image_url = Column(String(500), nullable=True)
+    search_count = Column(Integer, default=0)
+    last_searched_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -73,9 +75,12 @@ class Product(Base):
     # Indexes
     __table_args__ = (
         Index('idx_brand_model', 'brand', 'model'),
+        # Search resolution (price_store.plan_search); FULLTEXT on MySQL only
+        Index('ft_normalized_name', 'normalized_name', mysql_prefix='FULLTEXT'),
     )
 
 class Price(Base):
+    """Append-only price history; partitioned by month of scraped_at in MySQL"""
     __tablename__ = "prices"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -87,8 +92,7 @@ class Price(Base):
     discount_percentage = Column(DECIMAL(5, 2), nullable=True)
     availability = Column(String(50), default="in_stock")
     product_url = Column(String(500), nullable=False)
-    scraped_at = Column(DateTime(timezone=True), server_default=func.now())
-    is_current = Column(Boolean, default=True)
+    scraped_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     # Relationships
     product = relationship("Product", back_populates="prices")
@@ -96,8 +100,47 @@ class Price(Base):
 
     # Indexes
     __table_args__ = (
-        Index('idx_product_vendor', 'product_id', 'vendor_id'),
-        Index('idx_current_prices', 'is_current', 'product_id'),
+        # Keyset order for /products/{id}/history, with and without a vendor
+        Index('idx_product_vendor', 'product_id', 'vendor_id', 'scraped_at'),
+        Index('idx_product_scraped', 'product_id', 'scraped_at'),
+        Index('idx_scraped_at', 'scraped_at'),
+    )
+
+class CurrentPrice(Base):
+    """Latest price per (product, vendor), one row each"""
+    __tablename__ = "current_prices"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), primary_key=True)
+    price = Column(DECIMAL(10, 2), nullable=False)
+    currency = Column(String(3), nullable=False)
+    original_price = Column(DECIMAL(10, 2), nullable=True)
+    discount_percentage = Column(DECIMAL(5, 2), nullable=True)
+    availability = Column(String(50), default="in_stock")
+    product_url = Column(String(500), nullable=False)
+    scraped_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        Index('idx_current_vendor', 'vendor_id'),
+    )
+
+class PriceDailyRollup(Base):
+    """Per-day price summary per (product, vendor); avg is price_sum / sample_count"""
+    __tablename__ = "price_daily_rollups"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    currency = Column(String(3), nullable=False)
+    min_price = Column(DECIMAL(10, 2), nullable=False)
+    max_price = Column(DECIMAL(10, 2), nullable=False)
+    price_sum = Column(DECIMAL(14, 2), nullable=False)
+    sample_count = Column(Integer, nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        Index('idx_rollup_day', 'day'),
     )
 
 class ProductMatch(Base):
@@ -115,7 +158,7 @@ class ScrapingLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
-    status = Column(String(20), nullable=False)  # success, error, rate_limited, blocked
+    status = Column(String(20), nullable=False)  # success, error, rate_limited, blocked; throttled (own budget spent) and circuit_* are not outcomes
     products_found = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
     response_time_ms = Column(Integer, nullable=True)
@@ -0,0 +1,339 @@
+"""
+Price History - Current-price and daily rollup upkeep, monthly partitions and retention for prices
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, text
+
+from models import Price, CurrentPrice, PriceDailyRollup, Vendor
+
+logger = logging.getLogger(__name__)
+
+# Raw rows older than this are folded into rollups and removed
+PRICE_HISTORY_RETENTION_DAYS = int(os.getenv("PRICE_HISTORY_RETENTION_DAYS", "90"))
+PRICE_ROLLUP_RETENTION_DAYS = int(os.getenv("PRICE_ROLLUP_RETENTION_DAYS", "730"))
+# Monthly partitions created ahead of the current month (MySQL)
+PRICE_PARTITIONS_AHEAD = int(os.getenv("PRICE_PARTITIONS_AHEAD", "3"))
+
+# Auto resolution serves raw rows for ranges up to this long, rollups beyond
+HISTORY_RAW_MAX_DAYS = int(os.getenv("HISTORY_RAW_MAX_DAYS", "7"))
+
+# Catch-all partition that new months are split off from
+FUTURE_PARTITION = "p_future"
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes from the database as UTC (sessions are pinned to UTC in database.py)"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _dialect(db) -> str:
+    return db.get_bind().dialect.name
+
+def _upsert(db, table, rows: List[Dict], keys: List[str], updates):
+    """Multi-row insert that updates rows whose key already exists.
+
+    `updates(stored, incoming)` returns column -> new value, given the
+    stored row's and the incoming row's columns.
+    """
+    dialect = _dialect(db)
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(rows)
+        return db.execute(stmt.on_duplicate_key_update(updates(table.c, stmt.inserted)))
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Upserts are not supported on {dialect}")
+    stmt = insert(table).values(rows)
+    return db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=updates(table.c, stmt.excluded)))
+
+def upsert_current_prices(db, rows: List[Dict]):
+    """Make `rows` the current_prices entries for their (product, vendor) pairs"""
+    columns = [c.name for c in CurrentPrice.__table__.c]
+    values = [{name: row.get(name) for name in columns} for row in rows]
+    _upsert(db, CurrentPrice.__table__, values, ["product_id", "vendor_id"],
+            lambda stored, incoming: {name: incoming[name] for name in columns
+                                      if name not in ("product_id", "vendor_id")})
+
+def update_daily_rollups(db, rows: List[Dict]):
+    """Fold price rows (with `scraped_at`) into their day's min/max/sum/count"""
+    days = {}
+    for row in rows:
+        key = (row['product_id'], row['vendor_id'], row['scraped_at'].date())
+        price = row['price']
+        entry = days.get(key)
+        if entry is None:
+            days[key] = {
+                'product_id': key[0], 'vendor_id': key[1], 'day': key[2], 'currency': row['currency'],
+                'min_price': price, 'max_price': price, 'price_sum': price, 'sample_count': 1
+            }
+        else:
+            entry['min_price'] = min(entry['min_price'], price)
+            entry['max_price'] = max(entry['max_price'], price)
+            entry['price_sum'] += price
+            entry['sample_count'] += 1
+    if not days:
+        return
+
+    # SQLite's two-argument min()/max() are scalar, like LEAST()/GREATEST() elsewhere
+    least, greatest = (func.min, func.max) if _dialect(db) == "sqlite" else (func.least, func.greatest)
+    _upsert(db, PriceDailyRollup.__table__, list(days.values()), ["product_id", "vendor_id", "day"],
+            lambda stored, incoming: {
+                'currency': incoming.currency,
+                'min_price': least(stored.min_price, incoming.min_price),
+                'max_price': greatest(stored.max_price, incoming.max_price),
+                'price_sum': stored.price_sum + incoming.price_sum,
+                'sample_count': stored.sample_count + incoming.sample_count,
+            })
+
+def rebuild_daily_rollups(db, start: datetime, end: datetime) -> int:
+    """Recompute rollups from raw prices scraped in [start, end); both on day boundaries.
+
+    Used before raw rows are removed, so days whose rows did not come
+    through write_current_prices are summarized too. Returns rollups written.
+    """
+    day = func.date(Price.scraped_at)
+    query = db.query(
+        Price.product_id, Price.vendor_id, day, func.max(Price.currency),
+        func.min(Price.price), func.max(Price.price), func.sum(Price.price), func.count(Price.id)
+    ).filter(Price.scraped_at >= start, Price.scraped_at < end)
+
+    rollups = []
+    for product_id, vendor_id, day_value, currency, low, high, total, count in query.group_by(
+            Price.product_id, Price.vendor_id, day):
+        rollups.append({
+            'product_id': product_id, 'vendor_id': vendor_id,
+            # SQLite returns date() as a string
+            'day': date.fromisoformat(day_value) if isinstance(day_value, str) else day_value,
+            'currency': currency, 'min_price': low, 'max_price': high,
+            'price_sum': total, 'sample_count': count
+        })
+
+    db.query(PriceDailyRollup).filter(
+        PriceDailyRollup.day >= start.date(), PriceDailyRollup.day < end.date()
+    ).delete(synchronize_session=False)
+    if rollups:
+        db.bulk_insert_mappings(PriceDailyRollup, rollups)
+    return len(rollups)
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+def month_partition(month: datetime) -> Tuple[str, int]:
+    """Partition name and exclusive upper bound (UNIX_TIMESTAMP) holding `month`"""
+    return f"p{month.year:04d}{month.month:02d}", int(add_months(month, 1).timestamp())
+
+def plan_partitions(existing: Dict[str, Optional[int]], now: datetime, ahead: int,
+                    cutoff: datetime) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """Monthly partitions to add and to drop.
+
+    `existing` maps partition names to upper bounds (None for MAXVALUE).
+    Months from the current one to `ahead` months out are added after the
+    last bounded partition; partitions ending at or before `cutoff` are
+    dropped, oldest first.
+    """
+    bounds = [bound for bound in existing.values() if bound is not None]
+    last_bound = max(bounds) if bounds else None
+    current = month_start(now)
+    to_add = [month_partition(add_months(current, i)) for i in range(ahead + 1)]
+    to_add = [(name, bound) for name, bound in to_add if last_bound is None or bound > last_bound]
+
+    limit = int(cutoff.timestamp())
+    to_drop = sorted((name for name, bound in existing.items() if bound is not None and bound <= limit),
+                     key=lambda name: existing[name])
+    return to_add, to_drop
+
+def price_partitions(db) -> Dict[str, Optional[int]]:
+    """Partitions of the prices table (empty when it is not partitioned)"""
+    rows = db.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'prices' AND PARTITION_NAME IS NOT NULL"
+    )).all()
+    return {name: None if bound == "MAXVALUE" else int(bound) for name, bound in rows}
+
+def _partition_clause(partitions: List[Tuple[str, int]]) -> str:
+    return ", ".join(f"PARTITION {name} VALUES LESS THAN ({bound})" for name, bound in partitions)
+
+def _add_partitions(db, existing: Dict[str, Optional[int]], to_add: List[Tuple[str, int]]):
+    if FUTURE_PARTITION in existing:
+        db.execute(text(f"ALTER TABLE prices REORGANIZE PARTITION {FUTURE_PARTITION} INTO ("
+                        f"{_partition_clause(to_add)}, "
+                        f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE)"))
+    else:
+        db.execute(text(f"ALTER TABLE prices ADD PARTITION ({_partition_clause(to_add)})"))
+
+def _drop_partition(db, name: str):
+    db.execute(text(f"ALTER TABLE prices DROP PARTITION {name}"))
+
+def _day_start(value: datetime) -> datetime:
+    return datetime.combine(value.date(), datetime.min.time(), tzinfo=timezone.utc)
+
+def compact_price_history(db, now: Optional[datetime] = None) -> Dict:
+    """Roll up and remove raw prices past retention, and keep monthly partitions ahead.
+
+    With a partitioned MySQL prices table whole months are dropped, which is
+    instant; otherwise rows are deleted a day at a time. Each removed range
+    is re-summarized first, so rollups stay exact. Commits as it goes.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = _day_start(now - timedelta(days=PRICE_HISTORY_RETENTION_DAYS))
+    result = {"partitions_added": 0, "partitions_dropped": 0, "prices_deleted": 0, "rollups_deleted": 0}
+
+    partitions = price_partitions(db) if _dialect(db) == "mysql" else {}
+    if partitions:
+        to_add, to_drop = plan_partitions(partitions, now, PRICE_PARTITIONS_AHEAD, cutoff)
+        if to_add:
+            _add_partitions(db, partitions, to_add)
+            result["partitions_added"] = len(to_add)
+
+        for name in to_drop:
+            # Partitions go oldest first, so the rows below its bound are exactly this
+            # partition's. Rebuilding only from its oldest row's day leaves the
+            # rollups of months dropped by earlier runs alone.
+            upper = datetime.fromtimestamp(partitions[name], tz=timezone.utc)
+            oldest = db.query(func.min(Price.scraped_at)).filter(Price.scraped_at < upper).scalar()
+            if oldest is not None:
+                rebuild_daily_rollups(db, _day_start(oldest), upper)
+                db.commit()
+            _drop_partition(db, name)
+        result["partitions_dropped"] = len(to_drop)
+    else:
+        oldest = db.query(func.min(Price.scraped_at)).scalar()
+        if oldest is not None:
+            day = _day_start(oldest)
+            while day < cutoff:
+                following = day + timedelta(days=1)
+                rebuild_daily_rollups(db, day, following)
+                result["prices_deleted"] += db.query(Price).filter(
+                    Price.scraped_at >= day, Price.scraped_at < following
+                ).delete(synchronize_session=False)
+                db.commit()
+                day = following
+
+    rollup_cutoff = (now - timedelta(days=PRICE_ROLLUP_RETENTION_DAYS)).date()
+    result["rollups_deleted"] = db.query(PriceDailyRollup).filter(
+        PriceDailyRollup.day < rollup_cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    logger.info(f"Compacted price history: {result}")
+    return result
+
+def history_resolution(start: datetime, end: datetime, now: Optional[datetime] = None) -> str:
+    """Resolution for `auto`: raw rows for short, retained ranges, daily rollups otherwise"""
+    now = now or datetime.now(timezone.utc)
+    retained = start >= now - timedelta(days=PRICE_HISTORY_RETENTION_DAYS)
+    return "raw" if retained and end - start <= timedelta(days=HISTORY_RAW_MAX_DAYS) else "day"
+
+def read_price_history(db, product_id: int, start: datetime, end: datetime, resolution: str, limit: int,
+                       after: Optional[tuple] = None, vendor_id: Optional[int] = None) -> Tuple[List[Dict], Optional[tuple]]:
+    """One keyset page of a product's price history in [start, end).
+
+    Raw pages are ordered by (scraped_at, id) and day pages by (day,
+    vendor_id); `after` is the key of the last row of the previous page.
+    Returns the rows and the key to continue from, or None on the last page.
+    """
+    if resolution == "raw":
+        query = db.query(Price.id, Price.vendor_id, Vendor.name, Price.currency, Price.scraped_at, Price.price).join(
+            Vendor, Vendor.id == Price.vendor_id
+        ).filter(Price.product_id == product_id, Price.scraped_at >= start, Price.scraped_at < end)
+        if vendor_id is not None:
+            query = query.filter(Price.vendor_id == vendor_id)
+        if after is not None:
+            scraped_at, last_id = after
+            query = query.filter(or_(Price.scraped_at > scraped_at,
+                                     and_(Price.scraped_at == scraped_at, Price.id > last_id)))
+        found = query.order_by(Price.scraped_at, Price.id).limit(limit + 1).all()
+        rows = [{'vendor_id': v_id, 'vendor': name, 'currency': currency,
+                 't': as_utc(scraped_at), 'price': float(price), 'key': (as_utc(scraped_at), row_id)}
+                for row_id, v_id, name, currency, scraped_at, price in found]
+    else:
+        # A range ending mid-day includes that day's rollup
+        end_day = end.date() if end.time() == datetime.min.time() else end.date() + timedelta(days=1)
+        query = db.query(PriceDailyRollup, Vendor.name).join(Vendor, Vendor.id == PriceDailyRollup.vendor_id).filter(
+            PriceDailyRollup.product_id == product_id,
+            PriceDailyRollup.day >= start.date(),
+            PriceDailyRollup.day < end_day
+        )
+        if vendor_id is not None:
+            query = query.filter(PriceDailyRollup.vendor_id == vendor_id)
+        if after is not None:
+            day, last_vendor = after
+            query = query.filter(or_(PriceDailyRollup.day > day,
+                                     and_(PriceDailyRollup.day == day, PriceDailyRollup.vendor_id > last_vendor)))
+        found = query.order_by(PriceDailyRollup.day, PriceDailyRollup.vendor_id).limit(limit + 1).all()
+        rows = [{'vendor_id': rollup.vendor_id, 'vendor': name, 'currency': rollup.currency, 't': rollup.day,
+                 'price': round(float(rollup.price_sum) / rollup.sample_count, 2),
+                 'min': float(rollup.min_price), 'max': float(rollup.max_price), 'samples': rollup.sample_count,
+                 'key': (rollup.day, rollup.vendor_id)}
+                for rollup, name in found]
+
+    next_key = rows[limit - 1]['key'] if len(rows) > limit else None
+    return rows[:limit], next_key
+
+def lttb(xs: List[float], ys: List[float], threshold: int) -> List[int]:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of `threshold - 2`
+    equal buckets between them, the point forming the largest triangle
+    with the previously kept point and the next bucket's average, which
+    preserves peaks and dips that plain striding would skip.
+    """
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    kept = [0]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = int(bucket * every) + 1, int((bucket + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((bucket + 2) * every) + 1, count)
+        avg_x = sum(xs[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_y = sum(ys[next_lo:next_hi]) / (next_hi - next_lo)
+
+        best, best_area = lo, -1.0
+        px, py = xs[previous], ys[previous]
+        for i in range(lo, hi):
+            area = abs((px - avg_x) * (ys[i] - py) - (px - xs[i]) * (avg_y - py))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+def _x(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value.toordinal())
+
+def downsample_series(rows: List[Dict], max_points: int) -> List[Dict]:
+    """Split history rows into one series per vendor, each LTTB-downsampled to `max_points`"""
+    by_vendor = defaultdict(list)
+    for row in rows:
+        by_vendor[row['vendor_id']].append(row)
+
+    series = []
+    for vendor_id, points in by_vendor.items():
+        kept = lttb([_x(p['t']) for p in points], [p['price'] for p in points], max_points)
+        series.append({
+            'vendor_id': vendor_id,
+            'vendor': points[0]['vendor'],
+            'currency': points[-1]['currency'],
+            'points': [{k: v for k, v in points[i].items() if k not in ('vendor_id', 'vendor', 'currency', 'key')}
+                       for i in kept]
+        })
+    return series
@@ -0,0 +1,308 @@
+"""
+Price Store - Reads fresh stored prices for searches and persists scraped offers
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from models import Product, Price, CurrentPrice, Vendor, Country, Category
+from price_history import as_utc, upsert_current_prices, update_daily_rollups
+from product_matcher import ProductNormalizer
+
+logger = logging.getLogger(__name__)
+
+# Category assigned to products first seen through a search
+DEFAULT_CATEGORY = "Uncategorized"
+
+# Shortest token InnoDB indexes for FULLTEXT (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN = int(os.getenv("FULLTEXT_MIN_TOKEN", "3"))
+
+# Searches served from the result cache are counted in memory and written to
+# products.search_count at most this often (seconds)
+DEMAND_FLUSH_INTERVAL = float(os.getenv("DEMAND_FLUSH_INTERVAL", "30"))
+
+@dataclass
+class SearchPlan:
+    """How to answer one search: stored offers plus the vendors to scrape live"""
+    stored_offers: List[Dict] = field(default_factory=list)
+    vendors_to_scrape: Optional[List[str]] = None  # None means every vendor
+    product_ids: List[int] = field(default_factory=list)
+
+def write_current_prices(db, rows: List[Dict], scraped_at: Optional[datetime] = None):
+    """Record `rows` as the latest prices for their (product, vendor) pairs.
+
+    Rows are appended to the prices history, upserted into current_prices
+    and folded into their day's rollup, so no existing history row is
+    touched. The caller commits.
+    """
+    scraped_at = scraped_at or datetime.now(timezone.utc)
+    rows = [dict(row, scraped_at=scraped_at) for row in rows]
+    db.bulk_insert_mappings(Price, rows)
+    upsert_current_prices(db, rows)
+    update_daily_rollups(db, rows)
+
+def _flatten_offers(products: Iterable[Dict]) -> Iterable[Dict]:
+    """Yield each matched group as (representative, offers in the group)"""
+    for product in products:
+        yield product, [product] + list(product.get('alternatives') or [])
+
+class PriceStore:
+    """Database side of the hybrid search path"""
+
+    def __init__(self, session_factory=SessionLocal, normalizer: Optional[ProductNormalizer] = None,
+                 resolve_limit: int = 50):
+        self.session_factory = session_factory
+        self.normalizer = normalizer or ProductNormalizer()
+        self.resolve_limit = resolve_limit
+        self._demand: Counter = Counter()
+        self._demand_lock = threading.Lock()
+        self._demand_flushed = time.monotonic()
+
+    def plan_search(self, country: str, query: str, vendor_slas: Dict[str, int]) -> SearchPlan:
+        """Resolve a query against stored products and split vendors by freshness.
+
+        `vendor_slas` maps each vendor searched for the country to the age
+        (seconds) beyond which its stored prices must be re-scraped. A vendor
+        is served from the database only when every matching current price
+        it has is within that SLA. Any database error falls back to scraping
+        every vendor.
+        """
+        if not vendor_slas:
+            return SearchPlan()
+
+        db = self.session_factory()
+        try:
+            tokens = self.normalizer.normalize_name(query).split()
+            if not tokens:
+                return SearchPlan()
+
+            query = db.query(Product.id, Product.name).filter(
+                *[Product.normalized_name.like(f"%{self._escape_like(token)}%", escape="\\")
+                  for token in tokens]
+            )
+            # '%token%' cannot use an index; on MySQL the FULLTEXT index picks
+            # the candidates and LIKE only checks those
+            indexed = [token for token in tokens if len(token) >= FULLTEXT_MIN_TOKEN]
+            if indexed and db.get_bind().dialect.name == "mysql":
+                query = query.filter(text("MATCH (products.normalized_name) AGAINST (:terms IN BOOLEAN MODE)")
+                                     .bindparams(terms=" ".join(f"+{token}*" for token in indexed)))
+            products = query.limit(self.resolve_limit).all()
+            if not products:
+                return SearchPlan()
+
+            names = dict(products)
+            rows = db.query(CurrentPrice, Vendor.name).join(Vendor, Vendor.id == CurrentPrice.vendor_id).join(
+                Country, Country.id == Vendor.country_id
+            ).filter(
+                CurrentPrice.product_id.in_(list(names)),
+                Country.code == country.upper(),
+                Vendor.name.in_(list(vendor_slas))
+            ).all()
+
+            now = datetime.now(timezone.utc)
+            offers_by_vendor = defaultdict(list)
+            stale_vendors = set()
+            for price, vendor_name in rows:
+                cutoff = now - timedelta(seconds=vendor_slas[vendor_name])
+                scraped_at = as_utc(price.scraped_at)
+                if scraped_at is None or scraped_at < cutoff:
+                    stale_vendors.add(vendor_name)
+                    continue
+                offers_by_vendor[vendor_name].append({
+                    'name': names[price.product_id],
+                    'price': float(price.price),
+                    'currency': price.currency,
+                    'url': price.product_url,
+                    'vendor': vendor_name,
+                    'availability': price.availability or 'in_stock',
+                    'original_price': float(price.original_price) if price.original_price is not None else None,
+                    'discount_percentage': float(price.discount_percentage) if price.discount_percentage is not None else None,
+                    'product_id': price.product_id,
+                    'source': 'stored',
+                })
+
+            fresh_vendors = set(offers_by_vendor) - stale_vendors
+            return SearchPlan(
+                stored_offers=[offer for vendor in fresh_vendors for offer in offers_by_vendor[vendor]],
+                vendors_to_scrape=[name for name in vendor_slas if name not in fresh_vendors],
+                product_ids=sorted(names)
+            )
+
+        except Exception as e:
+            logger.error(f"Error planning search from stored prices: {str(e)}")
+            return SearchPlan()
+        finally:
+            db.close()
+
+    def store_search_results(self, country: str, products: List[Dict], vendor_base_urls: Dict[str, str]) -> int:
+        """Persist scraped offers from matched search results.
+
+        Each matched group maps to one canonical Product: the one any of its
+        offers was read from, else the product keyed by the representative's
+        normalized name. Offers that came from the database are not
+        rewritten, so reading a price never resets its freshness. Each
+        representative's `product_id` is set to the product it was stored
+        under. Returns the number of prices written.
+        """
+        db = self.session_factory()
+        try:
+            groups = list(_flatten_offers(products))
+            if not groups:
+                return 0
+
+            vendor_ids = self._ensure_vendors(db, country, products, vendor_base_urls)
+            # A group that includes a stored offer already has its product
+            known_ids = [next((offer['product_id'] for offer in offers if offer.get('product_id')), None)
+                         for _, offers in groups]
+            product_ids = self._ensure_products(
+                db, [rep for (rep, _), known in zip(groups, known_ids) if known is None]
+            )
+
+            rows = {}
+            touched = set()
+            for (representative, offers), known in zip(groups, known_ids):
+                product_id = known or product_ids[self._canonical_name(representative)]
+                representative['product_id'] = product_id
+                touched.add(product_id)
+                for offer in offers:
+                    if offer.get('source') == 'stored' or offer.get('vendor') not in vendor_ids:
+                        continue
+                    # One current price per (product, vendor): keep the cheapest listing
+                    key = (product_id, vendor_ids[offer['vendor']])
+                    if key in rows and rows[key]['price'] <= offer['price']:
+                        continue
+                    rows[key] = {
+                        'product_id': product_id,
+                        'vendor_id': key[1],
+                        'price': offer['price'],
+                        'currency': offer['currency'],
+                        'original_price': offer.get('original_price'),
+                        'discount_percentage': offer.get('discount_percentage'),
+                        'availability': offer.get('availability', 'in_stock'),
+                        'product_url': offer['url'],
+                    }
+
+            if rows:
+                write_current_prices(db, list(rows.values()))
+
+            # Demand signal for the refresh scheduler
+            db.query(Product).filter(Product.id.in_(touched)).update({
+                Product.search_count: Product.search_count + 1,
+                Product.last_searched_at: datetime.now(timezone.utc)
+            }, synchronize_session=False)
+
+            db.commit()
+            return len(rows)
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def record_demand(self, product_ids: Iterable[int]) -> bool:
+        """Count a search answered without the database (a result cache hit).
+
+        Returns True when a flush_demand() is due.
+        """
+        with self._demand_lock:
+            self._demand.update(product_ids)
+            return bool(self._demand) and time.monotonic() - self._demand_flushed >= DEMAND_FLUSH_INTERVAL
+
+    def flush_demand(self):
+        """Add the counted cache-hit searches to products.search_count"""
+        with self._demand_lock:
+            pending, self._demand = self._demand, Counter()
+            self._demand_flushed = time.monotonic()
+        if not pending:
+            return
+
+        # One UPDATE per distinct count rather than one per product
+        by_count = defaultdict(list)
+        for product_id, count in pending.items():
+            by_count[count].append(product_id)
+
+        db = self.session_factory()
+        try:
+            now = datetime.now(timezone.utc)
+            for count, ids in by_count.items():
+                db.query(Product).filter(Product.id.in_(ids)).update({
+                    Product.search_count: Product.search_count + count,
+                    Product.last_searched_at: now
+                }, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recording search demand: {str(e)}")
+        finally:
+            db.close()
+
+    def _canonical_name(self, product: Dict) -> str:
+        return (product.get('normalized_name') or self.normalizer.normalize_name(product['name']))[:255]
+
+    def _ensure_products(self, db, representatives: List[Dict]) -> Dict[str, int]:
+        """Map canonical names to Product ids, creating missing products"""
+        by_name = {self._canonical_name(rep): rep for rep in representatives}
+        if not by_name:
+            return {}
+        existing = dict(db.query(Product.normalized_name, Product.id).filter(
+            Product.normalized_name.in_(list(by_name))
+        ).all())
+
+        missing = [name for name in by_name if name not in existing]
+        if missing:
+            category_id = self._default_category_id(db)
+            for name in missing:
+                rep = by_name[name]
+                product = Product(
+                    name=rep['name'][:255],
+                    normalized_name=name,
+                    category_id=category_id,
+                    brand=rep.get('brand'),
+                    search_count=0
+                )
+                db.add(product)
+                db.flush()
+                existing[name] = product.id
+
+        return existing
+
+    def _default_category_id(self, db) -> int:
+        category = db.query(Category).filter(Category.name == DEFAULT_CATEGORY).first()
+        if category is None:
+            category = Category(name=DEFAULT_CATEGORY)
+            db.add(category)
+            db.flush()
+        return category.id
+
+    def _ensure_vendors(self, db, country: str, products: List[Dict], vendor_base_urls: Dict[str, str]) -> Dict[str, int]:
+        """Map vendor names to ids for the country, registering vendors on first sight"""
+        country_row = db.query(Country).filter(Country.code == country.upper()).first()
+        if country_row is None:
+            currency = products[0].get('currency', 'USD')
+            country_row = Country(code=country.upper(), name=country.upper(), currency=currency)
+            db.add(country_row)
+            db.flush()
+
+        vendor_ids = dict(db.query(Vendor.name, Vendor.id).filter(
+            Vendor.country_id == country_row.id
+        ).all())
+        for name, base_url in vendor_base_urls.items():
+            if name not in vendor_ids:
+                vendor = Vendor(name=name, base_url=base_url, country_id=country_row.id)
+                db.add(vendor)
+                db.flush()
+                vendor_ids[name] = vendor.id
+        return vendor_ids
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -8,12 +8,11 @@ from typing import List, Dict, Tuple, Optional, Set
 from collections import defaultdict
 from dataclasses import dataclass
 
-import pandas as pd
-from fuzzywuzzy import fuzz, process
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from timing import timed
+from metrics import MATCH_GROUP_SIZE
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -142,11 +141,19 @@ class ProductMatcher:
     def __init__(self, config: Optional[MatchConfig] = None):
         self.config = config or MatchConfig()
         self.normalizer = ProductNormalizer()
-        self.vectorizer = TfidfVectorizer(
-            ngram_range=(1, 3),
-            max_features=5000,
-            stop_words='english'
-        )
+        self._vectorizer = None
+
+    @property
+    def vectorizer(self):
+        """TF-IDF vectorizer, built on first use so importing sklearn stays off the startup path"""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._vectorizer = TfidfVectorizer(
+                ngram_range=(1, 3),
+                max_features=5000,
+                stop_words='english'
+            )
+        return self._vectorizer
 
     def match_and_deduplicate(self, products: List[Dict]) -> List[Dict]:
         """Main method to match and deduplicate products"""
@@ -156,7 +163,8 @@ class ProductMatcher:
         logger.info(f"Starting product matching for {len(products)} products")
 
         # Normalize product names
-        normalized_products = self._normalize_products(products)
+        with timed("match.normalize"):
+            normalized_products = self._normalize_products(products)
 
         # Group by category/brand if possible
         grouped_products = self._group_products_by_category(normalized_products)
@@ -164,11 +172,13 @@ class ProductMatcher:
         # Find matches within each group
         all_matched_groups = []
         for group in grouped_products:
+            MATCH_GROUP_SIZE.observe(len(group))
             matched_groups = self._find_matches_in_group(group)
             all_matched_groups.extend(matched_groups)
 
         # Merge matches and select best representatives
-        final_products = self._merge_matches(all_matched_groups)
+        with timed("match.merge"):
+            final_products = self._merge_matches(all_matched_groups)
 
         logger.info(f"Product matching completed. {len(final_products)} unique products found")
         return final_products
@@ -221,15 +231,19 @@ class ProductMatcher:
             return [products] if products else []
 
         # Calculate similarity matrix
-        similarity_matrix = self._calculate_similarity_matrix(products)
+        with timed("match.similarity"):
+            similarity_matrix = self._calculate_similarity_matrix(products)
 
         # Find clusters of similar products
-        clusters = self._cluster_similar_products(products, similarity_matrix)
+        with timed("match.cluster"):
+            clusters = self._cluster_similar_products(products, similarity_matrix)
 
         return clusters
 
     def _calculate_similarity_matrix(self, products: List[Dict]) -> np.ndarray:
         """Calculate similarity between all product pairs"""
+        from fuzzywuzzy import fuzz
+
         n = len(products)
         similarity_matrix = np.zeros((n, n))
 
@@ -387,6 +401,8 @@ class ProductMatcher:
 
     def calculate_match_confidence(self, product1: Dict, product2: Dict) -> float:
         """Calculate confidence score for two products being the same"""
+        from fuzzywuzzy import fuzz
+
         name_sim = fuzz.token_sort_ratio(
             product1.get('normalized_name', ''),
             product2.get('normalized_name', '')
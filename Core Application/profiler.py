@@ -0,0 +1,117 @@
+"""
+Profiler - On-demand sampling CPU profiles and tracemalloc allocation profiles as collapsed stacks
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+# Innermost functions of a thread that is waiting rather than working
+IDLE_FUNCTIONS = {"wait", "select", "poll", "accept", "_wait_for_tstate_lock", "get"}
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process"""
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _collapse(frame, thread_name: str) -> str:
+    """Root-first `thread;outer;...;inner` stack, the flamegraph collapsed format"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", "_"))
+    return ";".join(reversed(labels))
+
+def format_collapsed(counts: Counter) -> str:
+    """One `stack count` line per stack, heaviest first (flamegraph.pl / speedscope input)"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+class SamplingProfiler:
+    """Statistical profiler: a thread snapshots every other thread's stack at a fixed interval.
+
+    Nothing is hooked into the interpreter, so the profiled code runs at full
+    speed; the cost is one stack walk per thread per sample, on the sampler.
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = 0
+
+    def run(self, seconds: float) -> Counter:
+        """Sample for `seconds` (blocking the calling thread) and return stack counts"""
+        counts: Counter = Counter()
+        me = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                counts[_collapse(frame, names.get(thread_id, f"thread-{thread_id}"))] += 1
+            del frame
+            self.samples += 1
+            time.sleep(self.interval)
+        return counts
+
+# Allocations made by tracemalloc itself are not part of the workload
+_SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+def allocation_profile(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> Counter:
+    """Bytes allocated (and still live) between two snapshots, by allocating stack"""
+    counts: Counter = Counter()
+    before, after = before.filter_traces(_SNAPSHOT_FILTERS), after.filter_traces(_SNAPSHOT_FILTERS)
+    for diff in after.compare_to(before, "traceback"):
+        if diff.size_diff <= 0:
+            continue
+        # tracemalloc tracebacks are most recent call first
+        frames = [f"{os.path.basename(f.filename)}:{f.lineno}" for f in reversed(diff.traceback)]
+        counts[";".join(frames)] += diff.size_diff
+    return counts
+
+class Profiler:
+    """Runs at most one profile at a time in this process"""
+
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _acquire(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._lock.locked():
+            raise ProfilerBusy("A profile is already running in this worker")
+        return self._lock
+
+    async def cpu(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+        """Collapsed stacks sampled from every thread while the worker keeps serving"""
+        async with self._acquire():
+            sampler = SamplingProfiler(interval, include_idle)
+            counts = await asyncio.get_running_loop().run_in_executor(None, sampler.run, seconds)
+            return format_collapsed(counts)
+
+    async def memory(self, seconds: float, frames: int = 25) -> str:
+        """Collapsed stacks weighted by bytes allocated during the window and not yet freed"""
+        async with self._acquire():
+            # Snapshots walk every live allocation; on a large heap that takes
+            # seconds, so they and the diff run off the event loop
+            loop = asyncio.get_running_loop()
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start(frames)
+            try:
+                before = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+                await asyncio.sleep(seconds)
+                after = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+            finally:
+                if started:
+                    tracemalloc.stop()
+            counts = await loop.run_in_executor(None, allocation_profile, before, after)
+            return format_collapsed(counts)
@@ -0,0 +1,72 @@
+"""
+Rate Limiter - Token bucket enforcing per-vendor request budgets
+"""
+import asyncio
+import time
+from typing import Optional
+
+class RateLimitExceeded(Exception):
+    """No token could be had within the caller's wait limit"""
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of `capacity`.
+
+    `min_interval` additionally spaces grants at least that many seconds
+    apart, as a robots.txt Crawl-delay requires.
+    """
+
+    def __init__(self, rate: float, capacity: float, min_interval: float = 0.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.min_interval = min_interval
+        self._updated = time.monotonic()
+        self._last_grant = float("-inf")
+
+    @classmethod
+    def per_period(cls, limit: int, period: float, share: float = 1.0) -> "TokenBucket":
+        """Bucket for `share` of `limit` requests every `period` seconds"""
+        return cls(rate=limit * share / period, capacity=max(limit * share, 1.0))
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0, reserve: float = 0.0) -> bool:
+        """Take tokens without waiting, leaving at least `reserve` in the bucket"""
+        self._refill()
+        if self.tokens - tokens >= reserve and self._updated - self._last_grant >= self.min_interval:
+            self.tokens -= tokens
+            self._last_grant = self._updated
+            return True
+        return False
+
+    def penalize(self, seconds: float):
+        """Hand out no tokens for `seconds`, e.g. after a Retry-After response"""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def wait_time(self, tokens: float = 1.0, reserve: float = 0.0) -> float:
+        """Seconds until `tokens` could be taken, ignoring other waiters"""
+        self._refill()
+        return max(
+            (tokens + reserve - self.tokens) / self.rate,
+            self._last_grant + self.min_interval - self._updated,
+            0.0
+        )
+
+    async def acquire(self, tokens: float = 1.0, reserve: float = 0.0,
+                      max_wait: Optional[float] = None) -> float:
+        """Wait until tokens are available; returns the seconds spent waiting.
+
+        Raises RateLimitExceeded, without waiting it out, as soon as the
+        tokens cannot be had within `max_wait` seconds of the call.
+        """
+        start = time.monotonic()
+        while not self.try_acquire(tokens, reserve):
+            wait = max(self.wait_time(tokens, reserve), 0.01)
+            if max_wait is not None and time.monotonic() - start + wait > max_wait:
+                raise RateLimitExceeded(f"No rate-limit token within {max_wait:g}s")
+            await asyncio.sleep(wait)
+        return time.monotonic() - start
@@ -0,0 +1,56 @@
+"""
+Retry Policy - Backoff, Retry-After parsing and retry rules for vendor fetches
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Methods that can be repeated without side effects (RFC 9110 section 9.2.2)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Responses that say "try again later" rather than "this will never work"
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+@dataclass
+class RetryPolicy:
+    """How a vendor fetch is retried.
+
+    Retries use full-jitter exponential backoff: attempt n sleeps a random
+    time in [0, min(max_delay, base_delay * 2**(n-1))]. All attempts,
+    including waits, must finish within `deadline` seconds of the first.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+    deadline: float = 15.0
+
+    def backoff(self, attempt: int) -> float:
+        """Jittered delay before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def should_retry(self, attempt: int, method: str = "GET", http_status: Optional[int] = None) -> bool:
+        """Whether a failed attempt may be repeated.
+
+        `http_status` is None for connection errors and timeouts, which are
+        retried like a retryable status.
+        """
+        if attempt >= self.max_attempts or method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        return http_status is None or http_status in RETRYABLE_STATUSES
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
@@ -0,0 +1,252 @@
+"""
+Robots - Cached, pre-compiled robots.txt rules for vendor hosts
+"""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# RFC 9309 requires parsing at least the first 500 KiB
+MAX_ROBOTS_BYTES = 500 * 1024
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    rule: Optional[Tuple[int, bool]] = None  # (pattern length, allow)
+
+class RobotsRules:
+    """Allow/disallow rules for one user agent, compiled for fast lookups.
+
+    Plain path prefixes go into a character trie, so a lookup walks the path
+    once; the rare patterns using `*` or `$` are compiled to regexes. As in
+    RFC 9309 the longest matching pattern wins and Allow wins a tie.
+    """
+
+    def __init__(self, rules: Optional[List[Tuple[str, bool]]] = None, crawl_delay: Optional[float] = None):
+        self.crawl_delay = crawl_delay
+        self._root = _TrieNode()
+        self._patterns: List[Tuple[re.Pattern, int, bool]] = []
+        for pattern, allow in rules or []:
+            self._add(pattern, allow)
+
+    @classmethod
+    def allow_all(cls) -> "RobotsRules":
+        return cls()
+
+    @classmethod
+    def disallow_all(cls) -> "RobotsRules":
+        return cls([("/", False)])
+
+    def _add(self, pattern: str, allow: bool):
+        if "*" in pattern or pattern.endswith("$"):
+            anchored = pattern.endswith("$")
+            body = pattern[:-1] if anchored else pattern
+            regex = ".*".join(re.escape(part) for part in body.split("*"))
+            self._patterns.append((re.compile(regex + ("$" if anchored else "")), len(pattern), allow))
+            return
+
+        node = self._root
+        for char in pattern:
+            node = node.children.setdefault(char, _TrieNode())
+        node.rule = self._better(node.rule, (len(pattern), allow))
+
+    @staticmethod
+    def _better(current: Optional[Tuple[int, bool]], candidate: Tuple[int, bool]) -> Tuple[int, bool]:
+        return candidate if current is None or candidate > current else current
+
+    def allows(self, path: str) -> bool:
+        """Whether `path` (including any query string) may be fetched"""
+        if path == "/robots.txt":
+            return True
+
+        best = self._root.rule
+        node = self._root
+        for char in path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.rule is not None:
+                best = self._better(best, node.rule)
+
+        for regex, length, allow in self._patterns:
+            if regex.match(path):
+                best = self._better(best, (length, allow))
+
+        return best is None or best[1]
+
+def robots_path(url: str) -> str:
+    """The part of `url` robots.txt rules are matched against"""
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """Compile the rules robots.txt `text` sets for `user_agent`.
+
+    Groups naming the user agent's product token are merged; if there are
+    none, the `*` groups apply.
+    """
+    token = user_agent.split("/")[0].strip().lower()
+    groups: List[Tuple[List[str], List[Tuple[str, bool]], List[float]]] = []
+    agents: List[str] = []
+    rules: List[Tuple[str, bool]] = []
+    delays: List[float] = []
+    in_rules = False
+
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        key = key.lower()
+
+        if key == "user-agent":
+            if in_rules:
+                groups.append((agents, rules, delays))
+                agents, rules, delays = [], [], []
+                in_rules = False
+            agents.append(value.lower())
+        elif key in ("allow", "disallow"):
+            in_rules = True
+            if value:  # An empty Disallow allows everything
+                rules.append((value, key == "allow"))
+        elif key == "crawl-delay":
+            in_rules = True
+            try:
+                delays.append(float(value))
+            except ValueError:
+                pass
+    groups.append((agents, rules, delays))
+
+    matched = [group for group in groups if token in group[0]] or [group for group in groups if "*" in group[0]]
+    merged_rules = [rule for _, group_rules, _ in matched for rule in group_rules]
+    merged_delays = [delay for _, _, group_delays in matched for delay in group_delays]
+    return RobotsRules(merged_rules, max(merged_delays) if merged_delays else None)
+
+class RobotsCache:
+    """Per-host robots.txt rules with a TTL and an optional shared Redis tier.
+
+    Rules are fetched once per host and served from memory afterwards. An
+    expired entry keeps being served while a background refresh runs, so
+    only the first request to a host in a process waits on robots.txt. With
+    `redis_url`, raw robots.txt bodies are shared between workers.
+    """
+
+    def __init__(self, user_agent: str, ttl: int = 86400, error_ttl: int = 300,
+                 fetch_timeout: float = 5.0, redis_url: Optional[str] = None):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.fetch_timeout = fetch_timeout
+        self.redis_url = redis_url
+        self._redis = None
+        self._entries: Dict[str, Tuple[RobotsRules, float]] = {}
+        self._fetches: Dict[str, asyncio.Task] = {}
+
+    async def rules_for(self, url: str, session: aiohttp.ClientSession) -> RobotsRules:
+        """Rules for the host of `url`"""
+        origin = self._origin(url)
+        entry = self._entries.get(origin)
+        if entry is not None:
+            rules, expires = entry
+            if time.monotonic() >= expires:
+                self._refresh(origin, session)
+            return rules
+        return await asyncio.shield(self._refresh(origin, session))
+
+    async def allowed(self, url: str, session: aiohttp.ClientSession) -> bool:
+        rules = await self.rules_for(url, session)
+        return rules.allows(robots_path(url))
+
+    def clear(self):
+        self._entries.clear()
+
+    def after_fork(self):
+        """Drop in-flight loads and the Redis client inherited from a parent process"""
+        self._fetches = {}
+        self._redis = None
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _refresh(self, origin: str, session: aiohttp.ClientSession) -> asyncio.Task:
+        """Start (or join) the single in-flight load for `origin`"""
+        task = self._fetches.get(origin)
+        if task is None or task.done():
+            task = asyncio.create_task(self._load(origin, session))
+            task.add_done_callback(lambda _: self._fetches.pop(origin, None))
+            self._fetches[origin] = task
+        return task
+
+    async def _load(self, origin: str, session: aiohttp.ClientSession) -> RobotsRules:
+        text = await self._redis_get(origin)
+        ttl = self.ttl
+        if text is None:
+            text, cacheable = await self._fetch(origin, session)
+            if cacheable:
+                await self._redis_set(origin, text)
+            else:
+                ttl = self.error_ttl
+
+        if text is not None:
+            rules = parse_robots(text, self.user_agent)
+        elif origin in self._entries:
+            # Server unreachable: keep the last rules we saw for a while
+            rules = self._entries[origin][0]
+        else:
+            rules = RobotsRules.disallow_all()
+
+        self._entries[origin] = (rules, time.monotonic() + ttl)
+        return rules
+
+    async def _fetch(self, origin: str, session: aiohttp.ClientSession) -> Tuple[Optional[str], bool]:
+        """Fetch robots.txt; returns (text, cacheable), text None if unreachable.
+
+        Per RFC 9309 a 4xx means no restrictions, while a 5xx or network
+        failure means the site must be treated as fully disallowed.
+        """
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.fetch_timeout)
+            async with session.get(f"{origin}/robots.txt", timeout=timeout) as response:
+                if response.status == 200:
+                    return (await response.text(errors="replace"))[:MAX_ROBOTS_BYTES], True
+                if 400 <= response.status < 500:
+                    return "", True
+                logger.warning(f"robots.txt for {origin} returned HTTP {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not fetch robots.txt for {origin}: {str(e)}")
+        return None, False
+
+    def _redis_client(self):
+        if self._redis is None and self.redis_url:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, socket_timeout=1.0)
+        return self._redis
+
+    async def _redis_get(self, origin: str) -> Optional[str]:
+        client = self._redis_client()
+        if client is None:
+            return None
+        try:
+            value = await client.get(f"robots:{origin}")
+        except Exception as e:
+            logger.warning(f"robots.txt cache read failed: {str(e)}")
+            return None
+        return value.decode("utf-8", errors="replace") if value is not None else None
+
+    async def _redis_set(self, origin: str, text: str):
+        client = self._redis_client()
+        if client is None:
+            return
+        try:
+            await client.set(f"robots:{origin}", text, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"robots.txt cache write failed: {str(e)}")
@@ -0,0 +1,173 @@
+"""
+Scrape Log Writer - Buffers scrape outcomes in memory and writes them to scraping_logs in batches
+"""
+import logging
+import os
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import Vendor, ScrapingLog
+from metrics import SCRAPE_LOG_RECORDS
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_LOG_ENABLED = os.getenv("SCRAPE_LOG_ENABLED", "true").lower() == "true"
+SCRAPE_LOG_BATCH_SIZE = int(os.getenv("SCRAPE_LOG_BATCH_SIZE", "200"))
+SCRAPE_LOG_FLUSH_INTERVAL = float(os.getenv("SCRAPE_LOG_FLUSH_INTERVAL", "2.0"))
+SCRAPE_LOG_MAX_QUEUE = int(os.getenv("SCRAPE_LOG_MAX_QUEUE", "10000"))
+
+@dataclass
+class ScrapeLogConfig:
+    """Configuration for batched scraping_logs writes"""
+    enabled: bool = SCRAPE_LOG_ENABLED
+    batch_size: int = SCRAPE_LOG_BATCH_SIZE  # Rows per INSERT; reaching it triggers a flush
+    flush_interval: float = SCRAPE_LOG_FLUSH_INTERVAL  # Max seconds a record waits
+    max_queue: int = SCRAPE_LOG_MAX_QUEUE
+    sample_above: float = 0.5  # Queue fill ratio where sampling starts
+
+class ScrapeLogWriter:
+    """Non-blocking ScrapingLog pipeline.
+
+    `log()` only appends to an in-memory queue, so it is safe on the event
+    loop. A flusher thread writes the queue as multi-row INSERTs when a
+    batch fills or `flush_interval` passes. If the database falls behind
+    and the queue passes `sample_above` full, new records are kept with a
+    probability that falls to zero as the queue fills; sampling is blind to
+    status, so per-vendor success ratios stay representative.
+    """
+
+    def __init__(self, config: Optional[ScrapeLogConfig] = None,
+                 session_factory: Callable = SessionLocal):
+        self.config = config or ScrapeLogConfig()
+        self.session_factory = session_factory
+        self._queue: deque = deque()
+        self._vendor_ids: Dict[str, int] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()  # Serializes flushes
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def log(self, vendor_name: str, status: str, products_found: int = 0,
+            response_time_ms: Optional[int] = None, error_message: Optional[str] = None):
+        """Queue one scrape outcome; never blocks on the database"""
+        if not self.config.enabled:
+            return
+        if not self._accept():
+            return
+
+        self._queue.append({
+            "vendor_name": vendor_name,
+            "status": status,
+            "products_found": products_found,
+            "response_time_ms": response_time_ms,
+            "error_message": error_message[:1000] if error_message else None,
+            "timestamp": datetime.now(timezone.utc),
+        })
+        self._ensure_started()
+        if len(self._queue) >= self.config.batch_size:
+            self._wakeup.set()
+
+    def _accept(self) -> bool:
+        depth, limit = len(self._queue), self.config.max_queue
+        if depth >= limit:
+            SCRAPE_LOG_RECORDS.labels("dropped").inc()
+            return False
+        threshold = limit * self.config.sample_above
+        if depth >= threshold and random.random() >= (limit - depth) / (limit - threshold):
+            SCRAPE_LOG_RECORDS.labels("sampled_out").inc()
+            return False
+        return True
+
+    def _ensure_started(self):
+        # Threads do not survive fork: a forked worker starts its own flusher
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="scrape-log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.config.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns rows written"""
+        written = 0
+        with self._lock:
+            while self._queue:
+                batch = self._take(self.config.batch_size)
+                written += self._write(batch)
+        return written
+
+    def _take(self, count: int) -> List[Dict]:
+        batch = []
+        while self._queue and len(batch) < count:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _write(self, batch: List[Dict]) -> int:
+        db = self.session_factory()
+        try:
+            vendor_ids = self._resolve_vendor_ids(db, {record["vendor_name"] for record in batch})
+            rows = []
+            for record in batch:
+                vendor_id = vendor_ids.get(record["vendor_name"])
+                if vendor_id is None:
+                    continue
+                row = {k: v for k, v in record.items() if k != "vendor_name"}
+                row["vendor_id"] = vendor_id
+                rows.append(row)
+
+            if rows:
+                # Core insert on the table: one multi-row INSERT per batch (ORM bulk
+                # insert would split the batch by which columns are None)
+                db.execute(insert(ScrapingLog.__table__), rows)
+                db.commit()
+            SCRAPE_LOG_RECORDS.labels("written").inc(len(rows))
+            return len(rows)
+        except Exception as e:
+            db.rollback()
+            SCRAPE_LOG_RECORDS.labels("failed").inc(len(batch))
+            logger.warning(f"Could not write {len(batch)} scraping logs: {str(e)}")
+            return 0
+        finally:
+            db.close()
+
+    def _resolve_vendor_ids(self, db, names) -> Dict[str, int]:
+        missing = [name for name in names if name not in self._vendor_ids]
+        if missing:
+            for vendor_id, name in db.query(Vendor.id, Vendor.name).filter(Vendor.name.in_(missing)):
+                self._vendor_ids[name] = vendor_id
+        return self._vendor_ids
+
+    def close(self, timeout: float = 5.0):
+        """Stop the flusher and write what is left"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def after_fork(self):
+        """Forget the parent's queue and flusher thread"""
+        self._queue = deque()
+        self._thread = None
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
@@ -3,60 +3,182 @@
 Scraping Engine - Core component for fetching prices from multiple websites
 """
 import asyncio
+import os
 import time
 import random
 import logging
 from typing import List, Dict, Optional
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from urllib.parse import urljoin, urlparse
 import re
+from datetime import datetime, timedelta, timezone
 
 import aiohttp
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from fake_useragent import UserAgent
-from tenacity import retry, stop_after_attempt, wait_exponential
+from opentelemetry import trace
 
 from database import SessionLocal
 from models import Vendor, Country, ScrapingLog
+from rate_limiter import RateLimitExceeded, TokenBucket
+from fetch_scheduler import DEFAULT_MAX_WAITS, FetchScheduler, Priority
+from circuit_breaker import CircuitBreaker, BreakerConfig, BreakerState
+from retry_policy import RetryPolicy, parse_retry_after
+from robots import RobotsCache, robots_path
+from browser_pool import BrowserPool, BrowserPoolConfig, BrowserError
+from user_agents import random_user_agent
+from timing import record, stage_name, timed, trace_config
+from metrics import RATE_LIMIT_WAIT_SECONDS, observe_vendor_request
+from tracing import tracer
+from scrape_log_writer import ScrapeLogConfig, ScrapeLogWriter
 
 logger = logging.getLogger(__name__)
 
+USE_SELENIUM = os.getenv("USE_SELENIUM", "false").lower() == "true"
+RESPECT_ROBOTS_TXT = os.getenv("RESPECT_ROBOTS_TXT", "true").lower() == "true"
+ROBOTS_CACHE_TTL = int(os.getenv("ROBOTS_CACHE_TTL", "86400"))
+
+# Fraction of each vendor's rate_limit this process may spend. Buckets are per
+# process, so the shares of all API workers and Celery processes must sum to <= 1
+VENDOR_RATE_SHARE = float(os.getenv("VENDOR_RATE_SHARE", "1.0"))
+
+# Shared robots.txt tier; unset keeps the cache per process
+REDIS_URL = os.getenv("REDIS_URL")
+
+# ScrapingLog statuses of breaker transitions; these are not scrape outcomes
+CIRCUIT_LOG_STATUSES = [f"circuit_{state.value}" for state in BreakerState]
+
+# ScrapingLog status of a fetch skipped because this process's budget for the
+# vendor ran out; the vendor was never contacted, so it is not replayed either
+THROTTLED_STATUS = "throttled"
+NON_OUTCOME_STATUSES = CIRCUIT_LOG_STATUSES + [THROTTLED_STATUS]
+
+class FetchError(Exception):
+    """A vendor request that did not produce a usable page"""
+
+    def __init__(self, message: str, status: str = "error", http_status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status  # ScrapingLog status: error, rate_limited or blocked
+        self.http_status = http_status
+        self.retry_after = retry_after  # Seconds, from a Retry-After header
+
+@dataclass
+class ScrapeResult:
+    """Outcome of one vendor search"""
+    vendor: str
+    products: List[Dict]
+    status: str  # success, error, rate_limited, blocked
+    response_time_ms: int
+    error_message: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "success"
+
 @dataclass
 class ScrapingConfig:
     """Configuration for scraping operations"""
-    max_concurrent_requests: int = 5
+    max_concurrent_requests: int = 5  # Per vendor host
+    connection_pool_size: int = 100
+    max_concurrent_per_vendor: int = 2
+    rate_period: int = 3600  # Window for vendor rate_limit, in seconds (vendors.rate_period default)
+    rate_share: float = VENDOR_RATE_SHARE  # This process's fraction of each vendor's rate_limit
+    max_rate_waits: Dict[Priority, Optional[float]] = field(default_factory=lambda: dict(DEFAULT_MAX_WAITS))
+    freshness_sla: int = 3600  # Max age of stored prices served without scraping
     request_delay_min: float = 1.0
     request_delay_max: float = 3.0
     timeout: int = 30
-    max_retries: int = 3
-    use_selenium: bool = False
-    respect_robots_txt: bool = True
+    retry: RetryPolicy = field(default_factory=RetryPolicy)
+    use_selenium: bool = USE_SELENIUM  # Render vendors marked render_js in pooled browsers
+    browser: BrowserPoolConfig = field(default_factory=BrowserPoolConfig)
+    respect_robots_txt: bool = RESPECT_ROBOTS_TXT
+    robots_user_agent: str = "PriceComparisonBot"  # Token matched against robots.txt groups
+    robots_cache_ttl: int = ROBOTS_CACHE_TTL
+    redis_url: Optional[str] = REDIS_URL
+    breaker: BreakerConfig = field(default_factory=BreakerConfig)
+    scrape_log: ScrapeLogConfig = field(default_factory=ScrapeLogConfig)
+
+class LatencyTracker:
+    """Sliding window of recent response times for quantile estimates"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency_ms: float):
+        self._samples.append(latency_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
 
 class VendorScraper:
     """Base class for vendor-specific scrapers"""
 
+    # Responses needed before the p90 is trusted as a hedge delay
+    HEDGE_MIN_SAMPLES = 20
+
     def __init__(self, vendor_config: Dict):
         self.vendor_config = vendor_config
         self.name = vendor_config["name"]
         self.base_url = vendor_config["base_url"]
         self.selectors = vendor_config.get("selectors", {})
         self.search_url_pattern = vendor_config.get("search_url_pattern", "")
+        self.rate_limit = vendor_config.get("rate_limit", 60)
+        self.rate_period = vendor_config.get("rate_period")
+        self.freshness_sla = vendor_config.get("freshness_sla")
+
+        # Opt-in request hedging for vendors with a long latency tail
+        self.hedge = vendor_config.get("hedge", False)
+        self.hedge_quantile = vendor_config.get("hedge_quantile", 0.9)
+        self.hedge_proxy = vendor_config.get("hedge_proxy")
+        self.max_hedge_ratio = vendor_config.get("max_hedge_ratio", 0.1)
+
+        # JavaScript-only vendors are rendered in a pooled browser when available
+        self.render_js = vendor_config.get("render_js", False)
+        self.browser_pool: Optional[BrowserPool] = None  # Set by the engine
+        self.latency = LatencyTracker()
+        self.rate_limiter: Optional[TokenBucket] = None  # Set by the engine
+        self.retry_policy = RetryPolicy()
+        self._requests_sent = 0
+        self._hedges_sent = 0
 
     async def search_products(self, query: str, session: aiohttp.ClientSession) -> List[Dict]:
         """Search for products on this vendor"""
-        try:
-            search_url = self._build_search_url(query)
-            products = await self._scrape_search_results(search_url, session)
-            return products
-        except Exception as e:
-            logger.error(f"Error scraping {self.name}: {str(e)}")
-            return []
+        result = await self.scrape(query, session)
+        return result.products
+
+    async def scrape(self, query: str, session: aiohttp.ClientSession) -> ScrapeResult:
+        """Search for products and report how the request went"""
+        start_time = time.monotonic()
+        with tracer.start_as_current_span("vendor.scrape", attributes={"vendor": self.name}) as span:
+            try:
+                search_url = self._build_search_url(query)
+                products = await self._scrape_search_results(search_url, session)
+                status, error_message = "success", None
+            except FetchError as e:
+                logger.warning(f"Error scraping {self.name}: {str(e)}")
+                products, status, error_message = [], e.status, str(e)
+            except Exception as e:
+                logger.error(f"Error scraping {self.name}: {str(e)}")
+                products, status, error_message = [], "error", str(e) or type(e).__name__
+
+            span.set_attribute("scrape.status", status)
+            span.set_attribute("scrape.products", len(products))
+            if error_message:
+                span.set_status(trace.StatusCode.ERROR, error_message)
+
+        return ScrapeResult(
+            vendor=self.name,
+            products=products,
+            status=status,
+            response_time_ms=int((time.monotonic() - start_time) * 1000),
+            error_message=error_message
+        )
 
     def _build_search_url(self, query: str) -> str:
         """Build search URL from query"""
@@ -65,21 +187,173 @@ class VendorScraper:
         return f"{self.base_url}/search?q={query.replace(' ', '+')}"
 
     async def _scrape_search_results(self, url: str, session: aiohttp.ClientSession) -> List[Dict]:
-        """Scrape search results from URL"""
+        """Fetch a search page (with retries) and parse its products.
+
+        Raises FetchError when no attempt produced a usable page. Parse time
+        is recorded under the vendor's "parse" stage.
+        """
+        html = await self._fetch_with_retry(url, session)
+        with timed(stage_name(self.name, "parse")):
+            return self._parse_search_results(html, url)
+
+    async def _fetch_with_retry(self, url: str, session: aiohttp.ClientSession) -> str:
+        """GET a page, retrying transient failures within the retry deadline.
+
+        A Retry-After from the vendor is applied to its rate limiter, so every
+        request to the vendor backs off rather than just this one. Each retry
+        takes a rate-limit token, and a retry that cannot start before the
+        deadline is not attempted: the last error is raised instead.
+        """
+        policy = self.retry_policy
+        deadline = time.monotonic() + policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await asyncio.wait_for(self._fetch_attempt(url, session), deadline - time.monotonic())
+            except (FetchError, aiohttp.ClientError) as e:
+                error = e
+            except asyncio.TimeoutError:
+                if time.monotonic() >= deadline:
+                    raise FetchError(f"Deadline exceeded for {url} after {attempt} attempt(s)")
+                # The attempt's own timeout (aiohttp's total), not ours: transient
+                error = FetchError(f"Timed out fetching {url}")
+
+            # Honour Retry-After even when this error is final: later requests must back off too
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after and self.rate_limiter is not None:
+                self.rate_limiter.penalize(retry_after)
+
+            if not policy.should_retry(attempt, "GET", getattr(error, "http_status", None)):
+                raise error
+
+            delay = policy.backoff(attempt)
+            if self.rate_limiter is not None:
+                delay = max(delay, self.rate_limiter.wait_time())
+            if time.monotonic() + delay >= deadline:
+                raise error
+
+            logger.debug(f"Retrying {self.name} in {delay:.2f}s after: {str(error)}")
+            try:
+                await asyncio.wait_for(self._wait_for_retry(delay), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise error
+
+    async def _wait_for_retry(self, delay: float):
+        await asyncio.sleep(delay)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+    async def _fetch_attempt(self, url: str, session: aiohttp.ClientSession) -> str:
+        """One attempt at a page: rendered in a browser, fetched, or fetched with a hedge.
+
+        For hedged vendors, if the page has not arrived by the vendor's
+        observed latency quantile (`hedge_quantile`, p90 by default) a second
+        request is sent, through `hedge_proxy` if configured; see _fetch_hedged.
+        """
+        self._requests_sent += 1
+        if self.render_js and self.browser_pool is not None:
+            return await self._render_page(url)
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._fetch_page(url, session)
+        return await self._fetch_hedged(url, session, hedge_delay)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None if this request is not hedged"""
+        if not self.hedge or len(self.latency) < self.HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.quantile(self.hedge_quantile) / 1000
+
+    def _take_hedge_budget(self) -> bool:
+        """Hedges are capped by ratio and must fit in the vendor's rate limit"""
+        if self._hedges_sent >= self.max_hedge_ratio * self._requests_sent:
+            return False
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            return False
+        self._hedges_sent += 1
+        return True
+
+    async def _fetch_hedged(self, url: str, session: aiohttp.ClientSession, hedge_delay: float) -> str:
+        """Fetch, sending a backup request if none arrived within `hedge_delay`.
+
+        The backup needs hedge budget (see _take_hedge_budget). The first good
+        response wins and the other request is cancelled; if both fail, the
+        primary's error is raised.
+        """
+        primary = asyncio.create_task(self._fetch_page(url, session))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done or not self._take_hedge_budget():
+            return await primary
+
+        logger.debug(f"Hedging request to {self.name} after {hedge_delay * 1000:.0f}ms")
+        backup = asyncio.create_task(self._fetch_page(url, session, proxy=self.hedge_proxy))
+        pending = {primary, backup}
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    return self._parse_search_results(html, url)
-                else:
-                    logger.warning(f"HTTP {response.status} for {url}")
-                    return []
-        except Exception as e:
-            logger.error(f"Error fetching {url}: {str(e)}")
-            return []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, backup):
+                if not task.done():
+                    task.cancel()
+
+    async def _render_page(self, url: str) -> str:
+        """Load a page in a pooled browser; raises FetchError if rendering fails"""
+        start_time = time.monotonic()
+        try:
+            html = await self.browser_pool.fetch(self.name, url)
+        except BrowserError as e:
+            raise FetchError(str(e)) from e
+        elapsed_ms = (time.monotonic() - start_time) * 1000
+        self.latency.record(elapsed_ms)
+        record(stage_name(self.name, "render"), elapsed_ms)
+        return html
+
+    async def _fetch_page(self, url: str, session: aiohttp.ClientSession, proxy: Optional[str] = None) -> str:
+        """GET a page and return its HTML; raises FetchError on a bad response.
+
+        DNS, connect and time to first byte are recorded by the session's
+        trace config under the vendor's stage name; the body read is timed here.
+        """
+        start_time = time.monotonic()
+        stage = stage_name(self.name)
+        with tracer.start_as_current_span("vendor.fetch", attributes={"vendor": self.name, "http.url": url}) as span:
+            try:
+                async with session.get(url, proxy=proxy, trace_request_ctx={"stage": stage}) as response:
+                    span.set_attribute("http.status_code", response.status)
+                    if response.status == 200:
+                        with timed(f"{stage}.download"):
+                            body = await response.read()
+                            html = await response.text()  # Decodes the body read above
+                        elapsed = time.monotonic() - start_time
+                        self.latency.record(elapsed * 1000)
+                        observe_vendor_request(self.name, "200", elapsed, len(body))
+                        return html
+
+                    observe_vendor_request(self.name, str(response.status), time.monotonic() - start_time)
+                    if response.status == 429:
+                        status = "rate_limited"
+                    elif response.status in (403, 503):
+                        status = "blocked"
+                    else:
+                        status = "error"
+                    raise FetchError(
+                        f"HTTP {response.status} for {url}", status, response.status,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                observe_vendor_request(self.name, "error", time.monotonic() - start_time)
+                raise
 
     def _parse_search_results(self, html: str, base_url: str) -> List[Dict]:
         """Parse HTML and extract product information"""
+        from bs4 import BeautifulSoup  # Deferred: keeps bs4 off the API import path
+
         soup = BeautifulSoup(html, 'html.parser')
         products = []
 
@@ -159,6 +433,8 @@ class AmazonScraper(VendorScraper):
         return f"{self.base_url}/s?k={query.replace(' ', '+')}"
 
     def _parse_search_results(self, html: str, base_url: str) -> List[Dict]:
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, 'html.parser')
         products = []
 
@@ -202,98 +478,136 @@ class AmazonScraper(VendorScraper):
 class ScrapingEngine:
     """Main scraping engine that coordinates multiple vendor scrapers"""
 
-    def __init__(self, config: Optional[ScrapingConfig] = None):
+    def __init__(self, config: Optional[ScrapingConfig] = None,
+                 vendor_configs: Optional[Dict[str, List[Dict]]] = None):
         self.config = config or ScrapingConfig()
-        self.user_agent = UserAgent()
         self.vendor_scrapers = {}
-        self._load_vendor_configs()
-
-    def _load_vendor_configs(self):
+        self.scheduler = FetchScheduler(self.config.max_concurrent_per_vendor,
+                                        max_waits=self.config.max_rate_waits)
+        self._scrapers_by_name = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._seeding = False  # Replaying history into the breakers
+        self.browser_pool: Optional[BrowserPool] = None
+        if self.config.use_selenium:
+            self.browser_pool = BrowserPool(self.config.browser)
+        self.robots: Optional[RobotsCache] = None
+        if self.config.respect_robots_txt:
+            self.robots = RobotsCache(
+                self.config.robots_user_agent,
+                ttl=self.config.robots_cache_ttl,
+                redis_url=self.config.redis_url
+            )
+        self.log_writer = ScrapeLogWriter(self.config.scrape_log)
+        self._load_vendor_configs(vendor_configs)
+
+    def _load_vendor_configs(self, vendor_configs: Optional[Dict[str, List[Dict]]] = None):
         """Load vendor configurations for different countries"""
-        # This would typically be loaded from a database or config file
-        vendor_configs = {
-            'US': [
-                {
-                    'name': 'Amazon US',
-                    'base_url': 'https://www.amazon.com',
-                    'scraper_class': AmazonScraper,
-                    'rate_limit': 60
-                },
-                {
-                    'name': 'eBay US',
-                    'base_url': 'https://www.ebay.com',
-                    'scraper_class': VendorScraper,
-                    'search_url_pattern': 'https://www.ebay.com/sch/i.html?_nkw={query}',
-                    'rate_limit': 100
-                },
-                {
-                    'name': 'Walmart',
-                    'base_url': 'https://www.walmart.com',
-                    'scraper_class': VendorScraper,
-                    'search_url_pattern': 'https://www.walmart.com/search?q={query}',
-                    'rate_limit': 50
-                }
-            ],
-            'IN': [
-                {
-                    'name': 'Amazon India',
-                    'base_url': 'https://www.amazon.in',
-                    'scraper_class': AmazonScraper,
-                    'rate_limit': 60
-                },
-                {
-                    'name': 'Flipkart',
-                    'base_url': 'https://www.flipkart.com',
-                    'scraper_class': VendorScraper,
-                    'search_url_pattern': 'https://www.flipkart.com/search?q={query}',
-                    'rate_limit': 40
-                }
-            ]
-        }
+        if vendor_configs is None:
+            # This would typically be loaded from a database or config file
+            vendor_configs = {
+                'US': [
+                    {
+                        'name': 'Amazon US',
+                        'base_url': 'https://www.amazon.com',
+                        'scraper_class': AmazonScraper,
+                        'rate_limit': 60
+                    },
+                    {
+                        'name': 'eBay US',
+                        'base_url': 'https://www.ebay.com',
+                        'scraper_class': VendorScraper,
+                        'search_url_pattern': 'https://www.ebay.com/sch/i.html?_nkw={query}',
+                        'rate_limit': 100
+                    },
+                    {
+                        'name': 'Walmart',
+                        'base_url': 'https://www.walmart.com',
+                        'scraper_class': VendorScraper,
+                        'search_url_pattern': 'https://www.walmart.com/search?q={query}',
+                        'rate_limit': 50
+                    }
+                ],
+                'IN': [
+                    {
+                        'name': 'Amazon India',
+                        'base_url': 'https://www.amazon.in',
+                        'scraper_class': AmazonScraper,
+                        'rate_limit': 60
+                    },
+                    {
+                        'name': 'Flipkart',
+                        'base_url': 'https://www.flipkart.com',
+                        'scraper_class': VendorScraper,
+                        'search_url_pattern': 'https://www.flipkart.com/search?q={query}',
+                        'rate_limit': 40
+                    }
+                ]
+            }
 
         for country, vendors in vendor_configs.items():
             self.vendor_scrapers[country] = []
             for vendor_config in vendors:
+                vendor_config = dict(vendor_config)
                 scraper_class = vendor_config.pop('scraper_class', VendorScraper)
                 scraper = scraper_class(vendor_config)
                 self.vendor_scrapers[country].append(scraper)
+                self._scrapers_by_name[scraper.name] = scraper
+                self.breakers[scraper.name] = CircuitBreaker(
+                    scraper.name,
+                    self.config.breaker,
+                    on_state_change=self._on_breaker_change
+                )
+                scraper.rate_limiter = TokenBucket.per_period(
+                    scraper.rate_limit,
+                    scraper.rate_period or self.config.rate_period,
+                    share=self.config.rate_share
+                )
+                self.scheduler.register_vendor(scraper.name, scraper.rate_limiter)
+                scraper.retry_policy = self.config.retry
+                scraper.browser_pool = self.browser_pool
+
+    def vendor_freshness_slas(self, country: str) -> Dict[str, int]:
+        """Freshness SLA (seconds) of each vendor searched for a country"""
+        return {
+            scraper.name: scraper.freshness_sla or self.config.freshness_sla
+            for scraper in self.vendor_scrapers.get(country.upper(), [])
+        }
 
-    async def search_products(self, country: str, query: str) -> List[Dict]:
-        """Search for products across all vendors in a country"""
+    def vendor_base_urls(self, country: str) -> Dict[str, str]:
+        return {scraper.name: scraper.base_url for scraper in self.vendor_scrapers.get(country.upper(), [])}
+
+    async def search_products(self, country: str, query: str,
+                              priority: Priority = Priority.INTERACTIVE,
+                              vendors: Optional[List[str]] = None) -> List[Dict]:
+        """Search for products across all vendors in a country.
+
+        `priority` selects the scheduling lane: user-facing searches use
+        INTERACTIVE, refresh jobs BATCH or BACKGROUND. `vendors` restricts
+        the search to the named vendors.
+        """
         start_time = time.time()
 
         if country.upper() not in self.vendor_scrapers:
             raise ValueError(f"Country {country} not supported")
 
         scrapers = self.vendor_scrapers[country.upper()]
+        if vendors is not None:
+            scrapers = [scraper for scraper in scrapers if scraper.name in vendors]
 
-        # Create aiohttp session with proper configuration
-        connector = aiohttp.TCPConnector(limit=self.config.max_concurrent_requests)
-        timeout = aiohttp.ClientTimeout(total=self.config.timeout)
-
-        headers = {
-            'User-Agent': self.user_agent.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
+        session = await self.get_session()
 
-        async with aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers=headers
-        ) as session:
-            # Create tasks for concurrent scraping
-            tasks = []
-            for scraper in scrapers:
-                task = asyncio.create_task(
-                    self._scrape_with_delay(scraper, query, session)
-                )
-                tasks.append(task)
+        # Create tasks for concurrent scraping
+        tasks = []
+        for scraper in scrapers:
+            task = asyncio.create_task(
+                self._scrape_with_delay(scraper, query, session, priority)
+            )
+            tasks.append(task)
 
-            # Execute all scraping tasks
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Execute all scraping tasks
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Combine and clean results
         all_products = []
@@ -308,21 +622,166 @@ class ScrapingEngine:
 
         return all_products
 
-    async def _scrape_with_delay(self, scraper: VendorScraper, query: str, session: aiohttp.ClientSession) -> List[Dict]:
-        """Scrape with random delay to avoid rate limiting"""
-        delay = random.uniform(self.config.request_delay_min, self.config.request_delay_max)
-        await asyncio.sleep(delay)
+    async def search_vendor(self, vendor_name: str, query: str,
+                            priority: Priority = Priority.BATCH) -> List[Dict]:
+        """Search a single vendor by name, e.g. for background refreshes"""
+        scraper = self._scrapers_by_name.get(vendor_name)
+        if scraper is None:
+            raise ValueError(f"Vendor {vendor_name} not supported")
+
+        session = await self.get_session()
+        return await self._scrape_with_delay(scraper, query, session, priority)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the engine's pooled HTTP session for the running event loop.
+
+        The session (and its keep-alive connections) is shared by every
+        search handled by this process; it is recreated if the event loop
+        changes, e.g. in a forked worker.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.connection_pool_size,
+                limit_per_host=self.config.max_concurrent_requests,
+                ttl_dns_cache=300
+            )
+            timeout = aiohttp.ClientTimeout(total=self.config.timeout)
+
+            headers = {
+                'User-Agent': random_user_agent(),
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive',
+            }
 
-        return await scraper.search_products(query, session)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers=headers,
+                trace_configs=[trace_config()]
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the pooled HTTP session and any browsers, and flush queued scrape logs"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        if self.browser_pool is not None:
+            await self.browser_pool.close()
+        await asyncio.get_running_loop().run_in_executor(None, self.log_writer.close)
+
+    def after_fork(self):
+        """Drop fork-unsafe resources inherited from a parent process.
+
+        Scrapers, breakers and rate limiters are kept; the HTTP session,
+        browsers and robots.txt connections are re-created on first use.
+        """
+        self._session = None
+        self._session_loop = None
+        if self.browser_pool is not None:
+            self.browser_pool = BrowserPool(self.config.browser)
+            for scraper in self._scrapers_by_name.values():
+                scraper.browser_pool = self.browser_pool
+        if self.robots is not None:
+            self.robots.after_fork()
+        self.log_writer.after_fork()
+
+    async def _scrape_with_delay(self, scraper: VendorScraper, query: str, session: aiohttp.ClientSession,
+                                 priority: Priority = Priority.INTERACTIVE) -> List[Dict]:
+        """Scrape with random delay to avoid rate limiting"""
+        if not await self._robots_allow(scraper, query, session):
+            return []
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def _make_request_with_retry(self, session: aiohttp.ClientSession, url: str) -> str:
-        """Make HTTP request with retry logic"""
-        async with session.get(url) as response:
-            if response.status == 429:  # Rate limited
-                retry_after = int(response.headers.get('Retry-After', 60))
-                await asyncio.sleep(retry_after)
-                raise Exception("Rate limited, retrying...")
+        # Vendors with an open circuit are skipped without waiting on them
+        breaker = self.breakers[scraper.name]
+        if not breaker.allow_request():
+            logger.info(f"Skipping {scraper.name}: circuit {breaker.state.value}")
+            return []
 
-            response.raise_for_status()
-            return await response.text()
+        try:
+            delay = random.uniform(self.config.request_delay_min, self.config.request_delay_max)
+            await asyncio.sleep(delay)
+
+            # Wait for a vendor slot and rate-limit token in this priority lane
+            wait_start = time.monotonic()
+            async with self.scheduler.slot(scraper.name, priority):
+                waited = time.monotonic() - wait_start
+                RATE_LIMIT_WAIT_SECONDS.labels(scraper.name).observe(waited)
+                record(stage_name(scraper.name, "wait"), waited * 1000)
+                result = await scraper.scrape(query, session)
+        except RateLimitExceeded as e:
+            # Our own budget is spent; the vendor's health is unknown, not bad
+            breaker.release()
+            logger.info(f"Skipping {scraper.name}: {str(e)} ({priority.name})")
+            self.log_writer.log(scraper.name, THROTTLED_STATUS, error_message=str(e))
+            return []
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+
+        # Outcome first, so a transition it causes is logged after it
+        self.log_writer.log(result.vendor, result.status, len(result.products),
+                            result.response_time_ms, result.error_message)
+        breaker.record(result.ok, result.response_time_ms)
+        return result.products
+
+    async def _robots_allow(self, scraper: VendorScraper, query: str, session: aiohttp.ClientSession) -> bool:
+        """Check the vendor's cached robots.txt and apply its Crawl-delay"""
+        if self.robots is None:
+            return True
+
+        url = scraper._build_search_url(query)
+        rules = await self.robots.rules_for(url, session)
+        if scraper.rate_limiter is not None:
+            scraper.rate_limiter.min_interval = rules.crawl_delay or 0.0
+
+        if not rules.allows(robots_path(url)):
+            logger.info(f"Skipping {scraper.name}: search path disallowed by robots.txt")
+            return False
+        return True
+
+    def load_vendor_health(self, lookback_minutes: int = 30):
+        """Seed the circuit breakers from recent ScrapingLog rows.
+
+        Lets a freshly started worker skip vendors that other workers have
+        recently seen failing, instead of rediscovering it on live traffic.
+        Only real scrape outcomes are replayed, each at its own time, so an
+        old trip cools down from when it happened. Transitions caused by the
+        replay are not logged again.
+        """
+        db = SessionLocal()
+        self._seeding = True
+        try:
+            now = datetime.now(timezone.utc)
+            rows = db.query(Vendor.name, ScrapingLog.status, ScrapingLog.response_time_ms,
+                            ScrapingLog.timestamp).join(
+                ScrapingLog, ScrapingLog.vendor_id == Vendor.id
+            ).filter(
+                Vendor.name.in_(list(self.breakers)),
+                ScrapingLog.timestamp >= now - timedelta(minutes=lookback_minutes),
+                ScrapingLog.status.notin_(NON_OUTCOME_STATUSES)
+            ).order_by(ScrapingLog.timestamp).all()
+
+            clock = time.monotonic()
+            for vendor_name, status, response_time_ms, timestamp in rows:
+                if timestamp.tzinfo is None:
+                    timestamp = timestamp.replace(tzinfo=timezone.utc)
+                age = max((now - timestamp).total_seconds(), 0.0)
+                self.breakers[vendor_name].record(status == "success", response_time_ms or 0, at=clock - age)
+        except Exception as e:
+            logger.warning(f"Could not load vendor health from scraping logs: {str(e)}")
+        finally:
+            self._seeding = False
+            db.close()
+
+    def _on_breaker_change(self, vendor_name: str, old_state: BreakerState, new_state: BreakerState):
+        """Queue breaker transitions for ScrapingLog alongside the scrape outcomes"""
+        if self._seeding:
+            return
+        self.log_writer.log(vendor_name, f"circuit_{new_state.value}",
+                            error_message=f"circuit {old_state.value} -> {new_state.value}")
@@ -0,0 +1,120 @@
+"""
+Search Cache - Short-lived cache of matched search results with HTTP validators
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+@dataclass
+class CachedSearch:
+    """Response-ready products for one (country, query) plus their validators"""
+    products: List[Dict]
+    etag: str
+    scraped_at: float
+    product_ids: List[int] = field(default_factory=list)  # Stored products the results map to
+
+    def age(self, now: Optional[float] = None) -> int:
+        """Seconds since the underlying results were scraped"""
+        now = time.time() if now is None else now
+        return max(int(now - self.scraped_at), 0)
+
+def compute_etag(products: List[Dict]) -> str:
+    """Build a weak ETag from the result content, independent of input order.
+
+    The ETag is weak because the response body also carries per-request
+    fields (search_time_ms) that do not change the results themselves.
+    """
+    ordered = sorted(products, key=lambda p: (float(p["price"]), p["link"], p["vendor"]))
+    digest = hashlib.sha256(orjson.dumps(ordered, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def variant_etag(etag: str, *variant) -> str:
+    """Derive the ETag of one representation (page, options) of a result set"""
+    digest = hashlib.sha256(orjson.dumps([etag, *variant])).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+class SearchCache:
+    """In-process LRU cache of search results with a fixed TTL.
+
+    Expired entries are kept for up to `max_stale` seconds so that an
+    overloaded worker can still answer from them.
+    """
+
+    def __init__(self, ttl: int = 300, max_entries: int = 1024, max_stale: int = 3600):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[Tuple[str, str], CachedSearch]" = OrderedDict()
+
+    @staticmethod
+    def _key(country: str, query: str) -> Tuple[str, str]:
+        return country.upper(), " ".join(query.lower().split())
+
+    def get(self, country: str, query: str, allow_stale: bool = False) -> Optional[CachedSearch]:
+        """Return a fresh entry for the search (or a stale one, if allowed)"""
+        key = self._key(country, query)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        age = entry.age()
+        if age >= self.ttl + self.max_stale:
+            del self._entries[key]
+            return None
+        if age >= self.ttl and not allow_stale:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, country: str, query: str, products: List[Dict],
+            scraped_at: Optional[float] = None, product_ids: Optional[List[int]] = None) -> CachedSearch:
+        """Store response-ready products and return the new entry"""
+        entry = CachedSearch(
+            products=products,
+            etag=compute_etag(products),
+            scraped_at=time.time() if scraped_at is None else scraped_at,
+            product_ids=list(product_ids or [])
+        )
+        key = self._key(country, query)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def cache_headers(self, entry: CachedSearch) -> Dict[str, str]:
+        """HTTP caching headers derived from the TTL and the scrape timestamp.
+
+        max-age is the full TTL; downstream caches subtract Age themselves.
+        """
+        return {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={self.ttl}",
+            "Age": str(entry.age()),
+        }
@@ -0,0 +1,111 @@
+"""
+Timing - Per-request stage timings and Server-Timing headers
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import aiohttp
+
+from metrics import observe_stage
+from tracing import tracer
+
+class Timings:
+    """Milliseconds spent per stage while handling one request"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, ms: float):
+        # Stages can repeat (retries, several groups); their time adds up
+        self.stages[stage] = self.stages.get(stage, 0.0) + ms
+
+    def as_dict(self) -> Dict[str, float]:
+        return {stage: round(ms, 1) for stage, ms in self.stages.items()}
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total: bool = False) -> str:
+        """Server-Timing header value, e.g. `plan;dur=3.1, scrape;dur=812.4`"""
+        entries = [f"{stage};dur={ms:.1f}" for stage, ms in self.stages.items()]
+        if total:
+            entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+_current: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+
+def record(stage: str, ms: float):
+    """Add a stage duration to the stage histogram and the current request"""
+    observe_stage(stage, ms)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, ms)
+
+@contextmanager
+def timed(stage: str):
+    """Time a block as `stage`, also tracing it as a span of the same name"""
+    start = time.perf_counter()
+    try:
+        with tracer.start_as_current_span(stage):
+            yield
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000)
+
+@contextmanager
+def collect_timings():
+    """Collect the stages recorded by this task (and tasks/threads it starts)"""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+def stage_name(*parts: str) -> str:
+    """Join parts into a Server-Timing-safe token, e.g. ("Amazon US", "ttfb") -> amazon-us.ttfb"""
+    return ".".join(re.sub(r"[^a-z0-9]+", "-", part.lower()).strip("-") for part in parts)
+
+def trace_config() -> aiohttp.TraceConfig:
+    """aiohttp tracing that records DNS, connect and time to first byte.
+
+    Only requests made with `trace_request_ctx={"stage": prefix}` are
+    recorded, as `<prefix>.dns`, `<prefix>.connect` and `<prefix>.ttfb`.
+    """
+    config = aiohttp.TraceConfig()
+
+    def prefix(ctx) -> Optional[str]:
+        return (ctx.trace_request_ctx or {}).get("stage")
+
+    async def on_request_start(session, ctx, params):
+        ctx.request_start = time.perf_counter()
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        if prefix(ctx):
+            record(f"{prefix(ctx)}.dns", (time.perf_counter() - ctx.dns_start) * 1000)
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        if prefix(ctx):
+            record(f"{prefix(ctx)}.connect", (time.perf_counter() - ctx.connect_start) * 1000)
+
+    async def on_request_end(session, ctx, params):
+        # Fires once response headers are in
+        if prefix(ctx):
+            record(f"{prefix(ctx)}.ttfb", (time.perf_counter() - ctx.request_start) * 1000)
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connect_start)
+    config.on_connection_create_end.append(on_connect_end)
+    config.on_request_end.append(on_request_end)
+    return config
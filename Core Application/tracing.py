@@ -0,0 +1,126 @@
+"""
+Tracing - OpenTelemetry spans for the API, scrapers, matcher and Celery tasks
+"""
+import functools
+import logging
+import os
+from typing import Callable, Dict, Optional, Tuple
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.propagators.textmap import Getter
+
+logger = logging.getLogger(__name__)
+
+# none, console, memory (tests) or otlp (needs opentelemetry-exporter-otlp-proto-http)
+OTEL_TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "price-comparison")
+
+# Spans go nowhere until configure_tracing() installs an SDK provider
+tracer = trace.get_tracer("price_comparison")
+
+_exporter = None
+_configured = False
+
+def configure_tracing(exporter: str = OTEL_TRACES_EXPORTER, service_name: str = OTEL_SERVICE_NAME):
+    """Install the SDK tracer provider for this process, once.
+
+    Returns the span exporter (an InMemorySpanExporter for "memory"), or
+    None when tracing is off or the SDK is not installed.
+    """
+    global _exporter, _configured
+    if _configured or exporter == "none":
+        return _exporter
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    except ImportError:
+        logger.warning("opentelemetry-sdk is not installed; tracing disabled")
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if exporter == "memory":
+        _exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_exporter))
+    elif exporter == "console":
+        _exporter = ConsoleSpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_exporter))
+    elif exporter == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("opentelemetry-exporter-otlp-proto-http is not installed; tracing disabled")
+            return None
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        _exporter = OTLPSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(_exporter))
+    else:
+        logger.warning(f"Unknown OTEL_TRACES_EXPORTER {exporter}; tracing disabled")
+        return None
+
+    trace.set_tracer_provider(provider)
+    _configured = True
+    logger.info(f"Tracing enabled with the {exporter} exporter")
+    return _exporter
+
+def in_current_context(func: Callable) -> Callable:
+    """Bind a sync callable to the trace context active now.
+
+    Background tasks run after the request span has ended; binding keeps
+    their spans in the request's trace.
+    """
+    captured = context.get_current()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = context.attach(captured)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            context.detach(token)
+    return wrapper
+
+class _RequestGetter(Getter):
+    """Read trace headers that Celery copies onto task.request"""
+
+    def get(self, carrier, key):
+        value = getattr(carrier, key, None)
+        return None if value is None else [value]
+
+    def keys(self, carrier):
+        return []
+
+# task_id -> (span, context token) for tasks running in this process
+_task_spans: Dict[str, Tuple[trace.Span, object]] = {}
+
+def _inject_task_headers(headers: Optional[dict] = None, **kwargs):
+    if headers is not None:
+        propagate.inject(headers)
+
+def _start_task_span(task_id: str = None, task=None, **kwargs):
+    parent = propagate.extract(task.request, getter=_RequestGetter())
+    span = tracer.start_span(task.name, context=parent, kind=trace.SpanKind.CONSUMER,
+                             attributes={"celery.task_id": task_id})
+    _task_spans[task_id] = (span, context.attach(trace.set_span_in_context(span)))
+
+def _end_task_span(task_id: str = None, state: str = None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, token = entry
+    if state:
+        span.set_attribute("celery.state", state)
+    if state == "FAILURE":
+        span.set_status(trace.StatusCode.ERROR)
+    context.detach(token)
+    span.end()
+
+def instrument_celery():
+    """Carry trace context through task messages and wrap each task run in a span"""
+    from celery.signals import before_task_publish, task_postrun, task_prerun
+
+    before_task_publish.connect(_inject_task_headers, weak=False)
+    task_prerun.connect(_start_task_span, weak=False)
+    task_postrun.connect(_end_task_span, weak=False)
@@ -25,8 +25,24 @@ celery_app.conf.update(
     enable_utc=True,
     task_routes={
         'tasks.scrape_vendor': {'queue': 'scraping'},
+        'tasks.refresh_vendor_prices': {'queue': 'scraping'},
         'tasks.update_prices': {'queue': 'pricing'},
-    }
+        'tasks.schedule_refreshes': {'queue': 'pricing'},
+        'tasks.compact_price_history': {'queue': 'pricing'},
+    },
+    beat_schedule={
+        'schedule-price-refreshes': {
+            'task': 'tasks.schedule_refreshes',
+            'schedule': float(os.getenv('REFRESH_INTERVAL_SECONDS', '900')),
+        },
+        'compact-price-history': {
+            'task': 'tasks.compact_price_history',
+            'schedule': 24 * 3600.0,
+        },
+    },
+    # Refresh chunks are long-running; don't let one process hoard them
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
 )
 
 if __name__ == '__main__':
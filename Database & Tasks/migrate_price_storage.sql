@@ -0,0 +1,91 @@
+-- Upgrade an existing MySQL database created from the original schema to the
+-- current price storage layout (price_comparison_schema.sql has the result).
+-- New tables alone would be created by init_db(), but create_all() never
+-- alters existing tables. Run once, with the API and Celery workers stopped:
+--   mysql price_comparison < migrate_price_storage.sql
+-- Check the foreign key names with SHOW CREATE TABLE prices first; the ones
+-- below are MySQL's defaults for the original unnamed constraints.
+
+-- Products: search demand for the refresh scheduler, FULLTEXT for search resolution
+ALTER TABLE products
+    ADD COLUMN search_count INT DEFAULT 0 AFTER image_url,
+    ADD COLUMN last_searched_at TIMESTAMP NULL AFTER search_count,
+    ADD FULLTEXT INDEX ft_normalized_name (normalized_name);
+
+-- Scraping logs: throttled skips and circuit-breaker transitions
+ALTER TABLE scraping_logs
+    MODIFY status ENUM('success', 'error', 'rate_limited', 'blocked', 'throttled',
+                       'circuit_open', 'circuit_half_open', 'circuit_closed') NOT NULL;
+
+-- Current prices: the newest row of each (product, vendor)
+CREATE TABLE current_prices (
+    product_id INT NOT NULL,
+    vendor_id INT NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    currency VARCHAR(3) NOT NULL,
+    original_price DECIMAL(10,2) NULL,
+    discount_percentage DECIMAL(5,2) NULL,
+    availability VARCHAR(50) DEFAULT 'in_stock',
+    product_url VARCHAR(500) NOT NULL,
+    scraped_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (product_id, vendor_id),
+    FOREIGN KEY (product_id) REFERENCES products(id),
+    FOREIGN KEY (vendor_id) REFERENCES vendors(id),
+    INDEX idx_current_vendor (vendor_id)
+);
+
+INSERT INTO current_prices (product_id, vendor_id, price, currency, original_price, discount_percentage,
+                            availability, product_url, scraped_at)
+SELECT p.product_id, p.vendor_id, p.price, p.currency, p.original_price, p.discount_percentage,
+       p.availability, p.product_url, COALESCE(p.scraped_at, CURRENT_TIMESTAMP)
+FROM prices p
+JOIN (SELECT MAX(id) AS id FROM prices GROUP BY product_id, vendor_id) latest ON latest.id = p.id;
+
+-- Daily rollups, backfilled from the whole history
+CREATE TABLE price_daily_rollups (
+    product_id INT NOT NULL,
+    vendor_id INT NOT NULL,
+    day DATE NOT NULL,
+    currency VARCHAR(3) NOT NULL,
+    min_price DECIMAL(10,2) NOT NULL,
+    max_price DECIMAL(10,2) NOT NULL,
+    price_sum DECIMAL(14,2) NOT NULL,
+    sample_count INT NOT NULL,
+    PRIMARY KEY (product_id, vendor_id, day),
+    FOREIGN KEY (product_id) REFERENCES products(id),
+    FOREIGN KEY (vendor_id) REFERENCES vendors(id),
+    INDEX idx_rollup_day (day)
+);
+
+INSERT INTO price_daily_rollups (product_id, vendor_id, day, currency, min_price, max_price, price_sum, sample_count)
+SELECT product_id, vendor_id, DATE(scraped_at), MAX(currency), MIN(price), MAX(price), SUM(price), COUNT(*)
+FROM prices
+WHERE scraped_at IS NOT NULL
+GROUP BY product_id, vendor_id, DATE(scraped_at);
+
+-- Prices: append-only and partitioned by month. Partitioned tables cannot
+-- have foreign keys, and scraped_at must be part of the primary key.
+ALTER TABLE prices
+    DROP FOREIGN KEY prices_ibfk_1,
+    DROP FOREIGN KEY prices_ibfk_2;
+
+UPDATE prices SET scraped_at = CURRENT_TIMESTAMP WHERE scraped_at IS NULL;
+
+ALTER TABLE prices
+    DROP INDEX idx_current_prices,
+    DROP INDEX idx_product_vendor,
+    DROP COLUMN is_current,
+    MODIFY scraped_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, scraped_at),
+    ADD INDEX idx_product_vendor (product_id, vendor_id, scraped_at),
+    ADD INDEX idx_product_scraped (product_id, scraped_at);
+
+-- Everything starts in p_future; the daily compact_price_history task splits
+-- off monthly partitions from the current month on. Rows older than that stay
+-- in the first monthly partition until it passes retention and is dropped
+-- (after its rollups are rebuilt from its oldest row).
+ALTER TABLE prices
+    PARTITION BY RANGE (UNIX_TIMESTAMP(scraped_at)) (
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
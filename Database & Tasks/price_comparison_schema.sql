@@ -46,16 +46,42 @@ CREATE TABLE products (
     sku VARCHAR(100),
     description TEXT,
     image_url VARCHAR(500),
+    search_count INT DEFAULT 0,
+    last_searched_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (category_id) REFERENCES categories(id),
     INDEX idx_normalized_name (normalized_name),
-    INDEX idx_brand_model (brand, model)
+    INDEX idx_brand_model (brand, model),
+    FULLTEXT INDEX ft_normalized_name (normalized_name)
 );
 
--- Prices table
+-- Prices table: append-only history, partitioned by month of scraped_at.
+-- MySQL requires the partition column in every unique key and does not allow
+-- foreign keys on partitioned tables. Months are split off p_future ahead of
+-- time and dropped after retention by tasks.compact_price_history.
 CREATE TABLE prices (
-    id INT PRIMARY KEY AUTO_INCREMENT,
+    id INT NOT NULL AUTO_INCREMENT,
+    product_id INT NOT NULL,
+    vendor_id INT NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    currency VARCHAR(3) NOT NULL,
+    original_price DECIMAL(10,2) NULL,
+    discount_percentage DECIMAL(5,2) NULL,
+    availability VARCHAR(50) DEFAULT 'in_stock',
+    product_url VARCHAR(500) NOT NULL,
+    scraped_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, scraped_at),
+    INDEX idx_product_vendor (product_id, vendor_id, scraped_at),
+    INDEX idx_product_scraped (product_id, scraped_at),
+    INDEX idx_scraped_at (scraped_at)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(scraped_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Current prices: one row per (product, vendor), upserted on every write
+CREATE TABLE current_prices (
     product_id INT NOT NULL,
     vendor_id INT NOT NULL,
     price DECIMAL(10,2) NOT NULL,
@@ -64,13 +90,27 @@ CREATE TABLE prices (
     discount_percentage DECIMAL(5,2) NULL,
     availability VARCHAR(50) DEFAULT 'in_stock',
     product_url VARCHAR(500) NOT NULL,
-    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    is_current BOOLEAN DEFAULT TRUE,
+    scraped_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (product_id, vendor_id),
+    FOREIGN KEY (product_id) REFERENCES products(id),
+    FOREIGN KEY (vendor_id) REFERENCES vendors(id),
+    INDEX idx_current_vendor (vendor_id)
+);
+
+-- Daily price rollups, maintained incrementally; avg = price_sum / sample_count
+CREATE TABLE price_daily_rollups (
+    product_id INT NOT NULL,
+    vendor_id INT NOT NULL,
+    day DATE NOT NULL,
+    currency VARCHAR(3) NOT NULL,
+    min_price DECIMAL(10,2) NOT NULL,
+    max_price DECIMAL(10,2) NOT NULL,
+    price_sum DECIMAL(14,2) NOT NULL,
+    sample_count INT NOT NULL,
+    PRIMARY KEY (product_id, vendor_id, day),
     FOREIGN KEY (product_id) REFERENCES products(id),
     FOREIGN KEY (vendor_id) REFERENCES vendors(id),
-    INDEX idx_product_vendor (product_id, vendor_id),
-    INDEX idx_scraped_at (scraped_at),
-    INDEX idx_current_prices (is_current, product_id)
+    INDEX idx_rollup_day (day)
 );
 
 -- Product matching table
@@ -90,7 +130,8 @@ CREATE TABLE product_matches (
 CREATE TABLE scraping_logs (
     id INT PRIMARY KEY AUTO_INCREMENT,
     vendor_id INT NOT NULL,
-    status ENUM('success', 'error', 'rate_limited', 'blocked') NOT NULL,
+    status ENUM('success', 'error', 'rate_limited', 'blocked', 'throttled',
+                'circuit_open', 'circuit_half_open', 'circuit_closed') NOT NULL,
     products_found INT DEFAULT 0,
     error_message TEXT NULL,
     response_time_ms INT NULL,
@@ -1,17 +1,152 @@
-
 """
 Background tasks for the price comparison tool
 """
+import os
+import math
+import asyncio
 import logging
-from typing import List, Dict
-from celery import current_app
-from database import SessionLocal
-from models import Product, Price, Vendor, ScrapingLog
-from scraping_engine import ScrapingEngine
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
+from celery import current_app, group
+from celery.signals import worker_process_init
+from sqlalchemy import func
+from database import SessionLocal, dispose_after_fork
+from models import Product, Price, CurrentPrice, Vendor, ScrapingLog
+from scraping_engine import ScrapingEngine, ScrapingConfig
 from product_matcher import ProductMatcher
+from fetch_scheduler import Priority
+from price_store import write_current_prices
+from price_history import compact_price_history as compact_history
+from tracing import configure_tracing, instrument_celery
 
 logger = logging.getLogger(__name__)
 
+# Products refreshed by one task; each chunk shares a single vendor
+REFRESH_CHUNK_SIZE = int(os.getenv("REFRESH_CHUNK_SIZE", "50"))
+
+# Adaptive refresh scheduling (see schedule_refreshes)
+REFRESH_INTERVAL_SECONDS = int(os.getenv("REFRESH_INTERVAL_SECONDS", "900"))
+REFRESH_BUDGET = int(os.getenv("REFRESH_BUDGET", "500"))
+REFRESH_VENDOR_SHARE = float(os.getenv("REFRESH_VENDOR_SHARE", "0.5"))
+REFRESH_HISTORY_DAYS = int(os.getenv("REFRESH_HISTORY_DAYS", "30"))
+REFRESH_MIN_SCORE = float(os.getenv("REFRESH_MIN_SCORE", "0.05"))
+
+# Task messages carry the publisher's trace context; each run gets a span
+instrument_celery()
+
+# Per-process scraping state, reused by every task this worker runs
+_engine: Optional[ScrapingEngine] = None
+_matcher: Optional[ProductMatcher] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+@worker_process_init.connect
+def _reset_worker_state(**kwargs):
+    """Drop state inherited from the parent so each child builds its own"""
+    global _engine, _matcher, _loop
+    _engine, _matcher, _loop = None, None, None
+    dispose_after_fork()
+    configure_tracing()
+
+def get_engine() -> ScrapingEngine:
+    global _engine
+    if _engine is None:
+        _engine = ScrapingEngine()
+    return _engine
+
+def get_matcher() -> ProductMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = ProductMatcher()
+    return _matcher
+
+def run_async(coro):
+    """Run a coroutine on this worker's long-lived event loop.
+
+    Keeping one loop per process lets the engine's pooled HTTP session
+    (and its keep-alive connections) survive across tasks.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+def group_product_ids_by_vendor(rows: List[Tuple[int, int]]) -> Dict[int, List[int]]:
+    """Group (vendor_id, product_id) pairs into sorted, de-duplicated id lists"""
+    grouped = defaultdict(set)
+    for vendor_id, product_id in rows:
+        grouped[vendor_id].add(product_id)
+    return {vendor_id: sorted(ids) for vendor_id, ids in grouped.items()}
+
+def chunked(items: List[int], size: int) -> List[List[int]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def select_best_offer(product: Dict, offers: List[Dict], matcher: ProductMatcher) -> Optional[Dict]:
+    """Pick the scraped offer that most confidently matches a stored product"""
+    normalizer = matcher.normalizer
+    reference = {
+        'normalized_name': normalizer.normalize_name(product['name']),
+        'specifications': normalizer.extract_specifications(product['name']),
+        'price': product.get('price', 0),
+    }
+
+    best, best_score = None, matcher.config.min_similarity_score
+    for offer in offers:
+        candidate = {
+            'normalized_name': normalizer.normalize_name(offer.get('name', '')),
+            'specifications': normalizer.extract_specifications(offer.get('name', '')),
+            'price': offer.get('price', 0),
+        }
+        score = matcher.calculate_match_confidence(reference, candidate)
+        if score >= best_score:
+            best, best_score = offer, score
+    return best
+
+def score_refresh_candidate(observations: int, distinct_prices: int, span_hours: float,
+                            age_hours: float, search_count: int) -> float:
+    """Score how much re-scraping one (product, vendor) price is worth.
+
+    Price changes are treated as a Poisson process whose rate is estimated
+    from the history (with one pseudo-change as a prior, so sparse history
+    still gets refreshed). The score is the probability the price changed
+    since it was last scraped, weighted up by how often it is searched.
+    """
+    changes = max(distinct_prices - 1, 0) if observations else 0
+    change_rate = (changes + 1) / max(span_hours, 24.0)  # changes per hour
+    p_changed = 1.0 - math.exp(-change_rate * max(age_hours, 0.0))
+    return p_changed * (1.0 + math.log1p(search_count or 0))
+
+def vendor_refresh_budget(rate_limit: int, rate_period: int) -> int:
+    """Scrapes one scheduling run may spend at a vendor"""
+    per_run = (rate_limit or 0) * REFRESH_INTERVAL_SECONDS / max(rate_period or ScrapingConfig.rate_period, 1)
+    return int(per_run * REFRESH_VENDOR_SHARE)
+
+def plan_refreshes(candidates: List[Dict], vendor_budgets: Dict[int, int], budget: int) -> Dict[int, List[int]]:
+    """Greedily pick the highest-scoring candidates within vendor and global budgets"""
+    remaining = dict(vendor_budgets)
+    planned = defaultdict(list)
+    for candidate in sorted(candidates, key=lambda c: c['score'], reverse=True):
+        if budget <= 0:
+            break
+        vendor_id = candidate['vendor_id']
+        if candidate['score'] < REFRESH_MIN_SCORE or remaining.get(vendor_id, 0) <= 0:
+            continue
+        planned[vendor_id].append(candidate['product_id'])
+        remaining[vendor_id] -= 1
+        budget -= 1
+    return dict(planned)
+
+def dispatch_refreshes(by_vendor: Dict[int, List[int]]) -> int:
+    """Fan out per-vendor chunks of product ids; returns the task count"""
+    signatures = [
+        refresh_vendor_prices.s(vendor_id, chunk)
+        for vendor_id, ids in by_vendor.items()
+        for chunk in chunked(ids, REFRESH_CHUNK_SIZE)
+    ]
+    if signatures:
+        group(signatures).apply_async()
+    return len(signatures)
+
 @current_app.task
 def scrape_vendor(vendor_id: int, query: str) -> Dict:
     """Background task to scrape a specific vendor"""
@@ -21,13 +156,15 @@ def scrape_vendor(vendor_id: int, query: str) -> Dict:
         if not vendor:
             return {"error": "Vendor not found"}
 
-        # Implement vendor-specific scraping logic
         logger.info(f"Scraping vendor {vendor.name} for query: {query}")
+        products = run_async(get_engine().search_vendor(vendor.name, query, Priority.BATCH))
 
-        # This would use the scraping engine
-        # results = scraping_engine.scrape_vendor(vendor, query)
-
-        return {"status": "completed", "vendor_id": vendor_id}
+        return {
+            "status": "completed",
+            "vendor_id": vendor_id,
+            "products_found": len(products),
+            "products": products
+        }
 
     except Exception as e:
         logger.error(f"Error scraping vendor {vendor_id}: {str(e)}")
@@ -37,18 +174,179 @@ def scrape_vendor(vendor_id: int, query: str) -> Dict:
 
 @current_app.task
 def update_prices(product_ids: List[int]) -> Dict:
-    """Background task to update prices for specific products"""
+    """Background task to update prices for specific products.
+
+    Products are grouped by the vendors currently listing them and fanned
+    out as a group of per-vendor chunks, so each refresh task hits a single
+    vendor and writes its results back in one batch.
+    """
     db = SessionLocal()
     try:
-        updated_count = 0
-        for product_id in product_ids:
-            # Update price logic here
-            updated_count += 1
+        rows = db.query(CurrentPrice.vendor_id, CurrentPrice.product_id).filter(
+            CurrentPrice.product_id.in_(product_ids)
+        ).all()
+
+        by_vendor = group_product_ids_by_vendor(rows)
+        task_count = dispatch_refreshes(by_vendor)
 
-        return {"status": "completed", "updated_count": updated_count}
+        return {
+            "status": "dispatched",
+            "vendor_count": len(by_vendor),
+            "task_count": task_count
+        }
 
     except Exception as e:
         logger.error(f"Error updating prices: {str(e)}")
         return {"error": str(e)}
     finally:
         db.close()
+
+@current_app.task
+def refresh_vendor_prices(vendor_id: int, product_ids: List[int]) -> Dict:
+    """Re-scrape one vendor for a chunk of products and store prices in bulk.
+
+    Products this process has no rate budget for within the background
+    lane's max wait are skipped rather than waited out; their prices stay
+    stale, so the next scheduling run picks them again.
+    """
+    db = SessionLocal()
+    try:
+        vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
+        if not vendor:
+            return {"error": "Vendor not found"}
+
+        products = db.query(Product).filter(Product.id.in_(product_ids)).all()
+        last_prices = dict(db.query(CurrentPrice.product_id, CurrentPrice.price).filter(
+            CurrentPrice.vendor_id == vendor_id,
+            CurrentPrice.product_id.in_(product_ids)
+        ).all())
+
+        engine = get_engine()
+
+        async def scrape_all():
+            return await asyncio.gather(*[
+                engine.search_vendor(vendor.name, product.name, Priority.BACKGROUND)
+                for product in products
+            ], return_exceptions=True)
+
+        results = run_async(scrape_all())
+
+        matcher = get_matcher()
+        new_prices = []
+        for product, offers in zip(products, results):
+            if isinstance(offers, Exception):
+                logger.warning(f"Refresh of product {product.id} at {vendor.name} failed: {offers}")
+                continue
+
+            reference = {'name': product.name, 'price': float(last_prices.get(product.id) or 0)}
+            offer = select_best_offer(reference, offers, matcher)
+            if offer is None:
+                continue
+
+            new_prices.append({
+                'product_id': product.id,
+                'vendor_id': vendor_id,
+                'price': offer['price'],
+                'currency': offer['currency'],
+                'original_price': offer.get('original_price'),
+                'discount_percentage': offer.get('discount_percentage'),
+                'availability': offer.get('availability', 'in_stock'),
+                'product_url': offer['url'],
+            })
+
+        if new_prices:
+            write_current_prices(db, new_prices)
+            db.commit()
+
+        logger.info(f"Refreshed {len(new_prices)}/{len(products)} prices at {vendor.name}")
+        return {"status": "completed", "vendor_id": vendor_id, "updated_count": len(new_prices)}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error refreshing prices at vendor {vendor_id}: {str(e)}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+@current_app.task
+def schedule_refreshes() -> Dict:
+    """Periodic task (celery beat) that decides which stored prices to re-scrape.
+
+    Every current (product, vendor) price is scored from its change history,
+    the product's search popularity and its age; the best candidates are
+    refreshed within REFRESH_BUDGET and each vendor's share of its rate limit.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=REFRESH_HISTORY_DAYS)
+
+        history = db.query(
+            Price.product_id,
+            Price.vendor_id,
+            func.count(Price.id),
+            func.count(func.distinct(Price.price)),
+            func.min(Price.scraped_at),
+            func.max(Price.scraped_at)
+        ).filter(Price.scraped_at >= since).group_by(Price.product_id, Price.vendor_id).all()
+
+        current = db.query(CurrentPrice.product_id, CurrentPrice.vendor_id, CurrentPrice.scraped_at,
+                           Product.search_count).join(Product, Product.id == CurrentPrice.product_id).all()
+
+        stats = {(row[0], row[1]): row[2:] for row in history}
+        candidates = []
+        for product_id, vendor_id, scraped_at, search_count in current:
+            observations, distinct_prices, first_seen, last_seen = stats.get(
+                (product_id, vendor_id), (0, 0, scraped_at, scraped_at)
+            )
+            candidates.append({
+                'product_id': product_id,
+                'vendor_id': vendor_id,
+                'score': score_refresh_candidate(
+                    observations,
+                    distinct_prices,
+                    _hours_between(first_seen, last_seen),
+                    _hours_between(scraped_at, now),
+                    search_count
+                )
+            })
+
+        vendor_budgets = {
+            vendor.id: vendor_refresh_budget(vendor.rate_limit, vendor.rate_period)
+            for vendor in db.query(Vendor).filter(Vendor.is_active == True, Vendor.scraping_enabled == True)
+        }
+        planned = plan_refreshes(candidates, vendor_budgets, REFRESH_BUDGET)
+        task_count = dispatch_refreshes(planned)
+
+        scheduled = sum(len(ids) for ids in planned.values())
+        logger.info(f"Scheduled {scheduled} of {len(candidates)} price refreshes in {task_count} tasks")
+        return {"status": "dispatched", "scheduled_count": scheduled, "task_count": task_count}
+
+    except Exception as e:
+        logger.error(f"Error scheduling refreshes: {str(e)}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+@current_app.task
+def compact_price_history() -> Dict:
+    """Periodic task (celery beat): fold old raw prices into daily rollups and drop them"""
+    db = SessionLocal()
+    try:
+        return dict(compact_history(db), status="completed")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error compacting price history: {str(e)}")
+        return {"error": str(e)}
+    finally:
+        db.close()
+
+def _hours_between(start: Optional[datetime], end: Optional[datetime]) -> float:
+    if start is None or end is None:
+        return 0.0
+    # SQLite and some MySQL drivers hand back naive datetimes; treat them as UTC
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return max((end - start).total_seconds() / 3600, 0.0)
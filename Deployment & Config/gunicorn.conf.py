@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration - preload the app once in the master and fork workers from it
+"""
+import gc
+import os
+import shutil
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("API_WORKERS", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import main (scrapers, vendor configs, normalizer tables) once in the master;
+# workers share those pages copy-on-write instead of each rebuilding them
+preload_app = True
+
+# Prometheus multiprocess mode, for the API only (Celery processes never set it).
+# This runs before preload_app imports main, whose metrics open files in the
+# directory at import; files left by a previous run would be summed into this one.
+multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+# Vendor rate buckets are per process: split the API's share of each vendor's
+# rate_limit (whatever the Celery workers leave, see REFRESH_VENDOR_SHARE) across workers
+api_rate_share = 1.0 - float(os.getenv("REFRESH_VENDOR_SHARE", "0.5"))
+os.environ.setdefault("VENDOR_RATE_SHARE", str(api_rate_share / workers))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers do not write to (and un-share) the master's objects
+    gc.freeze()
+
+def post_fork(server, worker):
+    import main
+    main.reset_after_fork()
+    server.log.info(f"Worker {worker.pid} reset fork-unsafe state")
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,9 @@
+"""
+Benchmarks are slow (minutes at the largest sizes); collect them only on request:
+
+    RUN_BENCHMARKS=1 pytest benchmarks --benchmark-only
+"""
+import os
+
+if not os.getenv("RUN_BENCHMARKS"):
+    collect_ignore_glob = ["test_*.py"]
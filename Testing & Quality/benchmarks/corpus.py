@@ -0,0 +1,142 @@
+"""
+Synthetic Corpus - Deterministic vendor offer lists with ground-truth product labels
+"""
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+# brand -> (model families, storage options, colors); empty storage means none
+CATALOG: Dict[str, Tuple[List[str], List[str], List[str]]] = {
+    "Apple": (
+        ["iPhone 15", "iPhone 15 Pro", "iPhone 16", "iPhone 16 Pro", "iPhone 16 Pro Max", "iPad Air 11", "iPad Pro 13"],
+        ["128GB", "256GB", "512GB", "1TB"],
+        ["Black", "White", "Blue", "Natural Titanium", "Pink"],
+    ),
+    "Samsung": (
+        ["Galaxy S24", "Galaxy S24+", "Galaxy S24 Ultra", "Galaxy Z Flip6", "Galaxy Z Fold6", "Galaxy A55"],
+        ["128GB", "256GB", "512GB"],
+        ["Onyx Black", "Marble Grey", "Cobalt Violet", "Amber Yellow"],
+    ),
+    "Google": (
+        ["Pixel 8", "Pixel 8 Pro", "Pixel 9", "Pixel 9 Pro", "Pixel 9 Pro XL"],
+        ["128GB", "256GB", "512GB"],
+        ["Obsidian", "Porcelain", "Hazel", "Rose"],
+    ),
+    "Sony": (
+        ["WH-1000XM5 Wireless Headphones", "WH-1000XM4 Wireless Headphones", "WF-1000XM5 Earbuds"],
+        [],
+        ["Black", "Silver", "Midnight Blue"],
+    ),
+    "Dell": (
+        ["XPS 13 Laptop", "XPS 15 Laptop", "Inspiron 14 Laptop"],
+        ["16GB RAM 512GB SSD", "16GB RAM 1TB SSD", "32GB RAM 1TB SSD"],
+        ["Platinum", "Graphite"],
+    ),
+    "Lenovo": (
+        ["ThinkPad X1 Carbon Gen 12", "ThinkPad T14 Gen 5", "Yoga 7i"],
+        ["16GB RAM 512GB SSD", "32GB RAM 1TB SSD"],
+        ["Black", "Storm Grey"],
+    ),
+    "Microsoft": (
+        ["Surface Pro 10", "Surface Laptop 6", "Xbox Series X"],
+        ["256GB", "512GB", "1TB"],
+        ["Platinum", "Black"],
+    ),
+}
+
+VENDORS = ["Amazon US", "eBay US", "Walmart", "Best Buy", "Target", "Newegg"]
+
+# Ways vendors dress up the same product title
+TEMPLATES = [
+    "{brand} {model} {storage} {color}",
+    "{brand} {model} ({storage}, {color})",
+    "{model} {storage} - {color} | {brand}",
+    "NEW {brand} {model} {storage} {color} Unlocked",
+    "{brand} {model}, {color}, {storage}",
+    "{model} {color} {storage}",
+]
+
+def _product_catalog(rng: random.Random) -> List[Dict]:
+    """Every (brand, model, storage, color) combination, in a seeded order"""
+    products = []
+    for brand, (models, storages, colors) in CATALOG.items():
+        for model in models:
+            for storage in storages or [""]:
+                for color in colors:
+                    base = rng.uniform(150, 1800)
+                    products.append({"brand": brand, "model": model, "storage": storage,
+                                     "color": color, "base_price": round(base, 2)})
+    rng.shuffle(products)
+    return products
+
+def _noisy(title: str, rng: random.Random, noise: float) -> str:
+    """Vendor-style variations: spacing in units, casing, an occasional typo"""
+    if rng.random() < noise:
+        title = title.replace("GB", " GB").replace("TB", " TB")
+    if rng.random() < noise / 2:
+        title = title.upper()
+    if rng.random() < noise / 3 and len(title) > 10:
+        i = rng.randrange(1, len(title) - 2)
+        title = title[:i] + title[i + 1] + title[i] + title[i + 2:]
+    return " ".join(title.split())
+
+def generate_offers(count: int, seed: int = 0, offers_per_product: Tuple[int, int] = (2, 6),
+                    noise: float = 0.3, price_jitter: float = 0.08) -> List[Dict]:
+    """Build `count` vendor offers shaped like scraped results.
+
+    Each offer carries `cluster_id` (the true product) and `offer_id`, which
+    ProductMatcher passes through untouched. The same arguments always
+    produce the same list. When the catalog runs out, later products are
+    distinguished by a model year so labels stay unambiguous.
+    """
+    rng = random.Random(seed)
+    catalog = _product_catalog(rng)
+    offers: List[Dict] = []
+    cluster_id = 0
+
+    while len(offers) < count:
+        product = dict(catalog[cluster_id % len(catalog)])
+        edition = cluster_id // len(catalog)
+        if edition:
+            product["model"] = f"{product['model']} ({2024 - edition})"
+
+        vendors = rng.sample(VENDORS, min(rng.randint(*offers_per_product), len(VENDORS)))
+        for vendor in vendors:
+            if len(offers) >= count:
+                break
+            title = rng.choice(TEMPLATES).format(**product)
+            title = title.replace("(, ", "(").replace(" - |", " |").replace(", ,", ",")
+            price = product["base_price"] * (1 + rng.uniform(-price_jitter, price_jitter))
+            offers.append({
+                "name": _noisy(title, rng, noise),
+                "price": round(price, 2),
+                "currency": "USD",
+                "url": f"https://{vendor.lower().replace(' ', '')}.example/p/{len(offers)}",
+                "vendor": vendor,
+                "availability": "in_stock",
+                "cluster_id": cluster_id,
+                "offer_id": len(offers),
+            })
+        cluster_id += 1
+
+    rng.shuffle(offers)
+    return offers
+
+def _pairs(sizes: Iterable[int]) -> int:
+    return sum(n * (n - 1) // 2 for n in sizes)
+
+def matched_clusters(products: List[Dict]) -> List[List[Dict]]:
+    """Expand match_and_deduplicate output into its predicted clusters"""
+    return [[product] + list(product.get("alternatives") or []) for product in products]
+
+def pairwise_scores(products: List[Dict]) -> Dict[str, float]:
+    """Pairwise precision, recall and F1 of matcher output against cluster_id labels"""
+    clusters = matched_clusters(products)
+    predicted = _pairs(len(cluster) for cluster in clusters)
+    correct = sum(_pairs(Counter(o["cluster_id"] for o in cluster).values()) for cluster in clusters)
+    actual = _pairs(Counter(o["cluster_id"] for cluster in clusters for o in cluster).values())
+
+    precision = correct / predicted if predicted else 1.0
+    recall = correct / actual if actual else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
@@ -0,0 +1,197 @@
+"""
+Mock Vendor Farm - Local aiohttp server impersonating vendor search pages for benchmarks
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+@dataclass
+class VendorProfile:
+    """How one fake vendor behaves"""
+    name: str
+    country: str
+    path: str  # URL prefix on the farm, e.g. "amazon"
+    style: str = "generic"  # "amazon" or "generic" page markup
+    currency_symbol: str = "$"
+    latency_ms: float = 150.0  # Median response time
+    latency_sigma: float = 0.5  # Log-normal shape; larger means a longer tail
+    error_rate: float = 0.0  # Share of 500 responses
+    throttle_rate: float = 0.0  # Share of 429 responses (with Retry-After)
+    results: int = 20  # Products per page
+    page_kb: int = 150  # Page weight, padded like real markup
+
+DEFAULT_FARM = [
+    VendorProfile("Amazon US", "US", "amazon", style="amazon", latency_ms=250, latency_sigma=0.6, page_kb=400),
+    VendorProfile("eBay US", "US", "ebay", latency_ms=180, latency_sigma=0.4, page_kb=250),
+    VendorProfile("Walmart", "US", "walmart", latency_ms=220, latency_sigma=0.5, page_kb=300),
+    VendorProfile("Flipkart", "IN", "flipkart", currency_symbol="₹", latency_ms=300, latency_sigma=0.7, page_kb=350),
+]
+
+def farm_profile(name: str) -> List[VendorProfile]:
+    """Named farm presets: default, long-tail, flaky, fast"""
+    if name == "default":
+        return list(DEFAULT_FARM)
+    if name == "long-tail":
+        return [replace(p, latency_sigma=1.2) for p in DEFAULT_FARM]
+    if name == "flaky":
+        return [replace(p, error_rate=0.05, throttle_rate=0.05) for p in DEFAULT_FARM]
+    if name == "fast":
+        return [replace(p, latency_ms=5, latency_sigma=0.1, page_kb=20) for p in DEFAULT_FARM]
+    raise ValueError(f"Unknown farm profile {name}")
+
+VARIANTS = ["128GB Black", "128GB Blue", "256GB Black", "256GB Silver", "512GB Natural", "Renewed"]
+
+def render_page(profile: VendorProfile, query: str, rng: random.Random) -> str:
+    """Search results page in the markup the engine's parsers expect"""
+    base_price = 100 + (sum(map(ord, query)) % 900)
+    items = []
+    for i in range(profile.results):
+        name = f"{query.title()} {VARIANTS[i % len(VARIANTS)]}"
+        price = round(base_price * rng.uniform(0.9, 1.15), 2)
+        if profile.style == "amazon":
+            items.append(
+                f'<div data-component-type="s-search-result"><h2><a href="/dp/{i}">{name}</a></h2>'
+                f'<span class="a-price-whole">{int(price)}</span></div>'
+            )
+        else:
+            items.append(
+                f'<div class="product"><h2 class="title">{name}</h2>'
+                f'<span class="price">{profile.currency_symbol}{price}</span>'
+                f'<a href="/p/{i}">View</a></div>'
+            )
+
+    body = "".join(items)
+    padding = max(profile.page_kb * 1024 - len(body), 0)
+    return f"<html><head><script>/*{'x' * padding}*/</script></head><body>{body}</body></html>"
+
+class MockVendorFarm:
+    """In-process vendor farm; use FarmProcess to keep its CPU out of measurements"""
+
+    def __init__(self, profiles: Optional[List[VendorProfile]] = None, seed: Optional[int] = None):
+        self.profiles = {p.path: p for p in (profiles or DEFAULT_FARM)}
+        self.rng = random.Random(seed)
+        self.requests: Counter = Counter()
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/robots.txt", self._robots)
+        app.router.add_get("/{vendor}/{tail:.*}", self._search)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound = self._runner.addresses[0][1]
+        return f"http://{host}:{bound}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _robots(self, request: web.Request) -> web.Response:
+        return web.Response(text="User-agent: *\nAllow: /\n")
+
+    async def _search(self, request: web.Request) -> web.Response:
+        profile = self.profiles.get(request.match_info["vendor"])
+        if profile is None:
+            return web.Response(status=404)
+
+        latency = self.rng.lognormvariate(0, profile.latency_sigma) * profile.latency_ms
+        await asyncio.sleep(latency / 1000)
+
+        roll = self.rng.random()
+        if roll < profile.throttle_rate:
+            self.requests[(profile.name, 429)] += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        if roll < profile.throttle_rate + profile.error_rate:
+            self.requests[(profile.name, 500)] += 1
+            return web.Response(status=500)
+
+        query = request.query.get("k") or request.query.get("_nkw") or request.query.get("q") or "item"
+        self.requests[(profile.name, 200)] += 1
+        return web.Response(text=render_page(profile, query, self.rng), content_type="text/html")
+
+def vendor_configs(base_url: str, profiles: Optional[List[VendorProfile]] = None,
+                   rate_limit: int = 100000) -> Dict[str, List[Dict]]:
+    """ScrapingEngine vendor configs pointing every vendor at the farm"""
+    from scraping_engine import AmazonScraper, VendorScraper
+
+    search_paths = {"ebay": "sch/i.html?_nkw={query}", "walmart": "search?q={query}",
+                    "flipkart": "search?q={query}"}
+    configs: Dict[str, List[Dict]] = {}
+    for profile in profiles or DEFAULT_FARM:
+        config = {
+            "name": profile.name,
+            "base_url": f"{base_url}/{profile.path}",
+            "scraper_class": AmazonScraper if profile.style == "amazon" else VendorScraper,
+            "rate_limit": rate_limit,
+        }
+        if profile.style != "amazon":
+            path = search_paths.get(profile.path, "search?q={query}")
+            config["search_url_pattern"] = f"{base_url}/{profile.path}/{path}"
+        configs.setdefault(profile.country, []).append(config)
+    return configs
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+def _serve(profiles: List[VendorProfile], seed: Optional[int], host: str, port: int, ready):
+    async def main():
+        farm = MockVendorFarm(profiles, seed)
+        await farm.start(host, port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+class FarmProcess:
+    """Run the farm in a child process so its CPU time is not charged to the engine"""
+
+    def __init__(self, profiles: Optional[List[VendorProfile]] = None, seed: Optional[int] = None,
+                 host: str = "127.0.0.1"):
+        self.profiles = profiles or list(DEFAULT_FARM)
+        self.seed = seed
+        self.host = host
+        self.base_url = ""
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "FarmProcess":
+        port = _free_port(self.host)
+        ready = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.profiles, self.seed, self.host, port, ready), daemon=True
+        )
+        self._process.start()
+        if not ready.wait(10):
+            self._process.terminate()
+            raise RuntimeError("Mock vendor farm did not start")
+        self.base_url = f"http://{self.host}:{port}"
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join(5)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the mock vendor farm")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--profile", default="default")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    event = multiprocessing.Event()
+    print(f"Mock vendors on http://{args.host}:{args.port}")
+    _serve(farm_profile(args.profile), args.seed, args.host, args.port, event)
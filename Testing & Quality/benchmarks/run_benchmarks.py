@@ -0,0 +1,208 @@
+"""
+Benchmark Runner - Drives the scraping engine and /search against the mock vendor farm
+
+Usage (from "Testing & Quality"):
+    python -m benchmarks.run_benchmarks --searches 200 --concurrency 10
+    python -m benchmarks.run_benchmarks --save baseline.json
+    python -m benchmarks.run_benchmarks --compare baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Core Application")
+if CORE_DIR not in sys.path:
+    sys.path.insert(0, CORE_DIR)
+
+from benchmarks.mock_vendors import FarmProcess, farm_profile, vendor_configs
+
+QUERIES = ["iphone 16 pro", "galaxy s24", "pixel 9", "airpods pro", "kindle paperwhite",
+           "macbook air", "sony wh-1000xm5", "nintendo switch", "ipad mini", "apple watch"]
+
+# Metrics where a larger value is a regression
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "cpu_ms_per_search")
+
+@dataclass
+class BenchmarkResult:
+    """Summary of one benchmark scenario"""
+    scenario: str
+    searches: int
+    errors: int
+    throughput: float  # Searches per second
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    cpu_ms_per_search: float
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile; q in [0, 100]"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+async def run_load(scenario: str, search: Callable[[int], Awaitable[bool]],
+                   searches: int, concurrency: int) -> BenchmarkResult:
+    """Call `search(i)` `searches` times, `concurrency` at a time.
+
+    CPU is process CPU time (all threads), so the farm must run in its own
+    process for cpu_ms_per_search to mean anything.
+    """
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < searches:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                ok = await search(index)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += 0 if ok else 1
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    return BenchmarkResult(
+        scenario=scenario,
+        searches=searches,
+        errors=errors,
+        throughput=round(searches / wall, 2) if wall else 0.0,
+        p50_ms=round(percentile(latencies, 50), 1),
+        p95_ms=round(percentile(latencies, 95), 1),
+        p99_ms=round(percentile(latencies, 99), 1),
+        cpu_ms_per_search=round(cpu * 1000 / searches, 2) if searches else 0.0,
+    )
+
+def build_engine(base_url: str, profiles):
+    from scraping_engine import ScrapingEngine, ScrapingConfig
+    from scrape_log_writer import ScrapeLogConfig
+
+    # Scrape logs are written off the request path, but not to a real database here
+    config = ScrapingConfig(request_delay_min=0, request_delay_max=0, redis_url=None,
+                            scrape_log=ScrapeLogConfig(enabled=False))
+    return ScrapingEngine(config, vendor_configs=vendor_configs(base_url, profiles))
+
+async def bench_engine(base_url: str, profiles, searches: int, concurrency: int,
+                       country: str = "US") -> BenchmarkResult:
+    """ScrapingEngine.search_products alone: fan-out, fetch, parse"""
+    engine = build_engine(base_url, profiles)
+
+    async def search(index: int) -> bool:
+        await engine.search_products(country, QUERIES[index % len(QUERIES)])
+        return True
+
+    try:
+        return await run_load("engine", search, searches, concurrency)
+    finally:
+        await engine.close()
+
+async def bench_api(base_url: str, profiles, searches: int, concurrency: int,
+                    country: str = "US") -> BenchmarkResult:
+    """GET /search end to end through the ASGI app, with the result cache bypassed"""
+    import httpx
+    import main
+    from database import init_db
+
+    init_db()
+    engine = build_engine(base_url, profiles)
+    original_engine, main.scraping_engine = main.scraping_engine, engine
+    main.search_cache.clear()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def search(index: int) -> bool:
+            # A unique suffix per request defeats the response cache and planner
+            query = f"{QUERIES[index % len(QUERIES)]} {index}"
+            response = await client.get("/search", params={"country": country, "query": query})
+            return response.status_code == 200
+
+        try:
+            return await run_load("api", search, searches, concurrency)
+        finally:
+            main.scraping_engine = original_engine
+            await engine.close()
+
+def compare(results: Dict[str, BenchmarkResult], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (a fraction) against a saved baseline"""
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        current = asdict(result)
+        for metric in LOWER_IS_BETTER:
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{scenario}.{metric}: {previous[metric]} -> {current[metric]}")
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{scenario}.throughput: {previous['throughput']} -> {current['throughput']}")
+    return regressions
+
+def print_table(results: Dict[str, BenchmarkResult]):
+    header = f"{'scenario':<10}{'searches':>9}{'errors':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'cpu ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results.values():
+        print(f"{r.scenario:<10}{r.searches:>9}{r.errors:>8}{r.throughput:>9}"
+              f"{r.p50_ms:>9}{r.p95_ms:>9}{r.p99_ms:>9}{r.cpu_ms_per_search:>9}")
+
+async def run(args) -> Dict[str, BenchmarkResult]:
+    profiles = farm_profile(args.profile)
+    results: Dict[str, BenchmarkResult] = {}
+    with FarmProcess(profiles, seed=args.seed) as farm:
+        if args.scenario in ("engine", "all"):
+            results["engine"] = await bench_engine(farm.base_url, profiles, args.searches, args.concurrency)
+        if args.scenario in ("api", "all"):
+            results["api"] = await bench_api(farm.base_url, profiles, args.searches, args.concurrency)
+    return results
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark search against a local mock vendor farm")
+    parser.add_argument("--scenario", choices=["engine", "api", "all"], default="all")
+    parser.add_argument("--profile", default="default", help="default, long-tail, flaky or fast")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    # Per-search INFO logging would dominate the measurements
+    logging.basicConfig(level=logging.WARNING)
+
+    # Stored prices go to a throwaway database, never the configured one
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    results = asyncio.run(run(args))
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({name: asdict(r) for name, r in results.items()}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+ProductMatcher scaling benchmarks on the synthetic corpus
+"""
+import tracemalloc
+
+import pytest
+
+from product_matcher import ProductMatcher
+from benchmarks.corpus import generate_offers, pairwise_scores
+
+SIZES = [10, 100, 1000, 10000]
+
+@pytest.mark.parametrize("size", SIZES)
+def test_match_and_deduplicate(benchmark, size):
+    offers = generate_offers(size, seed=42)
+    matcher = ProductMatcher()
+
+    # Accuracy and peak memory from one untimed run
+    tracemalloc.start()
+    products = matcher.match_and_deduplicate(offers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    scores = pairwise_scores(products)
+    benchmark.extra_info.update(scores)
+    benchmark.extra_info["peak_mb"] = round(peak / 1024 / 1024, 2)
+    benchmark.extra_info["clusters"] = len(products)
+
+    rounds = 5 if size <= 100 else 1
+    benchmark.pedantic(matcher.match_and_deduplicate, args=(offers,), rounds=rounds, iterations=1)
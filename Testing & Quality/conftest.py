@@ -0,0 +1,42 @@
+"""
+Shared fixtures for the test suite
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import Country, Vendor, Category, Product, Price, CurrentPrice
+
+@pytest.fixture
+def sqlite_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    db.add(Country(id=1, code="US", name="United States", currency="USD"))
+    db.add(Category(id=1, name="Phones"))
+    db.add(Vendor(id=1, name="Amazon US", base_url="https://www.amazon.com", country_id=1))
+    db.add(Vendor(id=2, name="Walmart", base_url="https://www.walmart.com", country_id=1))
+    db.add(Product(id=1, name="Apple iPhone 16 Pro 128GB", normalized_name="apple iphone 16 pro 128gb", category_id=1))
+    db.add(Product(id=2, name="Samsung Galaxy S24 256GB", normalized_name="samsung galaxy s24 256gb", category_id=1))
+    now = datetime.now(timezone.utc)
+    for model in (Price, CurrentPrice):
+        db.add_all([
+            model(product_id=1, vendor_id=1, price=999, currency="USD", product_url="https://www.amazon.com/a", scraped_at=now),
+            model(product_id=2, vendor_id=1, price=799, currency="USD", product_url="https://www.amazon.com/b", scraped_at=now),
+            model(product_id=1, vendor_id=2, price=989, currency="USD", product_url="https://www.walmart.com/a", scraped_at=now),
+        ])
+    db.commit()
+    db.close()
+
+    return factory
+
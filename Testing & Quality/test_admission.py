@@ -0,0 +1,65 @@
+"""
+Tests for search admission control
+"""
+import asyncio
+import time
+import pytest
+
+from admission import AdmissionController, AdmissionConfig, OverloadedError
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    """Requests beyond limit + queue are rejected immediately"""
+    controller = AdmissionController(AdmissionConfig(initial_limit=1, max_queue=1, queue_timeout=1.0))
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.admit():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    assert controller.in_flight == 1
+    assert controller.queued == 1
+
+    with pytest.raises(OverloadedError) as exc_info:
+        async with controller.admit():
+            pass
+    assert exc_info.value.retry_after >= 1
+
+    release.set()
+    await asyncio.gather(holder, queued)
+    assert controller.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_queue_timeout():
+    """Queued requests give up after queue_timeout"""
+    controller = AdmissionController(AdmissionConfig(initial_limit=1, queue_timeout=0.01))
+    async with controller.admit():
+        with pytest.raises(OverloadedError):
+            async with controller.admit():
+                pass
+    assert controller.queued == 0
+    assert controller.in_flight == 0
+
+def test_aimd_limit_adjustment():
+    """Fast completions grow the limit, slow ones shrink it"""
+    controller = AdmissionController(AdmissionConfig(initial_limit=10, target_latency_ms=100))
+    controller.in_flight = 2
+    controller._release(50)
+    assert controller.limit == pytest.approx(10.1)
+    controller._release(500)
+    assert controller.limit == pytest.approx(10.1 * 0.9)
+
+def test_aimd_decreases_once_per_round_trip():
+    """Slow searches that were all in flight at the cut shrink the limit once"""
+    controller = AdmissionController(AdmissionConfig(initial_limit=10, target_latency_ms=100))
+    controller.in_flight = 5
+    for _ in range(4):
+        controller._release(500)
+    assert controller.limit == pytest.approx(9.0)
+
+    # A search admitted after the cut can cut again
+    controller._release(500, started=time.monotonic())
+    assert controller.limit == pytest.approx(8.1)
@@ -0,0 +1,35 @@
+"""
+Smoke tests for the benchmark harness
+"""
+import pytest
+
+from benchmarks.mock_vendors import FarmProcess, farm_profile
+from benchmarks.run_benchmarks import BenchmarkResult, bench_engine, compare, percentile
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile([], 95) == 0.0
+
+def test_compare_flags_regressions():
+    baseline = {"engine": {"p50_ms": 100, "p95_ms": 200, "p99_ms": 300,
+                           "cpu_ms_per_search": 10, "throughput": 50}}
+    result = BenchmarkResult("engine", 10, 0, throughput=30, p50_ms=105, p95_ms=300,
+                             p99_ms=310, cpu_ms_per_search=10)
+
+    regressions = compare({"engine": result}, baseline, tolerance=0.1)
+
+    assert any(r.startswith("engine.p95_ms") for r in regressions)
+    assert any(r.startswith("engine.throughput") for r in regressions)
+    assert not any(r.startswith("engine.p50_ms") for r in regressions)
+
+@pytest.mark.asyncio
+async def test_engine_benchmark_against_farm():
+    profiles = farm_profile("fast")
+    with FarmProcess(profiles, seed=1) as farm:
+        result = await bench_engine(farm.base_url, profiles, searches=6, concurrency=2)
+
+    assert result.searches == 6
+    assert result.errors == 0
+    assert result.p50_ms > 0
@@ -0,0 +1,87 @@
+"""
+Tests for the headless browser pool
+"""
+import asyncio
+import pytest
+
+from browser_pool import BrowserPool, BrowserPoolConfig, BrowserError
+
+class FakeDriver:
+    """Stand-in for a Selenium driver"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.visited = []
+        self.quit_called = False
+        self.page_source = ""
+
+    def get(self, url):
+        if self.fail:
+            raise RuntimeError("tab crashed")
+        self.visited.append(url)
+        self.page_source = f"<html>{url}</html>"
+
+    def quit(self):
+        self.quit_called = True
+
+def make_pool(size=2, max_pages=50, fail=False):
+    drivers = []
+
+    def factory(config):
+        driver = FakeDriver(fail=fail)
+        drivers.append(driver)
+        return driver
+
+    return BrowserPool(BrowserPoolConfig(size=size, max_pages=max_pages), driver_factory=factory), drivers
+
+@pytest.mark.asyncio
+async def test_fetch_reuses_warm_browser():
+    pool, drivers = make_pool()
+    assert await pool.fetch("Flipkart", "https://a.example/1") == "<html>https://a.example/1</html>"
+    await pool.fetch("Flipkart", "https://a.example/2")
+
+    assert len(drivers) == 1
+    assert drivers[0].visited == ["https://a.example/1", "https://a.example/2"]
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_lease_prefers_vendor_affinity():
+    pool, drivers = make_pool()
+    await pool.warm()
+    async with pool.lease("A") as a, pool.lease("B") as b:
+        assert a is not b
+
+    async with pool.lease("B") as again:
+        assert again is b
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_is_bounded():
+    pool, drivers = make_pool(size=1)
+    async with pool.lease("A"):
+        waiter = asyncio.create_task(pool.fetch("B", "https://b.example"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+    await asyncio.wait_for(waiter, 1)
+    assert len(drivers) == 1
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_browser_recycled_after_max_pages():
+    pool, drivers = make_pool(max_pages=2)
+    for i in range(3):
+        await pool.fetch("A", f"https://a.example/{i}")
+
+    assert len(drivers) == 2
+    assert drivers[0].quit_called
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_failed_browser_is_discarded():
+    pool, drivers = make_pool(fail=True)
+    with pytest.raises(BrowserError):
+        await pool.fetch("A", "https://a.example")
+
+    assert drivers[0].quit_called
+    assert pool.stats()["browsers"] == 0
+    await pool.close()
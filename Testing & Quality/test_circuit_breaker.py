@@ -0,0 +1,89 @@
+"""
+Tests for the per-vendor circuit breaker
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from circuit_breaker import CircuitBreaker, BreakerConfig, BreakerState
+from models import ScrapingLog
+from scraping_engine import ScrapingEngine, ScrapingConfig, ScrapeResult
+
+def make_breaker(**overrides):
+    config = BreakerConfig(min_requests=4, open_seconds=30, **overrides)
+    return CircuitBreaker("Test Store", config, on_state_change=Mock())
+
+def test_opens_on_error_rate():
+    breaker = make_breaker()
+    for success in (True, False, True, False):
+        assert breaker.allow_request()
+        breaker.record(success, 100)
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request()
+    breaker.on_state_change.assert_called_once_with("Test Store", BreakerState.CLOSED, BreakerState.OPEN)
+
+def test_opens_on_slow_calls():
+    breaker = make_breaker(slow_call_ms=1000, slow_rate_threshold=0.75)
+    for latency in (1500, 2000, 100, 3000):
+        breaker.record(True, latency)
+    assert breaker.state == BreakerState.OPEN
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 100)
+
+    with patch("circuit_breaker.time.monotonic", return_value=breaker._opened_at + 31):
+        assert breaker.state == BreakerState.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # Only one probe at a time
+        breaker.record(False, 100)
+        assert breaker.state == BreakerState.OPEN
+    assert breaker._open_seconds == 60
+
+    with patch("circuit_breaker.time.monotonic", return_value=breaker._opened_at + 61):
+        assert breaker.allow_request()
+        breaker.record(True, 100)
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.allow_request()
+
+@pytest.mark.asyncio
+async def test_engine_skips_vendor_with_open_circuit():
+    engine = ScrapingEngine(ScrapingConfig(request_delay_min=0, request_delay_max=0, respect_robots_txt=False))
+    engine.log_writer = Mock()
+    walmart = engine._scrapers_by_name["Walmart"]
+    walmart.scrape = AsyncMock(return_value=ScrapeResult("Walmart", [], "blocked", 50, "HTTP 403"))
+
+    for _ in range(engine.config.breaker.min_requests):
+        await engine.search_vendor("Walmart", "tv")
+    assert engine.breakers["Walmart"].state == BreakerState.OPEN
+    # The trip is queued after the outcomes that caused it, under a non-outcome status
+    assert engine.log_writer.log.call_args_list[-1].args[:2] == ("Walmart", "circuit_open")
+
+    walmart.scrape.reset_mock()
+    assert await engine.search_vendor("Walmart", "tv") == []
+    walmart.scrape.assert_not_called()
+    await engine.close()
+
+def test_load_vendor_health_replays_only_scrape_outcomes(sqlite_session_factory):
+    now = datetime.now(timezone.utc)
+    db = sqlite_session_factory()
+    # Walmart failed recently; Amazon failed long enough ago that its cool-down is over.
+    # Transition rows are not outcomes and must not count as failures.
+    for seconds, vendor_id in [(10, 2)] * 5 + [(1200, 1)] * 5:
+        db.add(ScrapingLog(vendor_id=vendor_id, status="blocked", response_time_ms=50,
+                           timestamp=now - timedelta(seconds=seconds)))
+    db.add(ScrapingLog(vendor_id=2, status="circuit_open", timestamp=now - timedelta(seconds=5)))
+    db.commit()
+    db.close()
+
+    with patch("scraping_engine.SessionLocal", sqlite_session_factory):
+        engine = ScrapingEngine(ScrapingConfig())
+        engine.log_writer = Mock()
+        engine.load_vendor_health()
+    engine.log_writer.log.assert_not_called()  # Nothing is re-logged while seeding
+
+    assert len(engine.breakers["Walmart"]._outcomes) == 5
+    assert engine.breakers["Walmart"].state == BreakerState.OPEN
+    assert engine.breakers["Amazon US"].state == BreakerState.HALF_OPEN
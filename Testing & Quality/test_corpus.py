@@ -0,0 +1,27 @@
+"""
+Tests for the synthetic product corpus
+"""
+from benchmarks.corpus import generate_offers, pairwise_scores
+
+def test_generator_is_deterministic():
+    assert generate_offers(200, seed=7) == generate_offers(200, seed=7)
+    assert generate_offers(200, seed=7) != generate_offers(200, seed=8)
+
+def test_offers_have_labels_and_vendor_shape():
+    offers = generate_offers(500, seed=1)
+    assert len(offers) == 500
+    assert len({o["offer_id"] for o in offers}) == 500
+    assert all(o["price"] > 0 and o["name"] for o in offers)
+    # Several vendors per product, so there is something to match
+    assert len({o["cluster_id"] for o in offers}) < 250
+
+def test_pairwise_scores():
+    a1, a2, b1 = ({"cluster_id": c} for c in (1, 1, 2))
+    perfect = [dict(a1, alternatives=[a2]), b1]
+    assert pairwise_scores(perfect) == {"precision": 1.0, "recall": 1.0, "f1": 1.0}
+
+    merged = [dict(a1, alternatives=[a2, b1])]
+    assert pairwise_scores(merged)["precision"] == round(1 / 3, 4)
+
+    split = [a1, a2, b1]
+    assert pairwise_scores(split)["recall"] == 0.0
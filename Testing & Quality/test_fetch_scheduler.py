@@ -0,0 +1,111 @@
+"""
+Tests for the vendor fetch scheduler and rate limiter
+"""
+import asyncio
+import pytest
+
+from fetch_scheduler import FetchScheduler, Priority
+from rate_limiter import RateLimitExceeded, TokenBucket
+
+def make_scheduler(max_concurrent=1):
+    scheduler = FetchScheduler(max_concurrent_per_vendor=max_concurrent)
+    scheduler.register_vendor("Test Store", TokenBucket(rate=1000, capacity=1000))
+    return scheduler
+
+async def run_queued(scheduler, lanes):
+    """Queue one fetch per lane behind a held slot and record run order"""
+    order = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with scheduler.slot("Test Store", Priority.INTERACTIVE):
+            await release.wait()
+
+    async def fetch(name, lane):
+        async with scheduler.slot("Test Store", lane):
+            order.append(name)
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(fetch(name, lane)) for name, lane in lanes]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(held, *tasks)
+    return order
+
+@pytest.mark.asyncio
+async def test_interactive_preempts_queued_background():
+    order = await run_queued(make_scheduler(), [
+        ("bg1", Priority.BACKGROUND),
+        ("bg2", Priority.BACKGROUND),
+        ("ui", Priority.INTERACTIVE),
+    ])
+    assert order == ["ui", "bg1", "bg2"]
+
+@pytest.mark.asyncio
+async def test_weighted_fair_queuing_between_lanes():
+    """Batch fetches still progress while interactive traffic is queued"""
+    lanes = [(f"batch{i}", Priority.BATCH) for i in range(2)] + \
+        [(f"ui{i}", Priority.INTERACTIVE) for i in range(8)]
+    order = await run_queued(make_scheduler(), lanes)
+    assert order.index("batch0") < order.index("ui7")
+    assert order[:4] == ["ui0", "ui1", "ui2", "ui3"]
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_queue_position():
+    scheduler = make_scheduler()
+    async with scheduler.slot("Test Store"):
+        waiter = asyncio.create_task(scheduler.slot("Test Store").__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    async with scheduler.slot("Test Store"):
+        pass
+
+@pytest.mark.asyncio
+async def test_rate_limited_fetch_does_not_hold_a_slot():
+    """A background fetch waiting for budget leaves the slot to interactive traffic"""
+    scheduler = FetchScheduler(max_concurrent_per_vendor=1, max_waits={})
+    scheduler.register_vendor("Test Store", TokenBucket(rate=0.001, capacity=4))
+    scheduler.rate_limiter("Test Store").tokens = 1.5  # Below the background reserve
+
+    async def fetch(lane):
+        async with scheduler.slot("Test Store", lane):
+            pass
+
+    background = asyncio.create_task(fetch(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(fetch(Priority.INTERACTIVE), timeout=1)
+    assert not background.done()
+    background.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await background
+
+@pytest.mark.asyncio
+async def test_lane_max_wait_gives_up_on_spent_bucket():
+    scheduler = FetchScheduler(max_waits={Priority.INTERACTIVE: 0.5})
+    scheduler.register_vendor("Test Store", TokenBucket(rate=0.001, capacity=1))
+    scheduler.rate_limiter("Test Store").tokens = 0
+
+    with pytest.raises(RateLimitExceeded):
+        async with scheduler.slot("Test Store", Priority.INTERACTIVE):
+            pass
+    # Nothing was taken, so a later fetch still gets a slot
+    scheduler.rate_limiter("Test Store").tokens = 1
+    async with scheduler.slot("Test Store", Priority.INTERACTIVE):
+        pass
+
+def test_token_bucket_per_period_share():
+    bucket = TokenBucket.per_period(60, 3600, share=0.25)
+    assert bucket.capacity == 15
+    assert bucket.rate == pytest.approx(15 / 3600)
+    # A share too small for one request still allows one at a time
+    assert TokenBucket.per_period(2, 3600, share=0.1).capacity == 1
+
+def test_token_bucket_reserve():
+    bucket = TokenBucket(rate=0.001, capacity=4)
+    assert bucket.try_acquire(reserve=2)
+    assert bucket.try_acquire(reserve=2)
+    assert not bucket.try_acquire(reserve=2)
+    assert bucket.try_acquire()
@@ -0,0 +1,41 @@
+"""
+Import-time budget for the API entry point
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Core Application")
+
+# Modules that only scraping or matching needs; none may load with the app
+DEFERRED_MODULES = ["pandas", "sklearn", "fuzzywuzzy", "selenium", "requests", "fake_useragent", "bs4"]
+
+# Generous enough for a slow CI runner; a regression to eager imports costs seconds
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+def _import_main():
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=CORE_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-c", code], cwd=CORE_DIR, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.fixture(scope="module")
+def cold_import():
+    return _import_main()
+
+def test_heavy_modules_are_not_imported_at_startup(cold_import):
+    assert cold_import["loaded"] == []
+
+def test_main_imports_within_budget(cold_import):
+    assert cold_import["elapsed"] < IMPORT_BUDGET_SECONDS
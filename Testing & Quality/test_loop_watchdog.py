@@ -0,0 +1,50 @@
+"""
+Tests for the event-loop watchdog
+"""
+import asyncio
+import time
+
+from prometheus_client import REGISTRY
+
+from loop_watchdog import LoopWatchdog
+
+def _block_the_loop(seconds):
+    time.sleep(seconds)  # Synchronous work on the event loop
+
+async def _watch(watchdog, work):
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        work()
+        await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+def test_blocking_call_is_captured():
+    blocked_before = REGISTRY.get_sample_value("event_loop_blocked_total") or 0
+    watchdog = LoopWatchdog(threshold_ms=50, interval_ms=10)
+
+    asyncio.run(_watch(watchdog, lambda: _block_the_loop(0.25)))
+
+    assert len(watchdog.stalls) == 1  # One report per stall, however long
+    stall = watchdog.stalls[0]
+    assert "test_loop_watchdog.py" in stall["site"]
+    assert "_block_the_loop" in stall["site"]
+    assert "time.sleep" in stall["stack"]
+    assert stall["blocked_ms"] >= 50
+    assert REGISTRY.get_sample_value("event_loop_blocked_total") == blocked_before + 1
+
+    stats = watchdog.stats()
+    assert stats["stalls"] == 1
+    assert stats["lag_ms"]["max"] >= 200
+    assert stats["lag_ms"]["p50"] < 50
+
+def test_idle_loop_reports_nothing():
+    lag_before = REGISTRY.get_sample_value("event_loop_lag_seconds_count") or 0
+    watchdog = LoopWatchdog(threshold_ms=200, interval_ms=10)
+
+    asyncio.run(_watch(watchdog, lambda: None))
+
+    assert not watchdog.stalls
+    assert watchdog.stats()["stalls"] == 0
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds_count") > lag_before
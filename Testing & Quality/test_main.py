@@ -0,0 +1,333 @@
+"""
+Tests for the main FastAPI application
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from admission import OverloadedError
+from price_store import SearchPlan, write_current_prices
+
+client = TestClient(app)
+
+@pytest.fixture
+def matched_products():
+    return [
+        {
+            "name": "iPhone 16 Pro 128GB",
+            "price": 999.99,
+            "currency": "USD",
+            "url": "https://example.com/iphone",
+            "vendor": "Test Store",
+            "availability": "in_stock"
+        },
+        {
+            "name": "Apple iPhone 16 Pro (128 GB)",
+            "price": 949.0,
+            "currency": "USD",
+            "url": "https://example.org/iphone",
+            "vendor": "Other Store",
+            "original_price": 1099.0,
+            "discount_percentage": 13.6,
+            "alternatives": [
+                {
+                    "name": "iPhone 16 Pro 128 GB Black",
+                    "price": 979.0,
+                    "currency": "USD",
+                    "url": "https://example.net/iphone-black",
+                    "vendor": "Third Store"
+                },
+                {
+                    "name": "iPhone 16 Pro 128GB",
+                    "price": 969.0,
+                    "currency": "USD",
+                    "url": "https://example.net/iphone",
+                    "vendor": "Third Store"
+                }
+            ]
+        }
+    ]
+
+@pytest.fixture
+def mock_search(matched_products):
+    with patch('main.scraping_engine') as mock_scraper, \
+            patch('main.product_matcher') as mock_matcher, \
+            patch('main.price_store') as mock_store, \
+            patch('main.store_search_results'):
+        mock_store.plan_search = Mock(return_value=SearchPlan())
+        mock_scraper.search_products = AsyncMock(return_value=matched_products)
+        mock_matcher.match_and_deduplicate = Mock(return_value=list(matched_products))
+        main.search_cache.clear()
+        yield mock_scraper
+        main.search_cache.clear()
+
+def test_read_root():
+    """Test root endpoint"""
+    response = client.get("/")
+    assert response.status_code == 200
+    data = response.json()
+    assert "message" in data
+    assert "version" in data
+
+def test_search_products_get(mock_search):
+    """Test product search GET endpoint"""
+    response = client.get("/search?country=US&query=iPhone 16 Pro")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_results"] == 2
+    assert [p["price"] for p in data["products"]] == ["949.0", "999.99"]
+    assert data["products"][0] == {
+        "link": "https://example.org/iphone",
+        "price": "949.0",
+        "currency": "USD",
+        "productName": "Apple iPhone 16 Pro (128 GB)",
+        "vendor": "Other Store",
+        "availability": "in_stock",
+        "originalPrice": "1099.0",
+        "discountPercentage": 13.6
+    }
+
+def test_search_products_post(mock_search):
+    """Test product search POST endpoint"""
+    response = client.post("/search", json={"country": "US", "query": "iPhone 16 Pro"})
+    assert response.status_code == 200
+    assert response.json()["query"] == "iPhone 16 Pro"
+
+def test_search_get_sets_cache_validators(mock_search):
+    """GET /search carries ETag, Cache-Control and Age"""
+    response = client.get("/search?country=US&query=iPhone 16 Pro")
+    assert response.headers["etag"].startswith('W/"')
+    assert response.headers["cache-control"] == f"public, max-age={main.SEARCH_CACHE_TTL}"
+    assert response.headers["age"] == "0"
+
+def test_search_get_conditional_request(mock_search):
+    """A matching If-None-Match returns 304 and repeat searches hit the cache"""
+    etag = client.get("/search?country=US&query=iPhone 16 Pro").headers["etag"]
+
+    response = client.get(
+        "/search?country=us&query=iphone  16 pro",
+        headers={"If-None-Match": f'"other", {etag}'}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert mock_search.search_products.await_count == 1
+
+def test_search_cache_hit_records_demand(mock_search):
+    main.price_store.plan_search.return_value = SearchPlan(product_ids=[1])
+    client.get("/search?country=US&query=iPhone 16 Pro")
+    main.price_store.record_demand.assert_not_called()
+
+    client.get("/search?country=US&query=iPhone 16 Pro")
+    main.price_store.record_demand.assert_called_once_with([1])
+
+def test_search_cursor_pagination(mock_search):
+    """limit/cursor walk the price-sorted results page by page"""
+    first = client.get("/search?country=US&query=iPhone 16 Pro&limit=1").json()
+    assert [p["price"] for p in first["products"]] == ["949.0"]
+    assert first["total_results"] == 2
+    assert first["next_cursor"]
+
+    second = client.get(
+        f"/search?country=US&query=iPhone 16 Pro&limit=1&cursor={first['next_cursor']}"
+    ).json()
+    assert [p["price"] for p in second["products"]] == ["999.99"]
+    assert second["next_cursor"] is None
+
+def test_search_invalid_cursor(mock_search):
+    response = client.get("/search?country=US&query=iPhone 16 Pro&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+def test_search_alternatives_modes(mock_search):
+    """Alternatives are omitted by default and can be trimmed or returned in full"""
+    url = "/search?country=US&query=iPhone 16 Pro"
+    assert "alternatives" not in client.get(url).json()["products"][0]
+
+    trimmed = client.get(url + "&alternatives=trim&max_alternatives=1").json()
+    assert [a["price"] for a in trimmed["products"][0]["alternatives"]] == ["969.0"]
+
+    full = client.get(url + "&alternatives=full").json()
+    assert [a["price"] for a in full["products"][0]["alternatives"]] == ["969.0", "979.0"]
+    assert full["products"][1]["alternatives"] == []
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_search_response_compression(mock_search, monkeypatch, encoding):
+    """Bodies above the threshold are compressed with the negotiated coding"""
+    monkeypatch.setattr(main, "COMPRESSION_MIN_BYTES", 0)
+    response = client.get(
+        "/search?country=US&query=iPhone 16 Pro",
+        headers={"Accept-Encoding": f"{encoding}, identity;q=0.5"}
+    )
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json()["total_results"] == 2
+
+def test_search_small_response_uncompressed(mock_search):
+    response = client.get("/search?country=US&query=iPhone 16 Pro", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_search_overloaded_returns_503(mock_search):
+    """Searches that cannot be admitted fail fast with Retry-After"""
+    with patch.object(main.admission, "admit", side_effect=OverloadedError(7)):
+        response = client.get("/search?country=US&query=iPhone 16 Pro")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+
+def test_search_overloaded_serves_stale(mock_search, matched_products):
+    """Overloaded searches fall back to an expired cache entry"""
+    payloads = [main._price_payload(p) for p in matched_products]
+    main.search_cache.set("US", "iPhone 16 Pro", payloads, scraped_at=time.time() - main.SEARCH_CACHE_TTL - 5)
+
+    with patch.object(main.admission, "admit", side_effect=OverloadedError(7)):
+        response = client.get("/search?country=US&query=iPhone 16 Pro")
+    assert response.status_code == 200
+    assert response.json()["total_results"] == 2
+    assert int(response.headers["age"]) > main.SEARCH_CACHE_TTL
+    mock_search.search_products.assert_not_called()
+
+def test_search_server_timing_header(mock_search):
+    """Every search response reports its stages in Server-Timing"""
+    response = client.get("/search?country=US&query=iPhone 16 Pro")
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert stages == ["plan", "scrape", "match", "payload", "serialize", "total"]
+    assert response.json()["timings"] is None
+
+def test_search_timings_in_body(mock_search):
+    """timings=true adds stage timings to the body and disables caching"""
+    response = client.get("/search?country=US&query=iPhone 16 Pro&timings=true")
+    timings = response.json()["timings"]
+    assert set(timings) == {"plan", "scrape", "match", "payload"}
+    assert all(ms >= 0 for ms in timings.values())
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+    response = client.post("/search", json={"country": "US", "query": "iPhone 16 Pro", "timings": True})
+    # A cache hit skips the search stages
+    assert response.json()["timings"] == {}
+
+def test_etag_independent_of_result_order(matched_products):
+    """The ETag is computed from sorted result content"""
+    payloads = [main._price_payload(p) for p in matched_products]
+    assert main.search_cache.set("US", "a", payloads).etag == \
+        main.search_cache.set("US", "b", list(reversed(payloads))).etag
+    main.search_cache.clear()
+
+def test_search_openapi_schema_unchanged():
+    """Search responses are still documented as ProductSearchResponse"""
+    schema = client.get("/openapi.json").json()
+    ok = schema["paths"]["/search"]["get"]["responses"]["200"]
+    assert ok["content"]["application/json"]["schema"]["$ref"].endswith("/ProductSearchResponse")
+    assert "PriceResponse" in schema["components"]["schemas"]
+
+def test_search_scrapes_only_stale_vendors(mock_search, matched_products):
+    """Vendors with fresh stored prices are not scraped live"""
+    stored = dict(matched_products[0], source="stored", product_id=1)
+    main.price_store.plan_search.return_value = SearchPlan(
+        stored_offers=[stored], vendors_to_scrape=["Other Store"], product_ids=[1]
+    )
+    main.product_matcher.match_and_deduplicate.side_effect = lambda offers: list(offers)
+
+    data = client.get("/search?country=US&query=iPhone 16 Pro").json()
+
+    assert mock_search.search_products.await_args.kwargs["vendors"] == ["Other Store"]
+    assert {p["vendor"] for p in data["products"]} == {"Test Store", "Other Store"}
+
+def test_search_served_entirely_from_store(mock_search, matched_products):
+    main.price_store.plan_search.return_value = SearchPlan(
+        stored_offers=list(matched_products), vendors_to_scrape=[], product_ids=[1]
+    )
+    response = client.get("/search?country=US&query=iPhone 16 Pro")
+    assert response.json()["total_results"] == 2
+    mock_search.search_products.assert_not_called()
+
+def test_search_products_invalid_country():
+    """Test search with invalid country"""
+    with patch('main.scraping_engine') as mock_scraper, \
+            patch('main.price_store') as mock_store:
+        mock_store.plan_search = Mock(return_value=SearchPlan())
+        mock_scraper.search_products = AsyncMock(side_effect=ValueError("Country XX not supported"))
+
+        response = client.get("/search?country=XX&query=test")
+        assert response.status_code == 500
+
+@pytest.fixture
+def price_history(sqlite_session_factory):
+    """Product 1 at Amazon US: hourly prices for the last two days"""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    db = sqlite_session_factory()
+    for hours in range(48, 0, -1):
+        write_current_prices(db, [{"product_id": 1, "vendor_id": 1, "price": 900 + hours % 7, "currency": "USD",
+                                   "product_url": "https://www.amazon.com/a"}], scraped_at=now - timedelta(hours=hours))
+    db.commit()
+    db.close()
+    with patch("main.SessionLocal", sqlite_session_factory):
+        yield now
+
+def test_price_history_keyset_pages(price_history):
+    start = (price_history - timedelta(hours=48)).isoformat()
+    end = price_history.isoformat()
+    params = {"vendor_id": 1, "start": start, "end": end, "limit": 20, "resolution": "raw"}
+
+    pages, cursor = [], None
+    while True:
+        response = client.get("/products/1/history", params=dict(params, cursor=cursor) if cursor else params)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["resolution"] == "raw"
+        pages.append(body["series"][0]["points"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [20, 20, 8]
+    times = [point["t"] for page in pages for point in page]
+    assert times == sorted(times) and len(set(times)) == 48
+
+def test_price_history_cursor_pins_resolved_range(price_history):
+    """Pages after the first keep the range and end the first page resolved"""
+    start = (price_history - timedelta(hours=48)).isoformat()
+    first = client.get("/products/1/history", params={"vendor_id": 1, "start": start, "limit": 20,
+                                                       "resolution": "raw"}).json()
+    second = client.get("/products/1/history", params={"vendor_id": 1, "cursor": first["next_cursor"]}).json()
+
+    assert (second["start"], second["end"], second["resolution"]) == (first["start"], first["end"], "raw")
+    response = client.get("/products/1/history", params={"end": start, "cursor": first["next_cursor"]})
+    assert response.status_code == 400
+
+def test_price_history_auto_serves_long_raw_ranges_from_rollups(price_history):
+    """A raw range needing several pages is charted whole from daily rollups"""
+    start = (price_history - timedelta(hours=48)).isoformat()
+    body = client.get("/products/1/history", params={"vendor_id": 1, "start": start, "limit": 20}).json()
+
+    assert body["resolution"] == "day"
+    assert body["next_cursor"] is None
+    assert sum(point["samples"] for point in body["series"][0]["points"]) == 48
+
+def test_price_history_downsamples_each_series(price_history):
+    start = (price_history - timedelta(hours=48)).isoformat()
+    response = client.get("/products/1/history", params={"start": start, "points": 10, "resolution": "raw"})
+
+    series = {s["vendor"]: s for s in response.json()["series"]}
+    assert len(series["Amazon US"]["points"]) == 10
+    assert len(series["Walmart"]["points"]) == 1  # The fixture's single price
+
+def test_price_history_daily_rollups(price_history):
+    start = (price_history - timedelta(days=60)).isoformat()
+    response = client.get("/products/1/history", params={"vendor_id": 1, "start": start})
+
+    body = response.json()
+    assert body["resolution"] == "day"
+    points = body["series"][0]["points"]
+    assert sum(point["samples"] for point in points) == 48
+    assert all(point["min"] <= point["price"] <= point["max"] for point in points)
+
+def test_price_history_errors(price_history):
+    assert client.get("/products/99/history").status_code == 404
+    response = client.get("/products/1/history", params={"vendor_id": 1, "limit": 1, "resolution": "day"})
+    cursor = response.json()["next_cursor"]
+    assert client.get("/products/1/history", params={"resolution": "raw", "cursor": cursor}).status_code == 400
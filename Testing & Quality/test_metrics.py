@@ -0,0 +1,75 @@
+"""
+Tests for the Prometheus metrics surface
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+import main
+from metrics import instrument_db_pool
+from scraping_engine import FetchError, VendorScraper
+from test_main import matched_products, mock_search  # noqa: F401 (fixtures)
+from test_scraping_engine import _FakeSession
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Core Application")
+
+client = TestClient(main.app)
+
+def _sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+def test_metrics_endpoint_exports_search_metrics(mock_search):
+    before = _sample("search_cache_requests_total", {"result": "hit"})
+    client.get("/search?country=US&query=iPhone 16 Pro")
+    client.get("/search?country=US&query=iPhone 16 Pro")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'search_stage_seconds_count{stage="scrape"}' in response.text
+    assert _sample("search_cache_requests_total", {"result": "hit"}) == before + 1
+
+def test_vendor_requests_counted_by_status():
+    scraper = VendorScraper({"name": "Metrics Store", "base_url": "https://metrics.example"})
+    session = _FakeSession("<html></html>", [0, 0], statuses=[200, 503])
+
+    asyncio.run(scraper._fetch_page("https://metrics.example/a", session))
+    with pytest.raises(FetchError):
+        asyncio.run(scraper._fetch_page("https://metrics.example/b", session))
+
+    labels = {"vendor": "Metrics Store"}
+    assert _sample("scraper_vendor_requests_total", dict(labels, status="200")) == 1
+    assert _sample("scraper_vendor_requests_total", dict(labels, status="503")) == 1
+    assert _sample("scraper_vendor_response_bytes_total", labels) == len("<html></html>")
+    assert _sample("scraper_vendor_request_seconds_count", labels) == 2
+
+def test_db_pool_saturation(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=3, max_overflow=2)
+    instrument_db_pool(engine)
+    before = _sample("db_pool_checked_out")
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        assert _sample("db_pool_checked_out") == before + 1
+        assert _sample("db_pool_capacity") == 5
+    assert _sample("db_pool_checked_out") == before
+
+def test_multiprocess_mode_aggregates_workers(tmp_path):
+    """Counters from separate worker processes are summed by /metrics"""
+    worker = "from metrics import SEARCH_CACHE_REQUESTS; SEARCH_CACHE_REQUESTS.labels('hit').inc(2)"
+    reader = "from metrics import render_metrics; print(render_metrics()[0].decode())"
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path),
+               PYTHONPATH=CORE_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, cwd=CORE_DIR, check=True, timeout=60)
+    output = subprocess.run([sys.executable, "-c", reader], env=env, cwd=CORE_DIR, check=True,
+                            capture_output=True, text=True, timeout=60).stdout
+
+    assert 'search_cache_requests_total{result="hit"} 4.0' in output
@@ -0,0 +1,146 @@
+"""
+Tests for current prices, daily rollups, partition planning and retention
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import price_history
+from models import Price, CurrentPrice, PriceDailyRollup
+from price_history import compact_price_history, lttb, month_partition, plan_partitions
+from price_store import write_current_prices
+
+def _row(price, product_id=1, vendor_id=1):
+    return {"product_id": product_id, "vendor_id": vendor_id, "price": price, "currency": "USD",
+            "availability": "in_stock", "product_url": f"https://www.amazon.com/{price}"}
+
+def test_write_current_prices_upserts_and_rolls_up(sqlite_session_factory):
+    morning = datetime(2026, 10, 19, 8, tzinfo=timezone.utc)
+    db = sqlite_session_factory()
+    write_current_prices(db, [_row(950), _row(500, product_id=2)], scraped_at=morning)
+    write_current_prices(db, [_row(930)], scraped_at=morning + timedelta(hours=4))
+    write_current_prices(db, [_row(970)], scraped_at=morning + timedelta(days=1))
+    db.commit()
+
+    current = db.query(CurrentPrice).filter(CurrentPrice.vendor_id == 1).order_by(CurrentPrice.product_id).all()
+    assert [(p.product_id, float(p.price), p.product_url) for p in current] == [
+        (1, 970.0, "https://www.amazon.com/970"), (2, 500.0, "https://www.amazon.com/500")
+    ]
+    assert db.query(Price).filter(Price.product_id == 1, Price.vendor_id == 1).count() == 4
+
+    rollups = db.query(PriceDailyRollup).filter(PriceDailyRollup.product_id == 1).order_by(PriceDailyRollup.day).all()
+    assert [(r.day, float(r.min_price), float(r.max_price), float(r.price_sum), r.sample_count) for r in rollups] == [
+        (date(2026, 10, 19), 930.0, 950.0, 1880.0, 2),
+        (date(2026, 10, 20), 970.0, 970.0, 970.0, 1),
+    ]
+    db.close()
+
+def test_plan_partitions():
+    now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    existing = {
+        "p202606": month_partition(datetime(2026, 6, 1, tzinfo=timezone.utc))[1],
+        "p202607": month_partition(datetime(2026, 7, 1, tzinfo=timezone.utc))[1],
+        "p202610": month_partition(datetime(2026, 10, 1, tzinfo=timezone.utc))[1],
+        "p_future": None,
+    }
+
+    to_add, to_drop = plan_partitions(existing, now, 2, cutoff=datetime(2026, 7, 21, tzinfo=timezone.utc))
+
+    assert [name for name, _ in to_add] == ["p202611", "p202612"]
+    assert to_add[0][1] == int(datetime(2026, 12, 1, tzinfo=timezone.utc).timestamp())
+    assert to_drop == ["p202606"]
+
+    # An unpartitioned-by-month table starts at the current month
+    to_add, to_drop = plan_partitions({"p_future": None}, now, 1, cutoff=now)
+    assert [name for name, _ in to_add] == ["p202610", "p202611"]
+    assert to_drop == []
+
+def test_compact_price_history_rolls_up_then_deletes(sqlite_session_factory):
+    now = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+    db = sqlite_session_factory()
+    db.query(Price).delete()
+    old = datetime(2026, 7, 1, 9, tzinfo=timezone.utc)
+    db.add_all([
+        Price(product_id=1, vendor_id=1, price=900, currency="USD", product_url="u", scraped_at=old),
+        Price(product_id=1, vendor_id=1, price=880, currency="USD", product_url="u", scraped_at=old + timedelta(hours=5)),
+        Price(product_id=1, vendor_id=2, price=910, currency="USD", product_url="u", scraped_at=old + timedelta(days=1)),
+        Price(product_id=1, vendor_id=1, price=999, currency="USD", product_url="u", scraped_at=now),
+        PriceDailyRollup(product_id=1, vendor_id=1, day=date(2024, 1, 1), currency="USD",
+                         min_price=1, max_price=1, price_sum=1, sample_count=1),
+    ])
+    db.commit()
+
+    result = compact_price_history(db, now)
+
+    assert result["prices_deleted"] == 3
+    assert result["rollups_deleted"] == 1
+    assert [float(p.price) for p in db.query(Price).all()] == [999.0]
+    rollups = db.query(PriceDailyRollup).order_by(PriceDailyRollup.day).all()
+    assert [(r.vendor_id, r.day, float(r.min_price), float(r.max_price), r.sample_count) for r in rollups] == [
+        (1, date(2026, 7, 1), 880.0, 900.0, 2),
+        (2, date(2026, 7, 2), 910.0, 910.0, 1),
+    ]
+    # Current prices are untouched by retention
+    assert db.query(CurrentPrice).count() == 3
+    db.close()
+
+def test_partition_compaction_keeps_rollups_of_earlier_months(sqlite_session_factory, monkeypatch):
+    """Each monthly run drops one partition without losing the months dropped before it"""
+    months = [datetime(2026, m, 1, tzinfo=timezone.utc) for m in (6, 7, 8)]
+    partitions = {month_partition(m)[0]: month_partition(m)[1] for m in months}
+    partitions["p_future"] = None
+
+    def drop(db, name):
+        upper = datetime.fromtimestamp(partitions.pop(name), tz=timezone.utc)
+        db.query(Price).filter(Price.scraped_at < upper).delete(synchronize_session=False)
+
+    monkeypatch.setattr(price_history, "_dialect", lambda db: "mysql")
+    monkeypatch.setattr(price_history, "price_partitions", lambda db: dict(partitions))
+    monkeypatch.setattr(price_history, "_add_partitions", lambda db, existing, to_add: None)
+    monkeypatch.setattr(price_history, "_drop_partition", drop)
+
+    db = sqlite_session_factory()
+    db.query(Price).delete()
+    for month in months:
+        db.add(Price(product_id=1, vendor_id=1, price=900 + month.month, currency="USD", product_url="u",
+                     scraped_at=month + timedelta(days=4, hours=9)))
+    db.commit()
+
+    retention = timedelta(days=price_history.PRICE_HISTORY_RETENTION_DAYS)
+    compact_price_history(db, datetime(2026, 7, 2, tzinfo=timezone.utc) + retention)
+    compact_price_history(db, datetime(2026, 8, 2, tzinfo=timezone.utc) + retention)
+
+    assert list(partitions) == ["p202608", "p_future"]
+    rollups = db.query(PriceDailyRollup).order_by(PriceDailyRollup.day).all()
+    assert [(r.day, float(r.min_price)) for r in rollups] == [(date(2026, 6, 5), 906.0), (date(2026, 7, 5), 907.0)]
+    db.close()
+
+def test_lttb_keeps_extremes_and_endpoints():
+    xs = list(range(1000))
+    ys = [100.0] * 1000
+    ys[437] = 40.0  # A one-off price drop
+
+    kept = lttb(xs, ys, 50)
+
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(kept)
+    assert 437 in kept
+    assert lttb(xs[:10], ys[:10], 50) == list(range(10))
+
+def test_upserts_compile_for_postgresql():
+    """PostgreSQL gets ON CONFLICT and LEAST()/GREATEST(), not SQLite's scalar min()/max()"""
+    from unittest.mock import Mock
+    from sqlalchemy.dialects import postgresql
+
+    db = Mock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    price_history.update_daily_rollups(db, [dict(_row(950), scraped_at=datetime(2026, 10, 19, tzinfo=timezone.utc))])
+
+    sql = str(db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (product_id, vendor_id, day) DO UPDATE" in sql
+    assert "least(" in sql and "greatest(" in sql
+
+    db.get_bind.return_value.dialect.name = "oracle"
+    with pytest.raises(ValueError):
+        price_history.upsert_current_prices(db, [_row(950)])
@@ -0,0 +1,102 @@
+"""
+Tests for the hybrid stored/live search path
+"""
+from datetime import datetime, timedelta, timezone
+
+from models import Product, Price, CurrentPrice, Vendor
+from price_store import PriceStore
+
+SLAS = {"Amazon US": 3600, "Walmart": 3600, "eBay US": 3600}
+
+def test_plan_search_splits_vendors_by_freshness(sqlite_session_factory):
+    db = sqlite_session_factory()
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.query(CurrentPrice).filter(CurrentPrice.vendor_id == 2).update({CurrentPrice.scraped_at: old})
+    db.commit()
+    db.close()
+
+    plan = PriceStore(sqlite_session_factory).plan_search("us", "iPhone 16 Pro", SLAS)
+
+    assert plan.product_ids == [1]
+    assert [(o["vendor"], o["price"]) for o in plan.stored_offers] == [("Amazon US", 999.0)]
+    assert sorted(plan.vendors_to_scrape) == ["Walmart", "eBay US"]
+
+def test_plan_search_unknown_query_scrapes_everything(sqlite_session_factory):
+    plan = PriceStore(sqlite_session_factory).plan_search("US", "Pixel 9", SLAS)
+    assert plan.stored_offers == []
+    assert plan.vendors_to_scrape is None
+
+def test_store_search_results(sqlite_session_factory):
+    store = PriceStore(sqlite_session_factory)
+    products = [
+        {
+            "name": "Google Pixel 9 128GB", "normalized_name": "google pixel 9 128gb",
+            "price": 699.0, "currency": "USD", "url": "https://www.ebay.com/p9", "vendor": "eBay US",
+            "alternatives": [
+                {"name": "Pixel 9 (128 GB)", "price": 689.0, "currency": "USD",
+                 "url": "https://www.walmart.com/p9", "vendor": "Walmart"},
+            ],
+        },
+        {
+            "name": "Apple iPhone 16 Pro 128GB", "price": 999.0, "currency": "USD",
+            "url": "https://www.amazon.com/a", "vendor": "Amazon US", "product_id": 1, "source": "stored",
+        },
+    ]
+
+    stored = store.store_search_results("US", products, {"eBay US": "https://www.ebay.com", "Walmart": "https://www.walmart.com"})
+    assert stored == 2
+
+    db = sqlite_session_factory()
+    pixel = db.query(Product).filter(Product.normalized_name == "google pixel 9 128gb").one()
+    assert pixel.search_count == 1
+    assert db.query(Vendor).filter(Vendor.name == "eBay US").count() == 1
+    current = db.query(CurrentPrice).filter(CurrentPrice.product_id == pixel.id).all()
+    assert sorted(float(p.price) for p in current) == [689.0, 699.0]
+    # Stored offers are not rewritten
+    assert db.query(Price).filter(Price.product_id == 1).count() == 2
+    assert db.query(Product).filter(Product.id == 1).one().search_count == 1
+    db.close()
+
+    plan = store.plan_search("US", "pixel 9", SLAS)
+    assert sorted(plan.vendors_to_scrape) == ["Amazon US"]
+
+def test_store_search_results_reuses_stored_member_product(sqlite_session_factory):
+    """A scraped representative joins the product of a stored offer in its group"""
+    store = PriceStore(sqlite_session_factory)
+    products = [{
+        "name": "iPhone 16 Pro (128 GB)", "price": 989.0, "currency": "USD",
+        "url": "https://www.walmart.com/ip16", "vendor": "Walmart",
+        "alternatives": [
+            {"name": "Apple iPhone 16 Pro 128GB", "price": 999.0, "currency": "USD",
+             "url": "https://www.amazon.com/a", "vendor": "Amazon US", "product_id": 1, "source": "stored"},
+        ],
+    }]
+    db = sqlite_session_factory()
+    before = db.query(Product).count()
+    db.close()
+
+    store.store_search_results("US", products, {"Walmart": "https://www.walmart.com"})
+
+    db = sqlite_session_factory()
+    assert db.query(Product).count() == before
+    assert products[0]["product_id"] == 1
+    walmart = db.query(CurrentPrice).join(Vendor).filter(Vendor.name == "Walmart", CurrentPrice.product_id == 1).one()
+    assert float(walmart.price) == 989.0
+    db.close()
+
+def test_cache_hit_demand_is_flushed_in_batches(sqlite_session_factory, monkeypatch):
+    import price_store
+    store = PriceStore(sqlite_session_factory)
+    monkeypatch.setattr(price_store, "DEMAND_FLUSH_INTERVAL", 3600)
+    assert not store.record_demand([1])
+    monkeypatch.setattr(price_store, "DEMAND_FLUSH_INTERVAL", 0)
+    assert store.record_demand([1])
+
+    store.flush_demand()
+    store.flush_demand()  # Nothing pending
+
+    db = sqlite_session_factory()
+    product = db.query(Product).filter(Product.id == 1).one()
+    assert product.search_count == 2
+    assert product.last_searched_at is not None
+    db.close()
@@ -0,0 +1,105 @@
+"""
+Tests for the on-demand profiler
+"""
+import asyncio
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from profiler import Profiler, ProfilerBusy, SamplingProfiler, allocation_profile, format_collapsed
+
+client = TestClient(main.app)
+
+def _spin(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+def _allocate():
+    return [bytes(1024) for _ in range(512)]
+
+def test_sampler_sees_busy_thread():
+    worker = threading.Thread(target=_spin, args=(0.5,), name="busy-worker")
+    worker.start()
+    counts = SamplingProfiler(interval=0.002).run(0.2)
+    worker.join()
+
+    busy = [stack for stack in counts if stack.startswith("busy-worker;")]
+    assert busy
+    assert all("_spin (test_profiler.py:" in stack for stack in busy)
+
+def test_format_collapsed():
+    counts = Counter({"main;a;b": 3, "main;a": 7})
+    assert format_collapsed(counts) == "main;a 7\nmain;a;b 3\n"
+
+def test_allocation_profile_attributes_bytes():
+    tracemalloc.start(10)
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = _allocate()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    counts = allocation_profile(before, after)
+    ours = sum(size for stack, size in counts.items() if "test_profiler.py" in stack)
+    assert ours >= 512 * 1024
+    assert kept
+
+def test_one_profile_at_a_time():
+    profiler = Profiler()
+
+    async def run():
+        first = asyncio.create_task(profiler.cpu(0.2))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ProfilerBusy):
+            await profiler.memory(0.1)
+        await first
+
+    asyncio.run(run())
+
+def test_memory_profile_snapshots_off_the_event_loop(monkeypatch):
+    snapshot_threads = []
+    take_snapshot = tracemalloc.take_snapshot
+
+    def recording_snapshot():
+        snapshot_threads.append(threading.get_ident())
+        return take_snapshot()
+
+    monkeypatch.setattr(tracemalloc, "take_snapshot", recording_snapshot)
+
+    async def run():
+        await Profiler().memory(0.05)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(snapshot_threads) == 2
+    assert loop_thread not in snapshot_threads
+
+def test_profile_endpoint_requires_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.get("/admin/profile?seconds=0.1").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/profile?seconds=0.1").status_code == 401
+    response = client.get("/admin/profile?seconds=0.1", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+def test_profile_endpoint_returns_collapsed_stacks(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    headers = {"Authorization": "Bearer s3cret"}
+
+    response = client.get("/admin/profile?seconds=0.2&include_idle=true", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["x-worker-pid"]
+    lines = response.text.strip().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    response = client.get("/admin/profile?seconds=0.1&mode=memory", headers=headers)
+    assert response.status_code == 200
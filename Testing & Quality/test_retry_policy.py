@@ -0,0 +1,34 @@
+"""
+Tests for the retry policy
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from retry_policy import RetryPolicy, parse_retry_after
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+    delays = [policy.backoff(5) for _ in range(100)]
+    assert all(0 <= delay <= 3.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_only_idempotent_methods_are_retried():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(1, "GET", 503)
+    assert not policy.should_retry(1, "POST", 503)
+    assert not policy.should_retry(3, "GET", 503)
+
+def test_retryable_statuses():
+    policy = RetryPolicy()
+    assert policy.should_retry(1, "GET", None)  # Connection error
+    assert policy.should_retry(1, "GET", 429)
+    assert not policy.should_retry(1, "GET", 403)
+    assert not policy.should_retry(1, "GET", 404)
+
+def test_parse_retry_after():
+    assert parse_retry_after("30") == 30.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 80 < parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 90
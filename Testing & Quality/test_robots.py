@@ -0,0 +1,89 @@
+"""
+Tests for the robots.txt cache
+"""
+import pytest
+
+from robots import RobotsCache, RobotsRules, parse_robots
+from rate_limiter import TokenBucket
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /checkout
+Disallow: /*?session=
+Allow: /search$
+
+User-agent: PriceComparisonBot
+Disallow: /search
+Allow: /search?q=
+Crawl-delay: 2
+"""
+
+def test_named_group_overrides_wildcard():
+    rules = parse_robots(ROBOTS_TXT, "PriceComparisonBot/1.0")
+    assert rules.crawl_delay == 2.0
+    assert rules.allows("/search?q=iphone")
+    assert not rules.allows("/search")
+    assert rules.allows("/checkout")
+
+def test_wildcard_group_and_patterns():
+    rules = parse_robots(ROBOTS_TXT, "OtherBot")
+    assert rules.crawl_delay is None
+    assert not rules.allows("/checkout/cart")
+    assert not rules.allows("/item?session=abc")
+    assert rules.allows("/search")
+    assert rules.allows("/robots.txt")
+
+def test_longest_match_wins_and_allow_breaks_ties():
+    rules = RobotsRules([("/a", False), ("/a/b", True), ("/c", False), ("/c", True)])
+    assert not rules.allows("/a/x")
+    assert rules.allows("/a/b/c")
+    assert rules.allows("/c")
+
+def test_crawl_delay_spaces_grants():
+    bucket = TokenBucket(rate=100, capacity=100, min_interval=10)
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() > 9
+
+class _FakeResponse:
+    def __init__(self, status, text):
+        self.status = status
+        self._text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def text(self, errors="strict"):
+        return self._text
+
+class _FakeSession:
+    def __init__(self, status=200, text=ROBOTS_TXT):
+        self.status = status
+        self.text = text
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return _FakeResponse(self.status, self.text)
+
+@pytest.mark.asyncio
+async def test_cache_fetches_each_host_once():
+    cache = RobotsCache("PriceComparisonBot")
+    session = _FakeSession()
+
+    assert await cache.allowed("https://shop.example/search?q=tv", session)
+    assert not await cache.allowed("https://shop.example/search", session)
+    assert session.calls == 1
+
+@pytest.mark.asyncio
+async def test_missing_robots_allows_everything():
+    cache = RobotsCache("PriceComparisonBot")
+    assert await cache.allowed("https://shop.example/anything", _FakeSession(status=404))
+
+@pytest.mark.asyncio
+async def test_server_error_disallows_until_retry():
+    cache = RobotsCache("PriceComparisonBot")
+    assert not await cache.allowed("https://shop.example/search", _FakeSession(status=503))
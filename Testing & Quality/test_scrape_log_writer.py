@@ -0,0 +1,115 @@
+"""
+Tests for the batched ScrapingLog writer
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+
+from models import ScrapingLog
+from scrape_log_writer import ScrapeLogConfig, ScrapeLogWriter
+from scraping_engine import ScrapingConfig, ScrapingEngine, ScrapeResult
+
+def _rows(factory):
+    db = factory()
+    try:
+        return db.query(ScrapingLog).order_by(ScrapingLog.id).all()
+    finally:
+        db.close()
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_flush_writes_one_multi_row_insert(sqlite_session_factory):
+    writer = ScrapeLogWriter(ScrapeLogConfig(batch_size=100, flush_interval=60), sqlite_session_factory)
+    writer.log("Amazon US", "success", 20, 410)
+    writer.log("Walmart", "rate_limited", 0, 95, "HTTP 429")
+    writer.log("Amazon US", "error", 0, 30000, "timeout")
+    writer.log("Unknown Shop", "success", 5, 100)
+
+    inserts = []
+    bind = sqlite_session_factory.kw["bind"]
+    listener = lambda conn, cursor, statement, *args: inserts.append(statement)
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        assert writer.flush() == 3
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+
+    assert len([s for s in inserts if s.startswith("INSERT INTO scraping_logs")]) == 1
+    rows = _rows(sqlite_session_factory)
+    assert [(r.vendor_id, r.status, r.products_found, r.response_time_ms) for r in rows] == [
+        (1, "success", 20, 410), (2, "rate_limited", 0, 95), (1, "error", 0, 30000)
+    ]
+    assert rows[1].error_message == "HTTP 429"
+    assert all(r.timestamp is not None for r in rows)
+    writer.close()
+
+def test_full_batch_flushes_without_waiting(sqlite_session_factory):
+    writer = ScrapeLogWriter(ScrapeLogConfig(batch_size=2, flush_interval=60), sqlite_session_factory)
+    writer.log("Amazon US", "success", 1, 100)
+    writer.log("Walmart", "success", 1, 100)
+
+    assert _wait_for(lambda: len(_rows(sqlite_session_factory)) == 2)
+    writer.close()
+
+def test_interval_flushes_partial_batch(sqlite_session_factory):
+    writer = ScrapeLogWriter(ScrapeLogConfig(batch_size=100, flush_interval=0.05), sqlite_session_factory)
+    writer.log("Amazon US", "success", 1, 100)
+
+    assert _wait_for(lambda: len(_rows(sqlite_session_factory)) == 1)
+    writer.close()
+
+def _records(outcome):
+    return REGISTRY.get_sample_value("scrape_log_records_total", {"outcome": outcome}) or 0
+
+def test_full_queue_degrades_to_sampling(sqlite_session_factory):
+    config = ScrapeLogConfig(batch_size=10 ** 6, flush_interval=60, max_queue=100, sample_above=0.5)
+    writer = ScrapeLogWriter(config, sqlite_session_factory)
+    sampled, dropped = _records("sampled_out"), _records("dropped")
+
+    for _ in range(50):
+        writer.log("Amazon US", "success", 1, 100)
+    assert len(writer) == 50  # Below the threshold everything is kept
+    assert _records("sampled_out") == sampled
+
+    for _ in range(1000):
+        writer.log("Amazon US", "success", 1, 100)
+    assert len(writer) == 100  # Never grows past max_queue
+    assert _records("sampled_out") > sampled
+    assert _records("dropped") > dropped
+
+    writer.close()
+    assert len(writer) == 0
+    assert len(_rows(sqlite_session_factory)) == 100
+
+def test_disabled_writer_keeps_nothing(sqlite_session_factory):
+    writer = ScrapeLogWriter(ScrapeLogConfig(enabled=False), sqlite_session_factory)
+    writer.log("Amazon US", "success", 1, 100)
+    assert len(writer) == 0
+
+def test_engine_logs_each_vendor_scrape(sqlite_session_factory):
+    config = ScrapingConfig(request_delay_min=0, request_delay_max=0, respect_robots_txt=False,
+                            scrape_log=ScrapeLogConfig(batch_size=100, flush_interval=60))
+    engine = ScrapingEngine(config)
+    engine.log_writer.session_factory = sqlite_session_factory
+    scraper = engine._scrapers_by_name["Amazon US"]
+    scraper.scrape = AsyncMock(return_value=ScrapeResult("Amazon US", [{"name": "x"}], "success", 321))
+
+    async def run():
+        await engine.search_vendor("Amazon US", "iphone")
+        assert len(engine.log_writer) == 1  # Queued, not yet written
+        await engine.close()  # Flushes
+
+    asyncio.run(run())
+    rows = _rows(sqlite_session_factory)
+    assert [(r.vendor_id, r.status, r.products_found, r.response_time_ms) for r in rows] == [
+        (1, "success", 1, 321)
+    ]
@@ -7,7 +7,8 @@ import asyncio
 from unittest.mock import Mock, patch, AsyncMock
 import aiohttp
 
-from scraping_engine import ScrapingEngine, VendorScraper, AmazonScraper
+from scraping_engine import ScrapingEngine, VendorScraper, AmazonScraper, FetchError
+from retry_policy import RetryPolicy
 
 @pytest.fixture
 def sample_vendor_config():
@@ -70,3 +71,194 @@ async def test_search_products_unsupported_country():
 
     with pytest.raises(ValueError, match="Country XX not supported"):
         await engine.search_products("XX", "test query")
+
+@pytest.mark.asyncio
+async def test_search_vendor_unknown_vendor():
+    """Test single-vendor search with an unknown vendor"""
+    engine = ScrapingEngine()
+
+    with pytest.raises(ValueError, match="Vendor Nowhere not supported"):
+        await engine.search_vendor("Nowhere", "test query")
+
+@pytest.mark.asyncio
+async def test_engine_reuses_session():
+    """The pooled session is shared until the engine is closed"""
+    engine = ScrapingEngine()
+    session = await engine.get_session()
+    assert await engine.get_session() is session
+
+    await engine.close()
+    assert session.closed
+
+class _FakeResponse:
+    def __init__(self, html, delay, status=200, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._html = html
+        self._delay = delay
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return self._html.encode()
+
+    async def text(self):
+        return self._html
+
+class _FakeSession:
+    """Session whose responses arrive after the given delays, in call order"""
+
+    def __init__(self, html, delays, statuses=None, headers=None):
+        self.html = html
+        self.delays = list(delays)
+        self.statuses = list(statuses or [200] * len(self.delays))
+        self.headers = headers
+        self.proxies = []
+
+    def get(self, url, proxy=None, trace_request_ctx=None):
+        self.proxies.append(proxy)
+        return _FakeResponse(self.html, self.delays.pop(0), self.statuses.pop(0), self.headers)
+
+def _warm_hedging_scraper(config, p90_ms=10):
+    scraper = VendorScraper(dict(config, hedge=True, hedge_proxy="http://proxy:8080"))
+    for _ in range(VendorScraper.HEDGE_MIN_SAMPLES):
+        scraper.latency.record(p90_ms)
+    scraper._requests_sent = 100
+    return scraper
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_first_response(sample_vendor_config, sample_html):
+    """A request slower than the vendor's p90 is raced against a backup"""
+    scraper = _warm_hedging_scraper(sample_vendor_config)
+    session = _FakeSession(sample_html, delays=[5, 0])
+
+    await asyncio.wait_for(scraper._scrape_search_results("https://example.com/search", session), 1)
+
+    assert session.proxies == [None, "http://proxy:8080"]
+    assert scraper._hedges_sent == 1
+
+@pytest.mark.asyncio
+async def test_hedging_respects_rate_limit(sample_vendor_config, sample_html):
+    """No backup request is sent when the vendor's rate budget is spent"""
+    from rate_limiter import TokenBucket
+
+    scraper = _warm_hedging_scraper(sample_vendor_config)
+    scraper.rate_limiter = TokenBucket(rate=0.001, capacity=1)
+    scraper.rate_limiter.tokens = 0
+    session = _FakeSession(sample_html, delays=[0.05])
+
+    await scraper._scrape_search_results("https://example.com/search", session)
+
+    assert session.proxies == [None]
+    assert scraper._hedges_sent == 0
+
+@pytest.mark.asyncio
+async def test_hedging_is_opt_in(sample_vendor_config, sample_html):
+    scraper = VendorScraper(sample_vendor_config)
+    for _ in range(VendorScraper.HEDGE_MIN_SAMPLES):
+        scraper.latency.record(1)
+    session = _FakeSession(sample_html, delays=[0.05])
+
+    await scraper._scrape_search_results("https://example.com/search", session)
+
+    assert session.proxies == [None]
+
+@pytest.mark.asyncio
+async def test_transient_error_is_retried(sample_vendor_config, sample_html):
+    """A 502 is retried after a short backoff"""
+    scraper = VendorScraper(sample_vendor_config)
+    scraper.retry_policy = RetryPolicy(base_delay=0.01)
+    session = _FakeSession(sample_html, delays=[0, 0], statuses=[502, 200])
+
+    html = await scraper._fetch_with_retry("https://example.com/search", session)
+
+    assert html == sample_html
+    assert len(session.proxies) == 2
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(sample_vendor_config, sample_html):
+    scraper = VendorScraper(sample_vendor_config)
+    session = _FakeSession(sample_html, delays=[0, 0], statuses=[404, 200])
+
+    with pytest.raises(FetchError):
+        await scraper._fetch_with_retry("https://example.com/search", session)
+    assert len(session.proxies) == 1
+
+@pytest.mark.asyncio
+async def test_retry_after_feeds_rate_limiter(sample_vendor_config, sample_html):
+    """A Retry-After past the deadline penalizes the vendor and gives up at once"""
+    from rate_limiter import TokenBucket
+
+    scraper = VendorScraper(sample_vendor_config)
+    scraper.rate_limiter = TokenBucket(rate=10, capacity=10)
+    scraper.retry_policy = RetryPolicy(deadline=1.0)
+    session = _FakeSession(sample_html, delays=[0], statuses=[429], headers={"Retry-After": "120"})
+
+    with pytest.raises(FetchError) as excinfo:
+        await asyncio.wait_for(scraper._fetch_with_retry("https://example.com/search", session), 0.5)
+
+    assert excinfo.value.status == "rate_limited"
+    assert scraper.rate_limiter.wait_time() > 100
+
+@pytest.mark.asyncio
+async def test_retry_after_on_final_attempt_still_penalizes(sample_vendor_config, sample_html):
+    """The last attempt is not retried, but its Retry-After still holds back later requests"""
+    from rate_limiter import TokenBucket
+
+    scraper = VendorScraper(sample_vendor_config)
+    scraper.rate_limiter = TokenBucket(rate=10, capacity=10)
+    scraper.retry_policy = RetryPolicy(max_attempts=1)
+    session = _FakeSession(sample_html, delays=[0], statuses=[503], headers={"Retry-After": "30"})
+
+    with pytest.raises(FetchError):
+        await scraper._fetch_with_retry("https://example.com/search", session)
+
+    assert scraper.rate_limiter.wait_time() > 20
+
+@pytest.mark.asyncio
+async def test_attempt_timeout_is_retried_within_deadline(sample_vendor_config, sample_html):
+    """An aiohttp timeout on one attempt is a transient failure, not the retry deadline"""
+    scraper = VendorScraper(sample_vendor_config)
+    scraper.retry_policy = RetryPolicy(base_delay=0, deadline=5.0)
+    scraper._fetch_page = AsyncMock(side_effect=[asyncio.TimeoutError(), sample_html])
+
+    html = await scraper._fetch_with_retry("https://example.com/search", Mock())
+
+    assert html == sample_html
+    assert scraper._fetch_page.await_count == 2
+
+@pytest.mark.asyncio
+async def test_after_fork_drops_inherited_session():
+    """A forked worker opens its own session instead of reusing the parent's"""
+    engine = ScrapingEngine()
+    session = await engine.get_session()
+
+    engine.after_fork()
+    assert await engine.get_session() is not session
+
+    await session.close()
+    await engine.close()
+
+@pytest.mark.asyncio
+async def test_interactive_search_skips_vendor_without_budget():
+    """A spent bucket skips the vendor instead of holding the user's search"""
+    from fetch_scheduler import Priority
+    from scraping_engine import ScrapingConfig
+
+    engine = ScrapingEngine(ScrapingConfig(request_delay_min=0, request_delay_max=0, respect_robots_txt=False))
+    engine.log_writer = Mock()
+    walmart = engine._scrapers_by_name["Walmart"]
+    walmart.scrape = AsyncMock()
+    walmart.rate_limiter.tokens = 0
+
+    products = await asyncio.wait_for(engine.search_vendor("Walmart", "tv", Priority.INTERACTIVE), 1)
+
+    assert products == []
+    walmart.scrape.assert_not_called()
+    assert engine.log_writer.log.call_args.args[:2] == ("Walmart", "throttled")
+    await engine.close()
@@ -0,0 +1,117 @@
+"""
+Tests for background price refresh tasks
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+from models import Product, Price, CurrentPrice, PriceDailyRollup
+import tasks
+
+@pytest.fixture
+def db_session_factory(sqlite_session_factory):
+    with patch("tasks.SessionLocal", sqlite_session_factory):
+        yield sqlite_session_factory
+
+def test_group_product_ids_by_vendor():
+    rows = [(1, 5), (2, 3), (1, 2), (1, 5)]
+    assert tasks.group_product_ids_by_vendor(rows) == {1: [2, 5], 2: [3]}
+
+def test_update_prices_fans_out_per_vendor_chunks(db_session_factory, monkeypatch):
+    monkeypatch.setattr(tasks, "REFRESH_CHUNK_SIZE", 1)
+    with patch("tasks.group") as mock_group:
+        result = tasks.update_prices([1, 2])
+
+    assert result == {"status": "dispatched", "vendor_count": 2, "task_count": 3}
+    signatures = mock_group.call_args[0][0]
+    assert sorted(tuple(sig.args) for sig in signatures) == [(1, [1]), (1, [2]), (2, [1])]
+    mock_group.return_value.apply_async.assert_called_once()
+
+def test_refresh_vendor_prices_writes_in_bulk(db_session_factory):
+    offers = {
+        "Apple iPhone 16 Pro 128GB": [
+            {"name": "Apple iPhone 16 Pro 128GB", "price": 949.0, "currency": "USD",
+             "url": "https://www.amazon.com/a2", "vendor": "Amazon US"},
+            {"name": "iPhone 16 Pro Case", "price": 19.0, "currency": "USD",
+             "url": "https://www.amazon.com/case", "vendor": "Amazon US"},
+        ],
+        "Samsung Galaxy S24 256GB": [],
+    }
+    engine = Mock()
+    engine.search_vendor = AsyncMock(side_effect=lambda vendor, query, priority: offers[query])
+
+    with patch("tasks.get_engine", return_value=engine):
+        result = tasks.refresh_vendor_prices(1, [1, 2])
+
+    assert result == {"status": "completed", "vendor_id": 1, "updated_count": 1}
+
+    db = db_session_factory()
+    current = db.query(CurrentPrice).filter(CurrentPrice.vendor_id == 1).order_by(CurrentPrice.product_id).all()
+    assert [(p.product_id, float(p.price)) for p in current] == [(1, 949.0), (2, 799.0)]
+    # History is appended to, never rewritten
+    assert db.query(Price).filter(Price.product_id == 1, Price.vendor_id == 1).count() == 2
+    rollup = db.query(PriceDailyRollup).filter(PriceDailyRollup.product_id == 1).one()
+    assert (rollup.vendor_id, float(rollup.min_price), rollup.sample_count) == (1, 949.0, 1)
+    db.close()
+
+def test_refresh_skips_products_without_rate_budget(db_session_factory):
+    """A chunk larger than this process's bucket refreshes what it can and returns"""
+    from scraping_engine import ScrapingEngine, ScrapingConfig, ScrapeResult
+
+    engine = ScrapingEngine(ScrapingConfig(request_delay_min=0, request_delay_max=0, respect_robots_txt=False))
+    engine.log_writer = Mock()
+    amazon = engine._scrapers_by_name["Amazon US"]
+    offer = {"name": "Apple iPhone 16 Pro 128GB", "price": 949.0, "currency": "USD",
+             "url": "https://www.amazon.com/a2", "vendor": "Amazon US"}
+    amazon.scrape = AsyncMock(return_value=ScrapeResult("Amazon US", [offer], "success", 100))
+    # One token above the background reserve
+    amazon.rate_limiter.tokens = amazon.rate_limiter.capacity * 0.25 + 1
+
+    with patch("tasks.get_engine", return_value=engine):
+        result = tasks.refresh_vendor_prices(1, [1, 2])
+
+    assert amazon.scrape.await_count == 1
+    assert result["status"] == "completed"
+    assert [call.args[1] for call in engine.log_writer.log.call_args_list].count("throttled") == 1
+    tasks.run_async(engine.close())
+
+def test_score_refresh_candidate():
+    """Volatile, popular and old prices score higher"""
+    base = dict(observations=10, distinct_prices=2, span_hours=240, age_hours=12, search_count=0)
+    score = tasks.score_refresh_candidate(**base)
+    assert 0 < score < 1
+    assert tasks.score_refresh_candidate(**dict(base, distinct_prices=8)) > score
+    assert tasks.score_refresh_candidate(**dict(base, search_count=50)) > score
+    assert tasks.score_refresh_candidate(**dict(base, age_hours=48)) > score
+    assert tasks.score_refresh_candidate(**dict(base, age_hours=0)) == 0
+
+def test_plan_refreshes_respects_budgets():
+    candidates = [
+        {"product_id": 1, "vendor_id": 1, "score": 0.9},
+        {"product_id": 2, "vendor_id": 1, "score": 0.8},
+        {"product_id": 3, "vendor_id": 2, "score": 0.7},
+        {"product_id": 4, "vendor_id": 2, "score": 0.01},
+        {"product_id": 5, "vendor_id": 2, "score": 0.6},
+    ]
+    assert tasks.plan_refreshes(candidates, {1: 1, 2: 5}, budget=10) == {1: [1], 2: [3, 5]}
+    assert tasks.plan_refreshes(candidates, {1: 5, 2: 5}, budget=2) == {1: [1, 2]}
+
+def test_vendor_refresh_budget_uses_engine_rate_period():
+    """A vendor without rate_period is budgeted over the window the engine enforces"""
+    from scraping_engine import ScrapingConfig
+    assert tasks.vendor_refresh_budget(60, None) == tasks.vendor_refresh_budget(60, ScrapingConfig().rate_period)
+
+def test_schedule_refreshes_dispatches_stale_prices(db_session_factory):
+    db = db_session_factory()
+    old = datetime.now(timezone.utc) - timedelta(days=3)
+    db.query(CurrentPrice).filter(CurrentPrice.vendor_id == 1).update({CurrentPrice.scraped_at: old})
+    db.query(Product).filter(Product.id == 1).update({Product.search_count: 20})
+    db.commit()
+    db.close()
+
+    with patch("tasks.dispatch_refreshes", return_value=1) as mock_dispatch:
+        result = tasks.schedule_refreshes()
+
+    assert result["status"] == "dispatched"
+    planned = mock_dispatch.call_args[0][0]
+    assert sorted(planned[1]) == [1, 2]
@@ -0,0 +1,76 @@
+"""
+Tests for per-request stage timings
+"""
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from prometheus_client import REGISTRY
+
+from timing import Timings, collect_timings, record, stage_name, timed, trace_config
+
+def test_stage_name():
+    assert stage_name("Amazon US", "ttfb") == "amazon-us.ttfb"
+    assert stage_name("Best Buy (CA)") == "best-buy-ca"
+
+def test_timings_accumulate_and_format():
+    timings = Timings()
+    timings.add("scrape", 10.0)
+    timings.add("scrape", 2.5)
+    timings.add("match", 1.04)
+    assert timings.as_dict() == {"scrape": 12.5, "match": 1.0}
+    assert timings.server_timing() == "scrape;dur=12.5, match;dur=1.0"
+    assert timings.server_timing(total=True).split(", ")[-1].startswith("total;dur=")
+
+def test_records_only_inside_collector():
+    count = REGISTRY.get_sample_value("search_stage_seconds_count", {"stage": "test.outside"}) or 0
+    record("test.outside", 1.0)
+    with collect_timings() as timings:
+        with timed("test.inside"):
+            pass
+        record("test.inside", 2.0)
+    assert list(timings.stages) == ["test.inside"]
+    assert timings.stages["test.inside"] >= 2.0
+    # Every stage is exported to the Prometheus stage histogram
+    assert REGISTRY.get_sample_value("search_stage_seconds_count", {"stage": "test.outside"}) == count + 1
+
+def test_collector_shared_with_child_tasks():
+    async def vendor(name):
+        await asyncio.sleep(0)
+        record(f"{name}.download", 1.0)
+
+    async def search():
+        with collect_timings() as timings:
+            await asyncio.gather(vendor("a"), vendor("b"))
+        return timings
+
+    timings = asyncio.run(search())
+    assert timings.as_dict() == {"a.download": 1.0, "b.download": 1.0}
+
+@pytest.mark.asyncio
+async def test_trace_config_records_connection_stages():
+    async def handler(request):
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/"
+
+    try:
+        async with aiohttp.ClientSession(trace_configs=[trace_config()]) as session:
+            with collect_timings() as timings:
+                async with session.get(url, trace_request_ctx={"stage": "vendor"}) as response:
+                    await response.text()
+                async with session.get(url) as response:
+                    await response.text()
+    finally:
+        await runner.cleanup()
+
+    # Untagged requests are not recorded; an IP literal needs no DNS lookup
+    assert set(timings.stages) == {"vendor.connect", "vendor.ttfb"}
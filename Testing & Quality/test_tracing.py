@@ -0,0 +1,87 @@
+"""
+Tests for OpenTelemetry tracing
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from product_matcher import ProductMatcher
+from scraping_engine import VendorScraper
+from tracing import _end_task_span, _inject_task_headers, _start_task_span, configure_tracing, in_current_context, tracer
+from test_main import matched_products, mock_search  # noqa: F401 (fixtures)
+from test_scraping_engine import _FakeSession
+
+client = TestClient(main.app)
+
+@pytest.fixture
+def spans():
+    exporter = configure_tracing("memory")
+    exporter.clear()
+    yield exporter
+    exporter.clear()
+
+def _by_name(exporter):
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+def test_search_spans(spans, mock_search):
+    client.get("/search?country=US&query=iPhone 16 Pro")
+    finished = _by_name(spans)
+
+    search = finished["search"]
+    assert search.attributes["search.cache"] == "miss"
+    for stage in ("plan", "scrape", "match", "payload"):
+        assert finished[stage].parent.span_id == search.context.span_id
+
+def test_vendor_fetch_and_parse_spans(spans):
+    scraper = VendorScraper({"name": "Trace Store", "base_url": "https://trace.example"})
+    result = asyncio.run(scraper.scrape("phone", _FakeSession("<html></html>", [0])))
+    finished = _by_name(spans)
+
+    scrape = finished["vendor.scrape"]
+    assert scrape.attributes["scrape.status"] == result.status == "success"
+    assert finished["vendor.fetch"].attributes["http.status_code"] == 200
+    assert finished["vendor.fetch"].parent.span_id == scrape.context.span_id
+    assert finished["trace-store.parse"].parent.span_id == scrape.context.span_id
+
+def test_matcher_stage_spans(spans):
+    ProductMatcher().match_and_deduplicate([
+        {"name": "Apple iPhone 16 128GB", "price": 799.0, "vendor": "A"},
+        {"name": "iPhone 16 128 GB Apple", "price": 789.0, "vendor": "B"},
+    ])
+    assert {"match.normalize", "match.similarity", "match.cluster", "match.merge"} <= set(_by_name(spans))
+
+def test_background_work_joins_request_trace(spans):
+    with tracer.start_as_current_span("request") as request_span:
+        task = in_current_context(lambda: tracer.start_span("store").end())
+
+    # Runs after the request span has ended, on another thread
+    worker = threading.Thread(target=task)
+    worker.start()
+    worker.join()
+
+    store = _by_name(spans)["store"]
+    assert store.context.trace_id == request_span.context.trace_id
+    assert store.parent.span_id == request_span.context.span_id
+
+def test_celery_task_continues_publisher_trace(spans):
+    headers = {}
+    with tracer.start_as_current_span("schedule") as publisher:
+        _inject_task_headers(headers=headers)
+    assert "traceparent" in headers
+
+    # Celery copies message headers onto task.request
+    task = SimpleNamespace(name="tasks.refresh_vendor_prices", request=SimpleNamespace(**headers))
+    _start_task_span(task_id="t1", task=task)
+    with tracer.start_as_current_span("inside task"):
+        pass
+    _end_task_span(task_id="t1", state="SUCCESS")
+
+    finished = _by_name(spans)
+    task_span = finished["tasks.refresh_vendor_prices"]
+    assert task_span.parent.span_id == publisher.context.span_id
+    assert task_span.attributes["celery.state"] == "SUCCESS"
+    assert finished["inside task"].parent.span_id == task_span.context.span_id